@@ -0,0 +1,93 @@
+import chromadb
+from typing import Any, Dict, List, Sequence, Set, Tuple
+from backend.db.vector_db import VectorDB
+from backend.utils.constants import VECTOR_DB_PATH
+
+# Chroma's historical SQLite-bound default, used when the client can't report its own limit
+DEFAULT_MAX_BATCH_SIZE = 5461
+# Collections are named COLLECTION_PREFIX + space; the pre-space shared collection was just "images"
+COLLECTION_PREFIX = "images-"
+
+class ChromaVectorDB(VectorDB):
+    def __init__(
+        self,
+        persistDir: str = VECTOR_DB_PATH,
+        space: str = "default"
+    ):
+        # Using PersistentClient for disk storage
+        self.client = chromadb.PersistentClient(path=persistDir)
+        self.space = space
+        # Chroma limits collection names to 63 characters
+        self.collection = self.client.get_or_create_collection(
+            f"{COLLECTION_PREFIX}{space}"[:63], metadata={"hnsw:space": "cosine"}
+        )
+        self.maxBatchSize = self._getMaxBatchSize()
+
+    def _getMaxBatchSize(self) -> int:
+        if hasattr(self.client, "get_max_batch_size"):
+            return self.client.get_max_batch_size()
+        return getattr(self.client, "max_batch_size", DEFAULT_MAX_BATCH_SIZE)
+
+    def _chunks(self, items: Sequence) -> List[slice]:
+        return [slice(i, i + self.maxBatchSize) for i in range(0, len(items), self.maxBatchSize)]
+
+    def addEmbeddings(
+        self,
+        ids: List[str],
+        embeddings: Sequence[Any],
+    ):
+        """Upserts in chunks of the client's max batch size, so re-indexing an id replaces it instead of failing."""
+        for chunk in self._chunks(ids):
+            self.collection.upsert(
+                ids = ids[chunk],
+                embeddings = list(embeddings[chunk]),
+            )
+
+    def removeEmbeddings(self, ids: List[str]):
+        for chunk in self._chunks(ids):
+            self.collection.delete(ids=ids[chunk])
+
+    def renameIds(self, renames: Dict[str, str]):
+        oldIds = list(renames)
+        for chunk in self._chunks(oldIds):
+            found = self.collection.get(ids=oldIds[chunk], include=["embeddings"])
+            if not found["ids"]:
+                continue
+            self.collection.upsert(
+                ids = [renames[id] for id in found["ids"]],
+                embeddings = list(found["embeddings"]),
+            )
+            stale = [id for id in found["ids"] if renames[id] != id]
+            if stale:
+                self.collection.delete(ids=stale)
+
+    def search(
+        self,
+        queryEmbedding: Any,
+        topK: int = 10,
+    ) -> List[Tuple[str, float]]:
+        results = self.collection.query(
+            query_embeddings = [queryEmbedding],
+            n_results = topK
+        )
+        if not results or not results.get("ids"):
+            return []
+        # Chroma reports distances; 1 - distance is the cosine similarity in a cosine-space collection
+        distances = results["distances"][0] if results.get("distances") else [0.0] * len(results["ids"][0])
+        return [(id, 1.0 - float(d)) for id, d in zip(results["ids"][0], distances)]
+
+    def missingIds(self, ids: List[str]) -> Set[str]:
+        found = set()
+        for chunk in self._chunks(ids):
+            found.update(self.collection.get(ids=ids[chunk], include=[])["ids"])
+        return set(ids) - found
+
+    @staticmethod
+    def listSpaces(persistDir: str = VECTOR_DB_PATH) -> List[str]:
+        client = chromadb.PersistentClient(path=persistDir)
+        # Newer clients return names, older ones return Collection objects
+        names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+        return sorted(n[len(COLLECTION_PREFIX):] for n in names if n.startswith(COLLECTION_PREFIX))
+
+    def count(self) -> int:
+        return self.collection.count()
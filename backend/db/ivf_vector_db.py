@@ -0,0 +1,179 @@
+import numpy as np
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+from backend.db.numpy_vector_db import NumpyVectorDB, ID_LOG_MIN_ENTRIES
+from backend.utils.constants import IVF_VECTOR_DB_PATH
+
+# Rows used per list when training, and the minimum before training is worthwhile
+TRAIN_POINTS_PER_LIST = 64
+MIN_POINTS_PER_LIST = 39
+KMEANS_ITERATIONS = 20
+# Rows scored per matrix product when assigning, keeps temporary memory bounded
+ASSIGN_BLOCK_SIZE = 65536
+
+class IvfVectorDB(NumpyVectorDB):
+    """
+    Approximate search with an inverted file (IVF-Flat) on top of the memory-mapped matrix.
+    Rows are bucketed by their nearest k-means centroid; a query only scores the nprobe closest buckets.
+    Until enough vectors exist to train the centroids, search falls back to the exact scan.
+    On disk, next to the NumpyVectorDB files: centroids.npy and assignments.npy (row -> list, -1 if unassigned),
+    plus assignments.log with the (row, list) int32 pairs of rows inserted since assignments.npy was written.
+    """
+
+    def __init__(
+        self,
+        persistDir: Path = IVF_VECTOR_DB_PATH / "default",
+        nlist: int = 1024,
+        nprobe: int = 16
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._listOrder: Optional[np.ndarray] = None
+        self._listBounds: Optional[np.ndarray] = None
+        self._assignmentLogEntries = 0
+        super().__init__(persistDir)
+
+    @property
+    def isTrained(self) -> bool:
+        return self._centroids is not None
+
+    @property
+    def _assignmentLogPath(self) -> Path:
+        return self.persistDir / "assignments.log"
+
+    def _load(self):
+        super()._load()
+        centroidsPath = self.persistDir / "centroids.npy"
+        assignmentsPath = self.persistDir / "assignments.npy"
+        if centroidsPath.exists() and assignmentsPath.exists():
+            self._centroids = np.load(centroidsPath)
+            self._assignments = np.load(assignmentsPath)
+            self.nlist = len(self._centroids)
+        self._assignments = self._resized(self._assignments, len(self._rowIds))
+        if self._centroids is None:
+            return
+        if self._assignmentLogPath.exists():
+            # A partial trailing pair from a crash mid-append is dropped
+            log = np.fromfile(self._assignmentLogPath, dtype=np.int32)
+            log = log[:len(log) - len(log) % 2].reshape(-1, 2)
+            log = log[log[:, 0] < len(self._assignments)]
+            self._assignments[log[:, 0]] = log[:, 1]
+            self._assignmentLogEntries = len(log)
+        # Rows written while the log was being replaced by a snapshot are simply assigned again
+        unassigned = np.flatnonzero((self._assignments < 0) & ~self._dead[:len(self._rowIds)])
+        if len(unassigned):
+            self._assignments[unassigned] = self._assign(self._matrix[unassigned])
+
+    def _saveIndex(self):
+        if self._centroids is None:
+            return
+        # The log goes first: after a crash in between, new rows come back unassigned and are reassigned on load,
+        # whereas stale entries replayed over a newer snapshot (after training or compaction) would misplace rows
+        self._assignmentLogPath.unlink(missing_ok=True)
+        self._assignmentLogEntries = 0
+        np.save(self.persistDir / "centroids.npy", self._centroids)
+        np.save(self.persistDir / "assignments.npy", self._assignments[:len(self._rowIds)])
+
+    def _logAssignments(self, rows: np.ndarray):
+        """Appends new rows' assignments to assignments.log, rewriting assignments.npy once the log is long."""
+        limit = max(ID_LOG_MIN_ENTRIES, len(self._rowIds))
+        if self._assignmentLogEntries + len(rows) > limit:
+            self._saveIndex()
+            return
+        pairs = np.stack([rows, self._assignments[rows]], axis=1).astype(np.int32)
+        with open(self._assignmentLogPath, "ab") as f:
+            pairs.tofile(f)
+        self._assignmentLogEntries += len(rows)
+
+    @staticmethod
+    def _resized(assignments: np.ndarray, size: int) -> np.ndarray:
+        if len(assignments) >= size:
+            return assignments[:size]
+        return np.concatenate([assignments, np.full(size - len(assignments), -1, dtype=np.int32)])
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), ASSIGN_BLOCK_SIZE):
+            block = np.asarray(vectors[start:start + ASSIGN_BLOCK_SIZE])
+            labels[start:start + len(block)] = np.argmax(block @ self._centroids.T, axis=1)
+        return labels
+
+    def _onRowsWritten(self, rows: np.ndarray, vectors: np.ndarray):
+        self._assignments = self._resized(self._assignments, len(self._rowIds))
+        if self._centroids is None:
+            if self.count() >= MIN_POINTS_PER_LIST * self.nlist:
+                self.train()
+            return
+        # Incremental insert: new rows join the list of their nearest existing centroid
+        self._assignments[rows] = self._assign(vectors)
+        self._listOrder = None
+        self._logAssignments(rows)
+
+    def _onCompacted(self, liveRows: np.ndarray):
+        self._assignments = self._assignments[liveRows]
+        self._listOrder = None
+        self._saveIndex()
+
+    def train(self, seed: int = 0):
+        """(Re)trains the centroids with spherical k-means on a sample of live rows and reassigns every row."""
+        with self._lock:
+            live = np.flatnonzero(~self._dead[:len(self._rowIds)])
+            if len(live) < self.nlist:
+                return
+            rng = np.random.default_rng(seed)
+            sampleSize = min(len(live), TRAIN_POINTS_PER_LIST * self.nlist)
+            sample = np.asarray(self._matrix[np.sort(rng.choice(live, sampleSize, replace=False))])
+
+            centroids = sample[rng.choice(sampleSize, self.nlist, replace=False)].copy()
+            for _ in range(KMEANS_ITERATIONS):
+                self._centroids = centroids
+                labels = self._assign(sample)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=self.nlist)
+                # Empty lists are re-seeded from random sample points
+                empty = counts == 0
+                sums[empty] = sample[rng.choice(sampleSize, int(empty.sum()))]
+                centroids = self._normalize(sums)
+            self._centroids = centroids.astype(np.float32)
+
+            self._assignments = self._resized(self._assignments, len(self._rowIds))
+            self._assignments[:] = self._assign(self._matrix[:len(self._rowIds)])
+            self._listOrder = None
+            self._saveIndex()
+
+    def _buildLists(self):
+        # Inverted lists are one argsort of the assignments; rebuilt lazily after inserts
+        self._listOrder = np.argsort(self._assignments, kind="stable")
+        self._listBounds = np.searchsorted(
+            self._assignments[self._listOrder], np.arange(self.nlist + 1)
+        )
+
+    def search(
+        self,
+        queryEmbedding: Any,
+        topK: int = 10,
+    ) -> List[Tuple[str, float]]:
+        with self._lock:
+            if self._centroids is None:
+                return super().search(queryEmbedding, topK)
+            if self._matrix is None or not self._rowOf:
+                return []
+            if self._listOrder is None:
+                self._buildLists()
+
+            query = self._normalize(np.asarray(queryEmbedding, dtype=np.float32).reshape(-1))
+            nprobe = min(self.nprobe, self.nlist)
+            probed = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+            rows = np.concatenate([
+                self._listOrder[self._listBounds[l]:self._listBounds[l + 1]] for l in probed
+            ])
+            if len(rows) == 0:
+                return []
+            # Sorted row order turns the gather into mostly sequential reads of the memory map
+            rows.sort()
+            scores = self._matrix[rows] @ query
+            scores[self._dead[rows]] = -np.inf
+            return self._topK(scores, rows, topK)
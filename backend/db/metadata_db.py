@@ -1,11 +1,29 @@
 import json
 import os
+import re
 import sqlite3
+import threading
+import numpy as np
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Dict, Iterable, Iterator, Set, Tuple
 from backend.utils.constants import DB_PATH
-from backend.utils.data_classes import SearchResult
+from backend.utils.data_classes import SearchResult, FileState, IndexedImage
+
+# Embeddings are stored as raw little-endian float32 bytes
+EMBEDDING_DTYPE = np.dtype("<f4")
+# Bumped whenever _migrate gains a step
+SCHEMA_VERSION = 5
+# Columns added to the pre-v2 table over time; older databases get them via ALTER TABLE before migrating
+LEGACY_COLUMNS = (("mtime_ns", "INTEGER"), ("size", "INTEGER"), ("content_hash", "TEXT"), ("embedding_space", "TEXT"))
+
+def packEmbedding(embedding: Any) -> bytes:
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+def unpackEmbedding(blob: bytes) -> np.ndarray:
+    # Zero-copy, read-only view over the blob
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
 
 class MetadataDB:
     def __init__(
@@ -13,105 +31,583 @@ class MetadataDB:
         dbPath: Path = DB_PATH
     ):
         self.dbPath = dbPath
+        # One long-lived connection per instance; every statement is serialized through the lock
+        self._lock = threading.RLock()
+        self._conn = self._connectToDb()
         self._initDb()
-        
+
     def _connectToDb(self):
-        return sqlite3.connect(self.dbPath)
-    
+        conn = sqlite3.connect(self.dbPath, check_same_thread=False)
+        # WAL lets readers (UI, search) run while the indexer writes, and NORMAL sync is safe under WAL
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # image_tags rows are removed with their image through ON DELETE CASCADE
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        with self._lock:
+            c = self._conn.cursor()
+            try:
+                yield c
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            finally:
+                c.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
     def _initDb(self):
-        conn = self._connectToDb()
-        c = conn.cursor()
+        with self._transaction() as c:
+            exists = c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'images'").fetchone()
+            if not exists:
+                self._createSchema(c)
+                c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                return
+        self._migrate()
+
+    @staticmethod
+    def _createSchema(c: sqlite3.Cursor):
         c.execute("""
             CREATE TABLE IF NOT EXISTS images (
-                path TEXT PRIMARY KEY,
-                tags TEXT,
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
                 embedding BLOB,
-                indexed_date TEXT
+                indexed_date TEXT,
+                mtime_ns INTEGER,
+                size INTEGER,
+                content_hash TEXT,
+                embedding_space TEXT,
+                caption TEXT,
+                perceptual_hash INTEGER
             )
         """)
-        conn.commit()
-        conn.close()
-        
+        # Inverted index: the primary key serves tag -> images (exact and prefix), the second index image -> tags
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS image_tags (
+                tag TEXT NOT NULL,
+                image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+                PRIMARY KEY (tag, image_id)
+            ) WITHOUT ROWID
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_image_tags_image ON image_tags(image_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_images_content_hash ON images(content_hash)")
+        # Full-text index over captions and tags, rowid = images.id; kept in sync by _refreshFullText
+        c.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5(caption, tags, tokenize = 'porter unicode61')
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS images_fts_delete AFTER DELETE ON images BEGIN
+                DELETE FROM images_fts WHERE rowid = old.id;
+            END
+        """)
+
+    def _migrate(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        reclaimSpace = False
+        if version < 1:
+            # v1: embeddings move from JSON text to packed float32 bytes
+            with self._transaction() as c:
+                self._addColumns(c, LEGACY_COLUMNS)
+                rows = c.execute("SELECT path, embedding FROM images WHERE typeof(embedding) = 'text'").fetchall()
+                c.executemany(
+                    "UPDATE images SET embedding = ? WHERE path = ?",
+                    [(packEmbedding(json.loads(e)), path) for path, e in rows]
+                )
+                reclaimSpace = bool(rows)
+
+        if version < 2:
+            # v2: the comma-joined tags column becomes the image_tags table, images gain an integer id
+            with self._transaction() as c:
+                self._addColumns(c, LEGACY_COLUMNS)
+                c.execute("ALTER TABLE images RENAME TO images_v1")
+                self._createSchema(c)
+                c.execute("""
+                    INSERT INTO images (path, embedding, indexed_date, mtime_ns, size, content_hash, embedding_space)
+                    SELECT path, embedding, indexed_date, mtime_ns, size, content_hash, embedding_space FROM images_v1
+                """)
+                rows = c.execute("""
+                    SELECT i.id, v.tags FROM images i JOIN images_v1 v ON v.path = i.path
+                    WHERE v.tags IS NOT NULL AND v.tags != ''
+                """)
+                c.executemany(
+                    "INSERT OR IGNORE INTO image_tags (tag, image_id) VALUES (?, ?)",
+                    ((tag, imageId) for imageId, tags in rows.fetchall() for tag in self._normalizeTags(tags.split(",")))
+                )
+                c.execute("DROP TABLE images_v1")
+                reclaimSpace = True
+
+        if version < 3:
+            # v3: captions are stored and, with the tags, full-text indexed
+            with self._transaction() as c:
+                self._addColumns(c, (("caption", "TEXT"),))
+                self._createSchema(c)
+                self._refreshFullText(c, [r[0] for r in c.execute("SELECT id FROM images").fetchall()])
+
+        if version < 4:
+            # v4: images are looked up by content hash (shared thumbnails)
+            with self._transaction() as c:
+                self._createSchema(c)
+
+        if version < 5:
+            # v5: perceptual hashes for near-duplicate detection; older rows are filled in by DuplicateFinder
+            with self._transaction() as c:
+                self._addColumns(c, (("perceptual_hash", "INTEGER"),))
+
+        with self._transaction() as c:
+            c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if reclaimSpace:
+            # Give the space freed by the old layout back to the filesystem (cannot run inside a transaction)
+            with self._lock:
+                self._conn.execute("VACUUM")
+
+    @staticmethod
+    def _addColumns(c: sqlite3.Cursor, columns: Iterable[Tuple[str, str]]):
+        existingColumns = {row[1] for row in c.execute("PRAGMA table_info(images)")}
+        for column, columnType in columns:
+            if column not in existingColumns:
+                c.execute(f"ALTER TABLE images ADD COLUMN {column} {columnType}")
+
+    @staticmethod
+    def _normalizeTags(tags: Iterable[str]) -> List[str]:
+        """Lowercases, strips and de-duplicates tags, keeping their order."""
+        seen = {}
+        for tag in tags:
+            tag = str(tag).strip().lower()
+            if tag:
+                seen.setdefault(tag, None)
+        return list(seen)
+
+    # Columns hydrating a SearchResult from "images i"; tags are gathered from the tag table
+    _RESULT_COLUMNS = """
+        i.path,
+        (SELECT group_concat(t.tag, ',') FROM image_tags t WHERE t.image_id = i.id),
+        i.indexed_date,
+        i.content_hash
+    """
+
+    @staticmethod
+    def _toResults(rows: Iterable[tuple]) -> List[SearchResult]:
+        return [SearchResult(
+            path = Path(r[0]),
+            tags = r[1].split(",") if r[1] else [],
+            indexedDate = r[2],
+            contentHash = r[3],
+            # Searches append a relevance column
+            score = float(r[4]) if len(r) > 4 else 0.0
+        ) for r in rows]
+
     def addImage(
         self,
         path: Path,
         tags: List[str],
         embedding: Any,
-        indexedDate: Optional[str] = None
+        indexedDate: Optional[str] = None,
+        fileState: Optional[FileState] = None
     ):
-        conn = self._connectToDb()
-        c = conn.cursor()
-        tagsStr = ",".join(tags) if isinstance(tags, list) else str(tags)
-        embeddingStr = json.dumps(embedding)
+        self.addImages([IndexedImage(
+            path = path,
+            caption = "",
+            tags = tags,
+            embedding = embedding,
+            fileState = fileState
+        )], indexedDate)
+
+    def addImages(self, records: List[IndexedImage], indexedDate: Optional[str] = None):
+        """Inserts or replaces many images in a single transaction."""
+        if not records:
+            return
         if indexedDate is None:
             indexedDate = datetime.now().isoformat(timespec="seconds")
-        
-        c.execute("""
-            INSERT OR REPLACE INTO images (path, tags, embedding, indexed_date)
-            VALUES (?, ?, ?, ?)
-        """, (str(path), tagsStr, embeddingStr, indexedDate))
-        conn.commit()
-        conn.close()
+        rows = []
+        for r in records:
+            state = r.fileState
+            rows.append((
+                str(r.path), r.caption, packEmbedding(r.embedding), indexedDate,
+                state.mtimeNs if state else None,
+                state.size if state else None,
+                state.contentHash if state else None,
+                r.embeddingSpace,
+                r.perceptualHash
+            ))
+
+        with self._transaction() as c:
+            # Upsert rather than INSERT OR REPLACE so re-indexed images keep their id
+            c.executemany("""
+                INSERT INTO images (
+                    path, caption, embedding, indexed_date, mtime_ns, size, content_hash, embedding_space, perceptual_hash
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    caption = excluded.caption,
+                    embedding = excluded.embedding,
+                    indexed_date = excluded.indexed_date,
+                    mtime_ns = excluded.mtime_ns,
+                    size = excluded.size,
+                    content_hash = excluded.content_hash,
+                    embedding_space = excluded.embedding_space,
+                    perceptual_hash = excluded.perceptual_hash
+            """, rows)
+            self._replaceTags(c, {str(r.path): r.tags for r in records})
+
+    def _replaceTags(self, c: sqlite3.Cursor, tagsByPath: Dict[str, Any]):
+        ids = self._idsForPaths(c, list(tagsByPath))
+        c.executemany("DELETE FROM image_tags WHERE image_id = ?", [(imageId,) for imageId in ids.values()])
+        c.executemany("INSERT OR IGNORE INTO image_tags (tag, image_id) VALUES (?, ?)", [
+            (tag, ids[path])
+            for path, tags in tagsByPath.items() if path in ids
+            for tag in self._normalizeTags(tags.split(",") if isinstance(tags, str) else tags)
+        ])
+        self._refreshFullText(c, list(ids.values()))
+
+    @staticmethod
+    def _refreshFullText(c: sqlite3.Cursor, ids: List[int]):
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            c.execute(f"""
+                INSERT OR REPLACE INTO images_fts (rowid, caption, tags)
+                SELECT i.id, coalesce(i.caption, ''),
+                    (SELECT coalesce(group_concat(t.tag, ' '), '') FROM image_tags t WHERE t.image_id = i.id)
+                FROM images i WHERE i.id IN ({placeholders})
+            """, chunk)
+
+    @staticmethod
+    def _idsForPaths(c: sqlite3.Cursor, paths: List[str]) -> Dict[str, int]:
+        ids = {}
+        # Stay under SQLite's default limit of 999 bound parameters
+        for start in range(0, len(paths), 900):
+            chunk = paths[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            ids.update(c.execute(f"SELECT path, id FROM images WHERE path IN ({placeholders})", chunk).fetchall())
+        return ids
+
+    def updateFileStates(self, states: Dict[Path, FileState]):
+        """Records new stat/hash info for images whose content did not change."""
+        if not states:
+            return
+        with self._transaction() as c:
+            c.executemany(
+                "UPDATE images SET mtime_ns = ?, size = ?, content_hash = ? WHERE path = ?",
+                [(s.mtimeNs, s.size, s.contentHash, str(p)) for p, s in states.items()]
+            )
+
+    def relinkImages(self, moves: Dict[Path, Tuple[Path, FileState]]) -> int:
+        """
+        Points rows at the new location of moved/renamed files ({oldPath: (newPath, fileState)}), keeping their id.
+        Returns how many rows moved; an old path with no row (e.g. already relinked elsewhere) is skipped.
+        """
+        if not moves:
+            return 0
+        with self._transaction() as c:
+            # A stale row already sitting at the destination gives way to the moved one, if there is one
+            c.executemany(
+                "DELETE FROM images WHERE path = ? AND EXISTS (SELECT 1 FROM images WHERE path = ?)",
+                [(str(new), str(old)) for old, (new, _) in moves.items()]
+            )
+            c.executemany(
+                "UPDATE images SET path = ?, mtime_ns = ?, size = ?, content_hash = ? WHERE path = ?",
+                [(str(new), s.mtimeNs, s.size, s.contentHash, str(old)) for old, (new, s) in moves.items()]
+            )
+            return c.rowcount
 
     def removeImage(self, path: Path):
-        conn = self._connectToDb()
-        c = conn.cursor()
-        c.execute("DELETE FROM images WHERE path = ?", (str(path),))
-        conn.commit()
-        conn.close()
+        self.removeImages([path])
+
+    def removeImages(self, paths: Iterable[Path]):
+        """Deletes many images in a single transaction."""
+        rows = [(str(p),) for p in paths]
+        if not rows:
+            return
+        with self._transaction() as c:
+            c.executemany("DELETE FROM images WHERE path = ?", rows)
 
     def getAllImages(self) -> List[SearchResult]:
-        conn = self._connectToDb()
-        c = conn.cursor()
-        c.execute("SELECT path, tags, indexed_date FROM images")
-        rows = c.fetchall()
-        conn.close()
-        return [SearchResult(
-            path = Path(r[0]),
-            tags = r[1].split(",") if r[1] else [],
-            indexedDate = r[2]
-        ) for r in rows]
+        with self._transaction() as c:
+            c.execute(f"SELECT {self._RESULT_COLUMNS} FROM images i")
+            rows = c.fetchall()
+        return self._toResults(rows)
 
-    def getImagesInFolder(self, folderPath: str) -> List[SearchResult]:
-        conn = self._connectToDb()
-        c = conn.cursor()
+    def _selectInFolder(self, c: sqlite3.Cursor, columns: str, folderPath: str) -> List[tuple]:
         # Ensure path ends with a separator to avoid matching folders like "Photos" and "Photos New"
         searchPath = str(Path(folderPath))
         if not (searchPath.endswith("/") or searchPath.endswith("\\")):
              searchPath += os.sep
-             
-        c.execute("SELECT path, tags, indexed_date FROM images WHERE path LIKE ?", (f"{searchPath}%",))
+
+        c.execute(f"SELECT {columns} FROM images i WHERE path LIKE ?", (f"{searchPath}%",))
         rows = c.fetchall()
         # Also include the folder itself if by some chance it was indexed (though usually it's just files)
         # But we definitely want to check for the exact folder path too
-        c.execute("SELECT path, tags, indexed_date FROM images WHERE path = ?", (str(Path(folderPath)),))
+        c.execute(f"SELECT {columns} FROM images i WHERE path = ?", (str(Path(folderPath)),))
         rows.extend(c.fetchall())
-        
-        conn.close()
-        return [SearchResult(
-            path = Path(r[0]),
-            tags = r[1].split(",") if r[1] else [],
-            indexedDate = r[2]
-        ) for r in rows]
-        
-    def searchByTag(self, query: str):
-        conn = self._connectToDb()
-        c = conn.cursor()
-        c.execute("""
-            SELECT path, tags, indexed_date FROM images WHERE tags LIKE ?
-        """, (f"%{query}%", ))
-        rows = c.fetchall()
-        conn.close()
-        return [SearchResult(
+        return rows
+
+    def getImagesByPaths(self, paths: Iterable[Path]) -> Dict[Path, SearchResult]:
+        """Hydrates many images in bulk; paths that are not indexed are left out."""
+        keys = [str(p) for p in paths]
+        rows = []
+        with self._transaction() as c:
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(c.execute(
+                    f"SELECT {self._RESULT_COLUMNS} FROM images i WHERE i.path IN ({placeholders})", chunk
+                ).fetchall())
+        return {r.path: r for r in self._toResults(rows)}
+
+    def getContentHashes(self, paths: Iterable[Path]) -> Dict[Path, str]:
+        keys = [str(p) for p in paths]
+        hashes = {}
+        with self._transaction() as c:
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                hashes.update(c.execute(
+                    f"SELECT path, content_hash FROM images WHERE content_hash IS NOT NULL AND path IN ({placeholders})",
+                    chunk
+                ).fetchall())
+        return {Path(p): h for p, h in hashes.items()}
+
+    def getImagesByContentHash(self, contentHash: str) -> List[IndexedImage]:
+        """Every indexed copy of the given content, with the caption, tags and embedding it was indexed with."""
+        with self._transaction() as c:
+            rows = c.execute("""
+                SELECT i.path, i.caption,
+                    (SELECT group_concat(t.tag, ',') FROM image_tags t WHERE t.image_id = i.id),
+                    i.embedding, i.embedding_space, i.mtime_ns, i.size, i.perceptual_hash
+                FROM images i WHERE i.content_hash = ?
+            """, (contentHash,)).fetchall()
+        return [IndexedImage(
             path = Path(r[0]),
-            tags = r[1].split(",") if r[1] else [],
-            indexedDate = r[2]
+            caption = r[1] or "",
+            tags = r[2].split(",") if r[2] else [],
+            embedding = unpackEmbedding(r[3]) if r[3] is not None else None,
+            fileState = FileState(mtimeNs = r[5], size = r[6], contentHash = contentHash),
+            embeddingSpace = r[4],
+            perceptualHash = r[7]
         ) for r in rows]
 
+    def unreferencedHashes(self, contentHashes: Iterable[str]) -> Set[str]:
+        """The given content hashes that no indexed image has anymore."""
+        candidates = list(set(contentHashes))
+        referenced = set()
+        with self._transaction() as c:
+            for start in range(0, len(candidates), 900):
+                chunk = candidates[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                referenced.update(r[0] for r in c.execute(
+                    f"SELECT DISTINCT content_hash FROM images WHERE content_hash IN ({placeholders})", chunk
+                ))
+        return set(candidates) - referenced
+
+    def countImages(self) -> int:
+        with self._transaction() as c:
+            return c.execute("SELECT count(*) FROM images").fetchone()[0]
+
+    def countTags(self) -> int:
+        """Distinct tags in use."""
+        with self._transaction() as c:
+            return c.execute("SELECT count(DISTINCT tag) FROM image_tags").fetchone()[0]
+
+    def getTagCounts(self, prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(tag, image count) pairs, most used first; prefix narrows them with a range scan on the tag index."""
+        where, params = "", []
+        if prefix:
+            prefix = prefix.strip().lower()
+            where, params = "WHERE tag >= ? AND tag < ?", [prefix, prefix + "\U0010ffff"]
+        with self._transaction() as c:
+            return c.execute(
+                f"SELECT tag, count(*) AS n FROM image_tags {where} GROUP BY tag ORDER BY n DESC, tag LIMIT ?",
+                params + [limit if limit is not None else -1]
+            ).fetchall()
+
+    def getImagesInFolder(self, folderPath: str) -> List[SearchResult]:
+        with self._transaction() as c:
+            rows = self._selectInFolder(c, self._RESULT_COLUMNS, folderPath)
+        return self._toResults(rows)
+
+    def getFileStatesInFolder(self, folderPath: str) -> Dict[Path, Optional[FileState]]:
+        """Returns {path: FileState} for indexed images in the folder; None for rows indexed before change tracking."""
+        with self._transaction() as c:
+            rows = self._selectInFolder(c, "path, mtime_ns, size, content_hash", folderPath)
+        return {
+            Path(r[0]): FileState(mtimeNs = r[1], size = r[2], contentHash = r[3]) if r[1] is not None else None
+            for r in rows
+        }
+
+    def getFileStates(self, paths: Iterable[Path]) -> Dict[Path, Optional[FileState]]:
+        """Like getFileStatesInFolder, for specific paths; paths that are not indexed are left out."""
+        keys = [str(p) for p in paths]
+        rows = []
+        with self._transaction() as c:
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(c.execute(
+                    f"SELECT path, mtime_ns, size, content_hash FROM images WHERE path IN ({placeholders})", chunk
+                ).fetchall())
+        return {
+            Path(r[0]): FileState(mtimeNs = r[1], size = r[2], contentHash = r[3]) if r[1] is not None else None
+            for r in rows
+        }
+
+    def getEmbedding(self, path: Path, space: Optional[str] = None) -> Optional[np.ndarray]:
+        """The stored embedding of an image; None if there is none, or it is not from the given space."""
+        with self._transaction() as c:
+            row = c.execute("SELECT embedding, embedding_space FROM images WHERE path = ?", (str(path),)).fetchone()
+        if not row or row[0] is None or (space is not None and row[1] != space):
+            return None
+        return unpackEmbedding(row[0])
+
+    def getPerceptualHashes(self, paths: Iterable[Path]) -> Dict[Path, Optional[int]]:
+        """{path: perceptual hash} for indexed paths; None for rows indexed before hashes were stored."""
+        keys = [str(p) for p in paths]
+        hashes = {}
+        with self._transaction() as c:
+            for start in range(0, len(keys), 900):
+                chunk = keys[start:start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                hashes.update(c.execute(
+                    f"SELECT path, perceptual_hash FROM images WHERE path IN ({placeholders})", chunk
+                ).fetchall())
+        return {Path(p): h for p, h in hashes.items()}
+
+    def setPerceptualHashes(self, hashes: Dict[Path, int]):
+        if not hashes:
+            return
+        with self._transaction() as c:
+            c.executemany(
+                "UPDATE images SET perceptual_hash = ? WHERE path = ?",
+                [(h, str(p)) for p, h in hashes.items()]
+            )
+
+    def getEmbeddingMatrix(self, space: Optional[str] = None) -> Tuple[List[Path], np.ndarray]:
+        """
+        Loads every stored embedding of one embedding space as a single (n, dim) float32 matrix.
+        Defaults to the space of the most recently indexed image.
+        """
+        with self._transaction() as c:
+            if space is None:
+                row = c.execute(
+                    "SELECT embedding_space FROM images WHERE embedding IS NOT NULL ORDER BY indexed_date DESC LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return [], np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+                space = row[0]
+            rows = c.execute(
+                "SELECT path, embedding FROM images WHERE embedding_space IS ? AND embedding IS NOT NULL",
+                (space,)
+            ).fetchall()
+        if not rows:
+            return [], np.empty((0, 0), dtype=EMBEDDING_DTYPE)
+        # Rows indexed before spaces were recorded may mix dimensions; keep the ones matching the first row
+        rows = [r for r in rows if len(r[1]) == len(rows[0][1])]
+        dim = len(rows[0][1]) // EMBEDDING_DTYPE.itemsize
+        paths = [Path(r[0]) for r in rows]
+        matrix = np.frombuffer(b"".join(r[1] for r in rows), dtype=EMBEDDING_DTYPE).reshape(len(rows), dim)
+        return paths, matrix
+
+    def searchByTag(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        matchAll: bool = False,
+        prefix: bool = False
+    ) -> List[SearchResult]:
+        """Images carrying the comma/space separated tags in the query; see searchByTags for matchAll and prefix."""
+        return self.searchByTags(re.split(r"[,\s]+", query), matchAll, prefix, limit = limit, offset = offset)
+
+    def searchByTags(
+        self,
+        tags: List[str],
+        matchAll: bool = False,
+        prefix: bool = False,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[SearchResult]:
+        """
+        Looks tags up in the image_tags index. matchAll=True requires every tag (AND), otherwise any (OR)
+        ranked by how many tags matched. prefix=True matches tags starting with each term ("cat" -> "cats").
+        """
+        terms = self._normalizeTags(tags)
+        if not terms:
+            return []
+
+        # One index range per term; the term number lets COUNT(DISTINCT) tell AND/OR matches apart
+        lookups, params = [], []
+        for termNo, term in enumerate(terms):
+            if prefix:
+                lookups.append(f"SELECT image_id, {termNo} AS term FROM image_tags WHERE tag >= ? AND tag < ?")
+                params.extend((term, term + "\U0010ffff"))
+            else:
+                lookups.append(f"SELECT image_id, {termNo} AS term FROM image_tags WHERE tag = ?")
+                params.append(term)
+
+        # With a single term every match already matches all terms
+        requireAll = matchAll and len(terms) > 1
+        if len(terms) == 1 and not prefix:
+            # A single exact tag is one walk of the primary key, already in image_id order
+            ranked = "SELECT image_id, 1 AS matched FROM image_tags WHERE tag = ? ORDER BY image_id DESC LIMIT ? OFFSET ?"
+        else:
+            ranked = f"""
+                SELECT m.image_id, COUNT(DISTINCT m.term) AS matched
+                FROM ({" UNION ALL ".join(lookups)}) m
+                GROUP BY m.image_id
+                {"HAVING matched = ?" if requireAll else ""}
+                ORDER BY matched DESC, m.image_id DESC
+                LIMIT ? OFFSET ?
+            """
+        # Rank and page on ids alone so only the returned page gets its path and tags hydrated
+        sql = f"""
+            SELECT {self._RESULT_COLUMNS}, r.matched
+            FROM ({ranked}) r
+            JOIN images i ON i.id = r.image_id
+            ORDER BY r.matched DESC, r.image_id DESC
+        """
+        if requireAll:
+            params.append(len(terms))
+        params.extend((-1 if limit is None else limit, offset))
+
+        with self._transaction() as c:
+            rows = c.execute(sql, params).fetchall()
+        return self._toResults(rows)
+
+    @staticmethod
+    def _ftsQuery(query: str) -> str:
+        # Every word or "quoted phrase" is quoted so user input can't trip FTS5 syntax; a trailing * keeps prefix search
+        terms = []
+        for phrase, word, star in re.findall(r'"([^"]*)"|([^\s"*]+)(\*?)', query):
+            text = phrase or word
+            if text.strip():
+                terms.append(f'"{text}"' + ("*" if star and word else ""))
+        return " ".join(terms)
+
+    def searchText(self, query: str, limit: Optional[int] = None, offset: int = 0) -> List[SearchResult]:
+        """BM25-ranked full-text search over captions and tags; supports "exact phrases" and prefix*."""
+        match = self._ftsQuery(query)
+        if not match:
+            return []
+        with self._transaction() as c:
+            rows = c.execute(f"""
+                SELECT {self._RESULT_COLUMNS}, -r.rank
+                FROM (
+                    SELECT rowid AS id, bm25(images_fts, 1.0, 2.0) AS rank FROM images_fts
+                    WHERE images_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?
+                ) r
+                JOIN images i ON i.id = r.id
+                ORDER BY r.rank
+            """, (match, -1 if limit is None else limit, offset)).fetchall()
+        return self._toResults(rows)
+
     def updateTags(self, path: Path, tags: List[str]):
-        conn = self._connectToDb()
-        c = conn.cursor()
-        tagsStr = ",".join(tags) if isinstance(tags, list) else str(tags)
-        c.execute("UPDATE images SET tags = ? WHERE path = ?", (tagsStr, str(path)))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+        with self._transaction() as c:
+            self._replaceTags(c, {str(path): tags})
@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from backend.db.vector_db import VectorDB
+from backend.utils.constants import NUMPY_VECTOR_DB_PATH
+
+INITIAL_CAPACITY = 1024
+# Dead rows are reclaimed once they make up this share of the matrix
+COMPACT_RATIO = 0.25
+# ids.log is folded back into ids.json once it has more entries than this or than the table has rows,
+# so each write costs time in the size of the batch rather than of the index
+ID_LOG_MIN_ENTRIES = 4096
+
+class NumpyVectorDB(VectorDB):
+    """
+    Exact cosine search over a memory-mapped float32 matrix.
+    On disk: vectors.npy (capacity x dim, L2-normalized rows) and ids.json (row -> id, null marks a tombstone).
+    Changes since ids.json was written are appended to ids.log as [generation, row, id] lines.
+    Opening is just an mmap plus reading the id table, so cold start stays in milliseconds.
+    """
+
+    def __init__(
+        self,
+        persistDir: Path = NUMPY_VECTOR_DB_PATH / "default"
+    ):
+        self.persistDir = Path(persistDir)
+        self.persistDir.mkdir(parents=True, exist_ok=True)
+        self._matrixPath = self.persistDir / "vectors.npy"
+        self._idsPath = self.persistDir / "ids.json"
+        self._idLogPath = self.persistDir / "ids.log"
+        self._lock = threading.RLock()
+
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._rowIds: List[Optional[str]] = []
+        self._rowOf: Dict[str, int] = {}
+        self._dead = np.zeros(0, dtype=bool)
+        # Bumped on every ids.json rewrite; log lines of an older generation are already part of it
+        self._generation = 0
+        self._logEntries = 0
+        self._load()
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    def _load(self):
+        if not self._idsPath.exists() or not self._matrixPath.exists():
+            return
+        with open(self._idsPath, "r") as f:
+            table = json.load(f)
+        self._dim = table["dim"]
+        self._rowIds = table["ids"]
+        self._generation = table.get("generation", 0)
+        self._replayIdLog()
+        self._matrix = np.load(self._matrixPath, mmap_mode="r+")
+        self._rowOf = {id: row for row, id in enumerate(self._rowIds) if id is not None}
+        self._dead = np.zeros(self._matrix.shape[0], dtype=bool)
+        self._dead[:len(self._rowIds)] = [id is None for id in self._rowIds]
+
+    def _replayIdLog(self):
+        if not self._idLogPath.exists():
+            return
+        with open(self._idLogPath, "r") as f:
+            for line in f:
+                try:
+                    generation, row, id = json.loads(line)
+                except ValueError:
+                    # A crash mid-append leaves a partial last line
+                    break
+                if generation != self._generation:
+                    continue
+                if row >= len(self._rowIds):
+                    self._rowIds.extend([None] * (row + 1 - len(self._rowIds)))
+                self._rowIds[row] = id
+                self._logEntries += 1
+
+    def _saveIds(self):
+        tmpPath = self._idsPath.with_suffix(".tmp")
+        with open(tmpPath, "w") as f:
+            json.dump({"dim": self._dim, "generation": self._generation + 1, "ids": self._rowIds}, f)
+        os.replace(tmpPath, self._idsPath)
+        self._generation += 1
+        self._logEntries = 0
+        self._idLogPath.unlink(missing_ok=True)
+
+    def _logIds(self, rows: Iterable[int]):
+        """Persists the ids of changed rows by appending to ids.log (or rewriting ids.json once the log is long)."""
+        rows = sorted(set(int(row) for row in rows))
+        limit = max(ID_LOG_MIN_ENTRIES, len(self._rowIds))
+        if not self._idsPath.exists() or self._logEntries + len(rows) > limit:
+            self._saveIds()
+            return
+        with open(self._idLogPath, "a") as f:
+            f.writelines(json.dumps([self._generation, row, self._rowIds[row]]) + "\n" for row in rows)
+        self._logEntries += len(rows)
+
+    def _reallocate(self, capacity: int, rows: Optional[np.ndarray] = None):
+        """Writes a new matrix file holding the given rows (default: all current rows) and maps it."""
+        if rows is None:
+            rows = np.arange(len(self._rowIds))
+        tmpPath = self.persistDir / "vectors.tmp.npy"
+        newMatrix = np.lib.format.open_memmap(tmpPath, mode="w+", dtype=np.float32, shape=(capacity, self._dim))
+        if self._matrix is not None and len(rows):
+            newMatrix[:len(rows)] = self._matrix[rows]
+        newMatrix.flush()
+        del newMatrix
+        # The old mapping has to be released before the file can be replaced (Windows)
+        self._matrix = None
+        os.replace(tmpPath, self._matrixPath)
+        self._matrix = np.load(self._matrixPath, mmap_mode="r+")
+        dead = np.zeros(capacity, dtype=bool)
+        dead[:len(rows)] = self._dead[rows]
+        self._dead = dead
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def addEmbeddings(
+        self,
+        ids: List[str],
+        embeddings: Sequence[Any],
+    ):
+        if not ids:
+            return
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+            if vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self._dim}")
+
+            # Existing ids are overwritten in place, new ones are appended
+            usedBefore = len(self._rowIds)
+            rows = np.empty(len(ids), dtype=np.int64)
+            for i, id in enumerate(ids):
+                row = self._rowOf.get(id)
+                if row is None:
+                    row = len(self._rowIds)
+                    self._rowIds.append(id)
+                    self._rowOf[id] = row
+                rows[i] = row
+
+            capacity = 0 if self._matrix is None else self._matrix.shape[0]
+            if len(self._rowIds) > capacity:
+                self._reallocate(max(INITIAL_CAPACITY, 2 * len(self._rowIds)), np.arange(usedBefore))
+            self._matrix[rows] = vectors
+            self._dead[rows] = False
+            self._matrix.flush()
+            self._onRowsWritten(rows, vectors)
+            self._logIds(rows)
+
+    def removeEmbeddings(self, ids: List[str]):
+        with self._lock:
+            rows = [self._rowOf.pop(id) for id in ids if id in self._rowOf]
+            if not rows:
+                return
+            for row in rows:
+                self._rowIds[row] = None
+            self._dead[rows] = True
+            if self._dead[:len(self._rowIds)].sum() > COMPACT_RATIO * len(self._rowIds):
+                self.compact()
+            else:
+                self._logIds(rows)
+
+    def renameIds(self, renames: Dict[str, str]):
+        with self._lock:
+            changed = []
+            for old, new in renames.items():
+                if old == new or old not in self._rowOf:
+                    continue
+                row = self._rowOf.pop(old)
+                replaced = self._rowOf.get(new)
+                if replaced is not None:
+                    self._rowIds[replaced] = None
+                    self._dead[replaced] = True
+                    changed.append(replaced)
+                self._rowIds[row] = new
+                self._rowOf[new] = row
+                changed.append(row)
+            # Rows stay where they are, so index structures on top of the matrix are unaffected
+            if changed:
+                self._logIds(changed)
+
+    def compact(self):
+        """Drops tombstoned rows and rewrites the matrix contiguously."""
+        with self._lock:
+            if self._matrix is None:
+                return
+            live = np.flatnonzero(~self._dead[:len(self._rowIds)])
+            self._reallocate(max(INITIAL_CAPACITY, 2 * len(live)), live)
+            self._rowIds = [self._rowIds[row] for row in live]
+            self._rowOf = {id: row for row, id in enumerate(self._rowIds)}
+            self._onCompacted(live)
+            self._saveIds()
+
+    # Hooks for index structures layered on top of the matrix (see IvfVectorDB)
+    def _onRowsWritten(self, rows: np.ndarray, vectors: np.ndarray):
+        pass
+
+    def _onCompacted(self, liveRows: np.ndarray):
+        pass
+
+    def search(
+        self,
+        queryEmbedding: Any,
+        topK: int = 10,
+    ) -> List[Tuple[str, float]]:
+        with self._lock:
+            if self._matrix is None or not self._rowOf:
+                return []
+            query = self._normalize(np.asarray(queryEmbedding, dtype=np.float32).reshape(-1))
+            used = len(self._rowIds)
+            scores = self._matrix[:used] @ query
+            scores[self._dead[:used]] = -np.inf
+            return self._topK(scores, np.arange(used), topK)
+
+    def _topK(self, scores: np.ndarray, rows: np.ndarray, topK: int) -> List[Tuple[str, float]]:
+        k = min(topK, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        # argpartition is O(n); only the k winners get sorted
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self._rowIds[rows[i]], float(scores[i])) for i in best]
+
+    def missingIds(self, ids: List[str]) -> Set[str]:
+        with self._lock:
+            return {id for id in ids if id not in self._rowOf}
+
+    def count(self) -> int:
+        return len(self._rowOf)
@@ -1,35 +1,105 @@
-import chromadb
-from typing import Any
-from backend.utils.constants import VECTOR_DB_PATH
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 class VectorDB:
-    def __init__(
-        self,
-        persistDir: str = VECTOR_DB_PATH
-    ):
-        # Using PersistentClient for disk storage
-        self.client = chromadb.PersistentClient(path=persistDir)
-        self.collection = self.client.get_or_create_collection("images")
-        
+    """
+    Interface shared by the vector index backends.
+    search() returns (id, score) pairs ordered best first; higher scores are more similar.
+    """
+
     def addEmbedding(
         self,
         id: str,
         embedding: Any,
     ):
-        self.collection.add(
-            ids = [id],
-            embeddings = [embedding],
-        )
-        
+        self.addEmbeddings([id], [embedding])
+
+    def addEmbeddings(
+        self,
+        ids: List[str],
+        embeddings: Sequence[Any],
+    ):
+        raise NotImplementedError
+
     def removeEmbedding(self, id: str):
-        self.collection.delete(ids=[id])
-    
+        self.removeEmbeddings([id])
+
+    def removeEmbeddings(self, ids: List[str]):
+        raise NotImplementedError
+
+    def renameIds(self, renames: Dict[str, str]):
+        """Moves vectors from old ids to new ones (e.g. a moved file); an existing vector at a new id is replaced."""
+        raise NotImplementedError
+
     def search(
         self,
         queryEmbedding: Any,
         topK: int = 10,
-    ) -> chromadb.QueryResult:
-        return self.collection.query(
-            query_embeddings = [queryEmbedding],
-            n_results = topK
-        )
\ No newline at end of file
+    ) -> List[Tuple[str, float]]:
+        raise NotImplementedError
+
+    def missingIds(self, ids: List[str]) -> Set[str]:
+        """Returns the subset of ids that have no vector in this index."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+_openDbs: Dict[Tuple[str, str], VectorDB] = {}
+_openDbsLock = threading.Lock()
+
+def vectorSpaceName(modelName: str, dim: int) -> str:
+    """
+    Embeddings from different models (or of different sizes) live in separate spaces that must never be mixed.
+    Each space gets its own collection/directory, named after the model and the embedding dimension.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", modelName.lower()).strip("-")
+    return f"{slug}-{dim}"
+
+def _backendName(backend: Optional[str]) -> str:
+    from backend.services.settings_manager import SettingsManager
+    return backend or SettingsManager().vectorBackend
+
+def openVectorDb(space: str, backend: Optional[str] = None) -> VectorDB:
+    """Opens (once per process) the index for an embedding space in the configured backend."""
+    backend = _backendName(backend)
+    with _openDbsLock:
+        key = (backend, space)
+        if key not in _openDbs:
+            _openDbs[key] = _createVectorDb(space, backend)
+        return _openDbs[key]
+
+def _createVectorDb(space: str, backend: str) -> VectorDB:
+    from backend.services.settings_manager import SettingsManager
+    settings = SettingsManager()
+
+    # Backends are imported lazily so an unused one doesn't need its dependencies installed
+    if backend == "numpy":
+        from backend.db.numpy_vector_db import NumpyVectorDB
+        from backend.utils.constants import NUMPY_VECTOR_DB_PATH
+        return NumpyVectorDB(NUMPY_VECTOR_DB_PATH / space)
+    if backend == "ivf":
+        from backend.db.ivf_vector_db import IvfVectorDB
+        from backend.utils.constants import IVF_VECTOR_DB_PATH
+        return IvfVectorDB(IVF_VECTOR_DB_PATH / space, nlist=settings.ivfLists, nprobe=settings.ivfProbes)
+    if backend == "chroma":
+        from backend.db.chroma_vector_db import ChromaVectorDB
+        return ChromaVectorDB(space=space)
+    raise ValueError(f"Unknown vector backend: {backend}")
+
+def listVectorSpaces(backend: Optional[str] = None) -> List[str]:
+    """Names of every embedding space that has an index in the configured backend."""
+    backend = _backendName(backend)
+    if backend == "chroma":
+        from backend.db.chroma_vector_db import ChromaVectorDB
+        return ChromaVectorDB.listSpaces()
+    from backend.utils.constants import NUMPY_VECTOR_DB_PATH, IVF_VECTOR_DB_PATH
+    root = IVF_VECTOR_DB_PATH if backend == "ivf" else NUMPY_VECTOR_DB_PATH
+    if not root.exists():
+        return []
+    return sorted(d.name for d in root.iterdir() if (d / "ids.json").exists())
+
+def listModelSpaces(modelName: str, backend: Optional[str] = None) -> List[str]:
+    prefix = vectorSpaceName(modelName, 0)[:-1]
+    return [space for space in listVectorSpaces(backend) if space.startswith(prefix) and space[len(prefix):].isdigit()]
@@ -1,24 +1,74 @@
+import numpy as np
 import torch
 import open_clip
 from PIL import Image
+from typing import List, Union
 
 class ClipEmbedder:
+    """
+    Dual-encoder embedding model: images and text land in the same space, so queries compare
+    directly against image vectors. Outputs are L2-normalized float32.
+    """
+    _instance = None
+    _model = None
+    _preprocess = None
+    _tokenizer = None
+
+    modelName = "CLIP-ViT-B-32"
+    architecture = "ViT-B-32"
+    pretrained = "openai"
+    # Images per forward pass; CLIP is small enough that this mostly bounds peak memory
+    maxBatchSize = 64
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ClipEmbedder, cls).__new__(cls)
+        return cls._instance
+
     def __init__(self):
-        self.model, _, self.preprocess = open_clip.create_model_and_transforms(
-            "ViT-B-32", pretrained = "openai"
-        )
-        self.tokenizer = open_clip.get_tokenizer("ViT-B-32")
-        
-    def encodeImage(self, imagePath: str):
-        image = Image.open(imagePath).convert("RGB")
-        imageTensor = self.preprocess(image).unsqueeze(0) # type: ignore
-        with torch.no_grad():
-            emb = self.model.encode_image(imageTensor) # type: ignore
-            
-        return emb[0].cpu().numpy().tolist()
-    
-    def encodeText(self, text: str):
-        tokens = self.tokenizer([text])
+        if ClipEmbedder._model is None:
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"ClipEmbedder: Using device: {self.device}")
+
+            model, _, preprocess = open_clip.create_model_and_transforms(
+                self.architecture, pretrained = self.pretrained
+            )
+            ClipEmbedder._model = model.to(self.device).eval()
+            ClipEmbedder._preprocess = preprocess
+            ClipEmbedder._tokenizer = open_clip.get_tokenizer(self.architecture)
+
+        self.model = ClipEmbedder._model
+        self.preprocess = ClipEmbedder._preprocess
+        self.tokenizer = ClipEmbedder._tokenizer
+
+    @staticmethod
+    def _toNumpy(embeddings: torch.Tensor) -> np.ndarray:
+        embeddings = embeddings / embeddings.norm(dim=-1, keepdim=True).clamp(min=1e-12)
+        return embeddings.to(torch.float32).cpu().numpy()
+
+    def encodeImage(self, image: Union[str, Image.Image]) -> np.ndarray:
+        return self.encodeImages([image])[0]
+
+    def encodeImages(self, images: List[Union[str, Image.Image]]) -> np.ndarray:
+        """Embeds image paths or already loaded PIL images (e.g. a captioner's prepared images)."""
+        if not images:
+            return np.empty((0, 0), dtype=np.float32)
+        batches = []
+        for start in range(0, len(images), self.maxBatchSize):
+            pixels = torch.stack([
+                self.preprocess(Image.open(image).convert("RGB") if isinstance(image, str) else image.convert("RGB"))
+                for image in images[start:start + self.maxBatchSize]
+            ]).to(self.device)
+            with torch.no_grad():
+                batches.append(self._toNumpy(self.model.encode_image(pixels)))
+        return np.concatenate(batches)
+
+    def encodeText(self, text: str) -> np.ndarray:
+        return self.encodeTexts([text])[0]
+
+    def encodeTexts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        tokens = self.tokenizer(texts).to(self.device)
         with torch.no_grad():
-            emb = self.model.encode_text(tokens) # type: ignore
-        return emb[0].cpu().numpy().tolist()
\ No newline at end of file
+            return self._toNumpy(self.model.encode_text(tokens))
@@ -1,6 +1,8 @@
+import numpy as np
 import torch
 from transformers import AutoProcessor, AutoModelForCausalLM
 from PIL import Image
+from typing import List, Tuple
 import os
 import gc
 
@@ -9,6 +11,9 @@ class FlorenceCaptioner:
     _model = None
     _processor = None
 
+    maxImageDim = 768
+    captionPrompt = "<DETAILED_CAPTION>"
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(FlorenceCaptioner, cls).__new__(cls)
@@ -42,12 +47,37 @@ class FlorenceCaptioner:
             img.thumbnail((maxDim, maxDim), Image.Resampling.LANCZOS)
         return img
 
-    def generateCaption(self, imagePath: str) -> str:
+    def prepareImage(self, imagePath: str) -> Image.Image:
         # Resize to save memory
-        image = self._preprocessImage(imagePath, maxDim=768)
-        prompt = "<DETAILED_CAPTION>"
-        
-        inputs = self.processor(text=prompt, images=image, return_tensors="pt").to(self.device, self.torchDtype)
+        return self._preprocessImage(imagePath, maxDim=self.maxImageDim)
+
+    def _buildInputs(self, images: List[Image.Image]):
+        return self.processor(
+            text=[self.captionPrompt] * len(images), images=images, padding=True, return_tensors="pt"
+        ).to(self.device, self.torchDtype)
+
+    def _postProcess(self, generatedIds, images: List[Image.Image]) -> List[str]:
+        generatedTexts = self.processor.batch_decode(generatedIds, skip_special_tokens=False)
+        return [
+            self.processor.post_process_generation(
+                text, task=self.captionPrompt, image_size=(image.width, image.height)
+            )[self.captionPrompt]
+            for text, image in zip(generatedTexts, images)
+        ]
+
+    def generateCaption(self, imagePath: str) -> str:
+        return self.generateCaptions([imagePath])[0]
+
+    def generateCaptions(self, imagePaths: List[str]) -> List[str]:
+        if not imagePaths:
+            return []
+        return self.captionImages([self.prepareImage(imagePath) for imagePath in imagePaths])
+
+    def captionImages(self, images: List[Image.Image]) -> List[str]:
+        """Captions images that already went through prepareImage."""
+        if not images:
+            return []
+        inputs = self._buildInputs(images)
         
         with torch.no_grad():
             generatedIds = self.model.generate(
@@ -57,8 +87,7 @@ class FlorenceCaptioner:
                 num_beams=3
             )
         
-        generatedText = self.processor.batch_decode(generatedIds, skip_special_tokens=False)[0]
-        parsedAnswer = self.processor.post_process_generation(generatedText, task=prompt, image_size=(image.width, image.height))
+        captions = self._postProcess(generatedIds, images)
         
         # Cleanup
         del inputs
@@ -66,29 +95,78 @@ class FlorenceCaptioner:
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
             
-        return parsedAnswer[prompt]
+        return captions
 
-    def encodeImage(self, imagePath: str) -> list[float]:
-        image = self._preprocessImage(imagePath, maxDim=768)
-        inputs = self.processor(text="<DETAILED_CAPTION>", images=image, return_tensors="pt").to(self.device, self.torchDtype)
+    def encodeImage(self, imagePath: str) -> np.ndarray:
+        return self.encodeImages([imagePath])[0]
+
+    def encodeImages(self, imagePaths: List[str]) -> np.ndarray:
+        if not imagePaths:
+            return np.empty((0, 0), dtype=np.float32)
+        images = [self.prepareImage(imagePath) for imagePath in imagePaths]
+        # Only the pixel values are needed for the image encoder
+        pixelValues = self.processor.image_processor(images=images, return_tensors="pt")["pixel_values"]
+        pixelValues = pixelValues.to(self.device, self.torchDtype)
         
         with torch.no_grad():
-            vision_outputs = self.model.vision_tower(inputs["pixel_values"])
-            embeddings = vision_outputs.last_hidden_state.mean(dim=1).squeeze(0).to(torch.float32)
+            imageFeatures = self.model._encode_image(pixelValues)
+            embeddings = imageFeatures.mean(dim=1).to(torch.float32)
+            
+        # Cleanup
+        del pixelValues
+        del imageFeatures
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
             
+        return embeddings.cpu().numpy()
+
+    def captionAndEncodeImages(self, images: List[Image.Image]) -> Tuple[List[str], np.ndarray]:
+        """Captions already prepared images and pools the same encoded image features into their embeddings."""
+        if not images:
+            return [], np.empty((0, 0), dtype=np.float32)
+        inputs = self._buildInputs(images)
+        
+        with torch.no_grad():
+            # Same steps Florence's generate() performs internally, but the image features are kept for the embedding
+            imageFeatures = self.model._encode_image(inputs["pixel_values"])
+            inputsEmbeds = self.model.get_input_embeddings()(inputs["input_ids"])
+            inputsEmbeds, attentionMask = self.model._merge_input_ids_with_image_features(imageFeatures, inputsEmbeds)
+            generatedIds = self.model.language_model.generate(
+                input_ids=None,
+                inputs_embeds=inputsEmbeds,
+                attention_mask=attentionMask,
+                max_new_tokens=128,
+                num_beams=3
+            )
+            embeddings = imageFeatures.mean(dim=1).to(torch.float32)
+        
+        captions = self._postProcess(generatedIds, images)
+        
         # Cleanup
         del inputs
-        del vision_outputs
+        del inputsEmbeds
+        del imageFeatures
+        del generatedIds
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
             
-        return embeddings.cpu().numpy().tolist()
+        return captions, embeddings.cpu().numpy()
+
+    def encodeText(self, text: str) -> np.ndarray:
+        return self.encodeTexts([text])[0]
 
-    def encodeText(self, text: str) -> list[float]:
-        inputs = self.processor(text=text, return_tensors="pt").to(self.device)
+    def encodeTexts(self, texts: List[str]) -> np.ndarray:
+        """Mean-pooled encoder states; padding is masked out, so batching doesn't change a text's embedding."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        inputs = self.processor(text=texts, return_tensors="pt", padding=True).to(self.device)
+        attentionMask = inputs.get("attention_mask")
+        if attentionMask is None:
+            attentionMask = torch.ones_like(inputs["input_ids"])
         
         with torch.no_grad():
-            outputs = self.model.model.encoder(input_ids=inputs["input_ids"], attention_mask=inputs.get("attention_mask"))
-            embeddings = outputs.last_hidden_state.mean(dim=1).squeeze(0).to(torch.float32)
+            outputs = self.model.model.encoder(input_ids=inputs["input_ids"], attention_mask=attentionMask)
+            mask = attentionMask.unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            embeddings = ((outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)).to(torch.float32)
             
-        return embeddings.cpu().numpy().tolist()
+        return embeddings.cpu().numpy()
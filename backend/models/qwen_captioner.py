@@ -2,7 +2,9 @@ from transformers import AutoModelForImageTextToText, AutoProcessor, BitsAndByte
 from transformers.utils import is_flash_attn_2_available
 from qwen_vl_utils import process_vision_info
 from PIL import Image
+from typing import List, Tuple
 import os
+import numpy as np
 import torch
 import gc
 
@@ -11,6 +13,9 @@ class QwenCaptioner:
     _model = None
     _processor = None
 
+    maxImageDim = 896
+    captionPrompt = "Describe this image in detail. Identify characters and unique features."
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(QwenCaptioner, cls).__new__(cls)
@@ -48,6 +53,8 @@ class QwenCaptioner:
         
         self.model = QwenCaptioner._model
         self.processor = QwenCaptioner._processor
+        # Batched generation needs prompts aligned on the right edge
+        self.processor.tokenizer.padding_side = "left"
         self.device = self.model.device
 
     def _preprocessImage(self, imagePath: str, maxDim: int = 1024) -> Image.Image:
@@ -56,45 +63,77 @@ class QwenCaptioner:
             img.thumbnail((maxDim, maxDim), Image.Resampling.LANCZOS)
         return img
 
-    def generateCaption(self, imagePath: str) -> str:
+    def prepareImage(self, imagePath: str) -> Image.Image:
         assert os.path.exists(imagePath), f"Path to image doesn't exist: {imagePath}"
-        
         # Load and resize image to save VRAM
-        img = self._preprocessImage(imagePath, maxDim=896)
-        
+        return self._preprocessImage(imagePath, maxDim=self.maxImageDim)
+
+    def _buildInputs(self, images: List[Image.Image], prompt: str):
         # Qwen-VL-utils process_vision_info accepts PIL images directly if we don't use file://
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": img},
-                    {"type": "text", "text": "Describe this image in detail. Identify characters and unique features."},
-                ],
-            }
+        messagesBatch = [
+            [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image", "image": img},
+                        {"type": "text", "text": prompt},
+                    ],
+                }
+            ]
+            for img in images
         ]
         
-        text = self.processor.apply_chat_template(
-            messages, tokenize=False, add_generation_prompt=True
-        )
-        imageInputs, videoInputs = process_vision_info(messages)
+        texts = [
+            self.processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+            for messages in messagesBatch
+        ]
+        imageInputs, videoInputs = process_vision_info(messagesBatch)
         inputs = self.processor(
-            text=[text],
+            text=texts,
             images=imageInputs,
             videos=videoInputs,
             padding=True,
             return_tensors="pt",
         )
-        inputs = inputs.to(self.model.device)
+        return inputs.to(self.model.device)
 
-        with torch.no_grad():
-            generatedIds = self.model.generate(**inputs, max_new_tokens=128)
-            
+    def _decodeGenerated(self, inputs, generatedIds) -> List[str]:
+        # Prompts are left padded, so every prompt occupies the same leading span of its row
         generatedIdsTrimmed = [
             outIds[len(inIds) :] for inIds, outIds in zip(inputs.input_ids, generatedIds)
         ]
-        outputText = self.processor.batch_decode(
+        return self.processor.batch_decode(
             generatedIdsTrimmed, skip_special_tokens=True, clean_up_tokenization_spaces=False
         )
+
+    def _poolVisualOutput(self, outputs, gridThw: torch.Tensor) -> torch.Tensor:
+        # Qwen3-VL returns (hidden_states, deepstack_features); older vision towers return the tensor itself
+        hiddenStates = outputs[0] if isinstance(outputs, tuple) else outputs
+        # The merged patch tokens of every image are concatenated along dim 0
+        mergeSize = getattr(self.model.visual, "spatial_merge_size", 2)
+        tokenCounts = (gridThw.prod(dim=-1) // (mergeSize ** 2)).tolist()
+        return torch.stack([
+            tokens.mean(dim=0) for tokens in torch.split(hiddenStates, tokenCounts, dim=0)
+        ]).to(torch.float32)
+
+    def generateCaption(self, imagePath: str) -> str:
+        return self.generateCaptions([imagePath])[0]
+
+    def generateCaptions(self, imagePaths: List[str]) -> List[str]:
+        if not imagePaths:
+            return []
+        return self.captionImages([self.prepareImage(imagePath) for imagePath in imagePaths])
+
+    def captionImages(self, images: List[Image.Image]) -> List[str]:
+        """Captions images that already went through prepareImage."""
+        if not images:
+            return []
+        inputs = self._buildInputs(images, self.captionPrompt)
+
+        with torch.no_grad():
+            generatedIds = self.model.generate(**inputs, max_new_tokens=128)
+            
+        outputText = self._decodeGenerated(inputs, generatedIds)
         
         # Cleanup
         del inputs
@@ -102,40 +141,20 @@ class QwenCaptioner:
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
             
-        return outputText[0]
+        return outputText
 
-    def encodeImage(self, imagePath: str) -> list[float]:
-        assert os.path.exists(imagePath), f"Path to image doesn't exist: {imagePath}"
-        
-        img = self._preprocessImage(imagePath, maxDim=896)
-        
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": img},
-                    {"type": "text", "text": "Extract features."},
-                ],
-            }
-        ]
-        
-        text = self.processor.apply_chat_template(
-            messages, tokenize=False, add_generation_prompt=True
-        )
-        imageInputs, videoInputs = process_vision_info(messages)
-        inputs = self.processor(
-            text=[text],
-            images=imageInputs,
-            videos=videoInputs,
-            padding=True,
-            return_tensors="pt",
-        )
-        inputs = inputs.to(self.model.device)
+    def encodeImage(self, imagePath: str) -> np.ndarray:
+        return self.encodeImages([imagePath])[0]
+
+    def encodeImages(self, imagePaths: List[str]) -> np.ndarray:
+        if not imagePaths:
+            return np.empty((0, 0), dtype=np.float32)
+        images = [self.prepareImage(imagePath) for imagePath in imagePaths]
+        inputs = self._buildInputs(images, "Extract features.")
         
         with torch.no_grad():
-            gridThw = getattr(inputs, "image_grid_thw", None)
-            outputs = self.model.visual(inputs.pixel_values, grid_thw=gridThw)
-            embeddings = outputs[0].mean(dim=0).to(torch.float32)
+            outputs = self.model.visual(inputs.pixel_values, grid_thw=inputs.image_grid_thw)
+            embeddings = self._poolVisualOutput(outputs, inputs.image_grid_thw)
             
         # Cleanup
         del inputs
@@ -143,14 +162,50 @@ class QwenCaptioner:
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
             
-        return embeddings.cpu().numpy().tolist()
+        return embeddings.cpu().numpy()
+
+    def captionAndEncodeImages(self, images: List[Image.Image]) -> Tuple[List[str], np.ndarray]:
+        """Captions already prepared images and pools the same vision-tower pass into their embeddings."""
+        if not images:
+            return [], np.empty((0, 0), dtype=np.float32)
+        inputs = self._buildInputs(images, self.captionPrompt)
+
+        # generate() runs the vision tower once during prefill; capture its output instead of running it again
+        visualOutputs = []
+        hook = self.model.visual.register_forward_hook(
+            lambda module, args, output: visualOutputs.append(output)
+        )
+        try:
+            with torch.no_grad():
+                generatedIds = self.model.generate(**inputs, max_new_tokens=128)
+        finally:
+            hook.remove()
+
+        captions = self._decodeGenerated(inputs, generatedIds)
+        embeddings = self._poolVisualOutput(visualOutputs[0], inputs.image_grid_thw)
+        
+        # Cleanup
+        del inputs
+        del generatedIds
+        del visualOutputs
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            
+        return captions, embeddings.cpu().numpy()
+
+    def encodeText(self, text: str) -> np.ndarray:
+        return self.encodeTexts([text])[0]
 
-    def encodeText(self, text: str) -> list[float]:
-        inputs = self.processor(text=[text], return_tensors="pt").to(self.model.device)
+    def encodeTexts(self, texts: List[str]) -> np.ndarray:
+        """Mean-pooled last hidden states; padding is masked out, so batching doesn't change a text's embedding."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        inputs = self.processor(text=texts, return_tensors="pt", padding=True).to(self.model.device)
         
         with torch.no_grad():
             outputs = self.model.model(input_ids=inputs.input_ids, attention_mask=inputs.attention_mask, output_hidden_states=True)
             lastHiddenState = outputs.last_hidden_state
-            embeddings = lastHiddenState.mean(dim=1).squeeze(0).to(torch.float32)
+            mask = inputs.attention_mask.unsqueeze(-1).to(lastHiddenState.dtype)
+            embeddings = ((lastHiddenState * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)).to(torch.float32)
             
-        return embeddings.cpu().numpy().tolist()
+        return embeddings.cpu().numpy()
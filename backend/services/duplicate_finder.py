@@ -0,0 +1,138 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from PIL import Image
+
+from backend.db.metadata_db import MetadataDB
+from backend.utils.image_hash import HASH_BITS, computePerceptualHash, hashSignMatrix
+
+# Near-duplicates differ in at most this many perceptual hash bits...
+MAX_HASH_DISTANCE = 10
+# ...and their embeddings are at least this similar (cosine)
+DUPLICATE_SIMILARITY = 0.9
+# Tiles of the all-pairs products are BLOCK_SIZE x BLOCK_SIZE, which bounds temporary memory at any library size
+BLOCK_SIZE = 2048
+# Images indexed before perceptual hashes were stored are hashed in parallel on first use
+HASH_WORKERS = 8
+
+class DuplicateFinder:
+    """
+    Finds groups of near-duplicate (or, without the hash check, merely similar) images from stored embeddings.
+    All-pairs comparison runs tile by tile over the upper triangle as float32 matrix products, so 100k images
+    take minutes rather than hours.
+    """
+
+    def __init__(self, metadataDb: Optional[MetadataDB] = None):
+        self.metadataDb = metadataDb or MetadataDB()
+
+    def findGroups(
+        self,
+        similarity: float = DUPLICATE_SIMILARITY,
+        maxHashDistance: Optional[int] = MAX_HASH_DISTANCE,
+        space: Optional[str] = None,
+        onProgress: Optional[Callable[[int, int], None]] = None
+    ) -> List[List[Path]]:
+        """
+        Groups of images (largest first) linked by pairs within maxHashDistance perceptual hash bits and at least
+        `similarity` embedding cosine; maxHashDistance=None groups on embeddings alone.
+        A group is a connected component, so members are linked through a chain of matching pairs.
+        onProgress(doneBlocks, totalBlocks) is called as the comparison advances.
+        """
+        paths, embeddings = self.metadataDb.getEmbeddingMatrix(space)
+        if len(paths) < 2:
+            return []
+        embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        hashSigns = None
+        if maxHashDistance is not None:
+            hashes, hashed = self.perceptualHashes(paths)
+            # Images that could not be hashed are left out rather than zeroed: a zero row agrees with every
+            # other row at maxHashDistance >= HASH_BITS / 2
+            paths = [p for p, h in zip(paths, hashed) if h]
+            embeddings = embeddings[hashed]
+            hashSigns = hashSignMatrix(hashes[hashed])
+        pairs = self.similarPairs(embeddings, similarity, hashSigns, maxHashDistance, onProgress = onProgress)
+        return self._components(paths, pairs)
+
+    @staticmethod
+    def similarPairs(
+        embeddings: np.ndarray,
+        similarity: float,
+        hashSigns: Optional[np.ndarray] = None,
+        maxHashDistance: Optional[int] = None,
+        blockSize: int = BLOCK_SIZE,
+        onProgress: Optional[Callable[[int, int], None]] = None
+    ) -> np.ndarray:
+        """(k, 2) row pairs i < j of L2-normalized embeddings that match; see findGroups."""
+        n = len(embeddings)
+        blocks = range(0, n, blockSize)
+        found = []
+        for done, i0 in enumerate(blocks, start = 1):
+            rows = embeddings[i0:i0 + blockSize]
+            for j0 in range(i0, n, blockSize):
+                cols = embeddings[j0:j0 + blockSize]
+                if hashSigns is not None:
+                    # Prefilter: a 64-wide product of hash bit signs rules out nearly every pair before
+                    # a single embedding is compared (agreement = 64 - 2 * Hamming distance)
+                    agreement = hashSigns[i0:i0 + blockSize] @ hashSigns[j0:j0 + blockSize].T
+                    mask = agreement >= HASH_BITS - 2 * maxHashDistance
+                    if i0 == j0:
+                        mask = np.triu(mask, 1)
+                    i, j = np.nonzero(mask)
+                    keep = np.einsum("ij,ij->i", rows[i], cols[j]) >= similarity
+                    i, j = i[keep], j[keep]
+                else:
+                    mask = rows @ cols.T >= similarity
+                    if i0 == j0:
+                        mask = np.triu(mask, 1)
+                    i, j = np.nonzero(mask)
+                if len(i):
+                    found.append(np.stack([i + i0, j + j0], axis = 1))
+            if onProgress:
+                onProgress(done, len(blocks))
+        return np.concatenate(found) if found else np.empty((0, 2), dtype = np.int64)
+
+    @staticmethod
+    def _components(paths: List[Path], pairs: np.ndarray) -> List[List[Path]]:
+        # Union-find with path halving; the pairs are few next to n^2, so plain Python is fine here
+        parent = list(range(len(paths)))
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in pairs.tolist():
+            rootA, rootB = find(a), find(b)
+            if rootA != rootB:
+                parent[max(rootA, rootB)] = min(rootA, rootB)
+
+        groups: Dict[int, List[Path]] = {}
+        for i in np.unique(pairs).tolist():
+            groups.setdefault(find(i), []).append(paths[i])
+        return sorted(groups.values(), key = len, reverse = True)
+
+    def perceptualHashes(self, paths: List[Path]) -> Tuple[np.ndarray, np.ndarray]:
+        """(int64 hashes, hashed mask) aligned with paths; missing hashes are computed and stored first."""
+        stored = self.metadataDb.getPerceptualHashes(paths)
+        missing = [p for p in paths if stored.get(p) is None]
+        if missing:
+            with ThreadPoolExecutor(max_workers=HASH_WORKERS) as executor:
+                computed = {p: h for p, h in zip(missing, executor.map(self._hashImage, missing)) if h is not None}
+            self.metadataDb.setPerceptualHashes(computed)
+            stored.update(computed)
+        hashed = np.array([stored.get(p) is not None for p in paths], dtype = bool)
+        hashes = np.array([stored.get(p) or 0 for p in paths], dtype = np.int64)
+        return hashes, hashed
+
+    @staticmethod
+    def _hashImage(path: Path) -> Optional[int]:
+        try:
+            with Image.open(path) as img:
+                # The hash only needs a 9x8 copy, so let JPEG decode at reduced scale
+                img.draft("RGB", (64, 64))
+                return computePerceptualHash(img)
+        except Exception as e:
+            print(f"Error hashing {path}: {e}")
+            return None
@@ -0,0 +1,182 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from backend.utils.constants import IMAGE_EXTENSIONS
+from backend.utils.file_utils import scanImages
+
+try:
+    # watchdog uses inotify / FSEvents / ReadDirectoryChangesW; without it folders are polled
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+# A burst of events (e.g. a large copy) is still flushed at least this often
+MAX_DEBOUNCE_DELAY = 30.0
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, record: Callable[[Path, bool], None]):
+        super().__init__()
+        self.record = record
+
+    def _isRelevant(self, event, path: str) -> bool:
+        # Directories always matter: a deleted or moved-in folder stands for every image below it
+        return event.is_directory or os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+    def on_created(self, event):
+        if self._isRelevant(event, event.src_path):
+            self.record(Path(event.src_path), True)
+
+    def on_modified(self, event):
+        if not event.is_directory and self._isRelevant(event, event.src_path):
+            self.record(Path(event.src_path), True)
+
+    def on_closed(self, event):
+        self.on_modified(event)
+
+    def on_deleted(self, event):
+        if self._isRelevant(event, event.src_path):
+            self.record(Path(event.src_path), False)
+
+    def on_moved(self, event):
+        if self._isRelevant(event, event.src_path):
+            self.record(Path(event.src_path), False)
+        if self._isRelevant(event, event.dest_path):
+            self.record(Path(event.dest_path), True)
+
+class FolderWatcher:
+    """
+    Watches folders recursively and reports debounced batches of changes as onChanges(changed, deleted).
+    Paths may be image files or directories (a created/moved-in directory is reported as changed, a removed one
+    as deleted). Uses native filesystem events when watchdog is installed, otherwise polls with scanImages.
+    """
+
+    def __init__(
+        self,
+        onChanges: Callable[[Set[Path], Set[Path]], None],
+        debounceSeconds: float = 2.0,
+        pollInterval: float = 30.0
+    ):
+        self.onChanges = onChanges
+        self.debounceSeconds = debounceSeconds
+        self.pollInterval = pollInterval
+        self.usesEvents = Observer is not None
+
+        self._lock = threading.Lock()
+        self._pending: Dict[Path, bool] = {}
+        self._firstEventAt = 0.0
+        self._lastEventAt = 0.0
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+        self._observer = None
+        self._watches: Dict[Path, object] = {}
+        # Polling fallback: last seen (mtime, size) per image, None until the first scan of a folder
+        self._snapshots: Dict[Path, Optional[Dict[Path, Tuple[int, int]]]] = {}
+
+    def watch(self, folder: Path):
+        folder = Path(folder)
+        with self._lock:
+            if folder in self._watches or folder in self._snapshots:
+                return
+            if self.usesEvents:
+                if self._observer is not None:
+                    self._watches[folder] = self._observer.schedule(_EventHandler(self._record), str(folder), recursive=True)
+                else:
+                    self._watches[folder] = None
+            else:
+                self._snapshots[folder] = None
+
+    def unwatch(self, folder: Path):
+        folder = Path(folder)
+        with self._lock:
+            watch = self._watches.pop(folder, None)
+            self._snapshots.pop(folder, None)
+        if watch is not None and self._observer is not None:
+            self._observer.unschedule(watch)
+
+    def start(self):
+        if self.usesEvents:
+            self._observer = Observer()
+            for folder in list(self._watches):
+                self._watches[folder] = self._observer.schedule(_EventHandler(self._record), str(folder), recursive=True)
+            self._observer.start()
+        else:
+            self._startThread(self._pollLoop, "FolderWatcherPoll")
+        self._startThread(self._debounceLoop, "FolderWatcherDebounce")
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _startThread(self, target: Callable, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _record(self, path: Path, exists: bool):
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                self._firstEventAt = now
+            # The latest event for a path wins (deleted then re-created is a change)
+            self._pending[path] = exists
+            self._lastEventAt = now
+        self._wakeup.set()
+
+    def _debounceLoop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Wait for the folder to go quiet, but never hold events back longer than MAX_DEBOUNCE_DELAY
+            while not self._stopped.is_set():
+                with self._lock:
+                    now = time.monotonic()
+                    quietFor = now - self._lastEventAt
+                    waitingFor = now - self._firstEventAt
+                    if not self._pending or quietFor >= self.debounceSeconds or waitingFor >= MAX_DEBOUNCE_DELAY:
+                        pending, self._pending = self._pending, {}
+                        break
+                self._stopped.wait(self.debounceSeconds - quietFor)
+            else:
+                return
+            if pending:
+                changed = {path for path, exists in pending.items() if exists}
+                deleted = {path for path, exists in pending.items() if not exists}
+                try:
+                    self.onChanges(changed, deleted)
+                except Exception as e:
+                    print(f"Error handling folder changes: {e}")
+
+    def _pollLoop(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                folders = list(self._snapshots)
+            for folder in folders:
+                current = {path: (stat.st_mtime_ns, stat.st_size) for path, stat in scanImages(folder)}
+                with self._lock:
+                    if folder not in self._snapshots:
+                        continue
+                    previous = self._snapshots[folder]
+                    self._snapshots[folder] = current
+                # The first scan of a folder is only a baseline
+                if previous is None:
+                    continue
+                for path, signature in current.items():
+                    if previous.get(path) != signature:
+                        self._record(path, True)
+                for path in previous.keys() - current.keys():
+                    self._record(path, False)
+            self._stopped.wait(self.pollInterval)
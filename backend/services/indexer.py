@@ -1,31 +1,44 @@
 import os
+import threading
 from pathlib import Path
-from typing import List
-import spacy
+from typing import Dict, List, Optional, Tuple
 
 from backend.db.metadata_db import MetadataDB
-from backend.db.vector_db import VectorDB
+from backend.db.vector_db import openVectorDb, vectorSpaceName, listVectorSpaces, listModelSpaces
 from backend.services.model_factory import ModelFactory
+from backend.services.thumbnail_store import ThumbnailStore
+from backend.utils.data_classes import FileState, PreparedImage, IndexedImage
+from backend.utils.file_utils import getFileState
+from backend.utils.image_hash import computePerceptualHash
 
 class Indexer:
     def __init__(self):
         self.modelFactory = ModelFactory()
         self.metadataDb = MetadataDB()
-        self.vectorDb = VectorDB()
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except:
-            self.nlp = None
+        self.thumbnails = ThumbnailStore()
+        self._nlp = None
+        self._nlpLoaded = False
+        self._nlpLock = threading.Lock()
 
     @property
     def model(self):
         return self.modelFactory.getActiveModel()
+
+    @property
+    def nlp(self):
+        # spaCy takes seconds to import and load, and is only needed once captions come back from the model
+        with self._nlpLock:
+            if not self._nlpLoaded:
+                try:
+                    import spacy
+                    self._nlp = spacy.load("en_core_web_sm")
+                except Exception as e:
+                    print(f"Error loading spaCy, tags fall back to caption words: {e}")
+                    self._nlp = None
+                self._nlpLoaded = True
+            return self._nlp
                 
-    def extractTags(self, caption: str) -> List[str]:
-        if not self.nlp:
-            return list(set(caption.lower().replace(".", "").split()))
-            
-        doc = self.nlp(caption)
+    def _tagsFromDoc(self, doc) -> List[str]:
         tags = []
         for token in doc:
             if token.pos_ in ["NOUN", "PROPN", "ADJ"] and not token.is_stop and token.is_alpha:
@@ -33,17 +46,172 @@ class Indexer:
         
         return list(set(tags))
 
-    def indexImage(self, path: Path):
-        caption = self.model.generateCaption(str(path))
-        tags = self.extractTags(caption)
-        
-        embedding = self.model.encodeImage(str(path))
-        self.metadataDb.addImage(path, tags, embedding)
-        self.vectorDb.addEmbedding(
-            str(path), 
-            embedding
+    def extractTags(self, caption: str) -> List[str]:
+        nlp = self.nlp
+        if not nlp:
+            return list(set(caption.lower().replace(".", "").split()))
+            
+        return self._tagsFromDoc(nlp(caption))
+
+    def extractTagsBatch(self, captions: List[str]) -> List[List[str]]:
+        nlp = self.nlp
+        if not nlp:
+            return [self.extractTags(caption) for caption in captions]
+        return [self._tagsFromDoc(doc) for doc in nlp.pipe(captions)]
+
+    def prepareImage(
+        self,
+        path: Path,
+        fileState: Optional[FileState] = None,
+        model = None
+    ) -> PreparedImage:
+        """Decodes and resizes an image for the model, and thumbnails it; safe to call from worker threads."""
+        if fileState is None or fileState.contentHash is None:
+            fileState = getFileState(path)
+        model = model or self.model
+        image = model.prepareImage(str(path))
+        try:
+            # The model's downscaled copy is far cheaper to thumbnail and hash than the original
+            self.thumbnails.put(fileState.contentHash, image)
+        except Exception as e:
+            print(f"Error creating thumbnail for {path}: {e}")
+        return PreparedImage(
+            path = path,
+            image = image,
+            fileState = fileState,
+            perceptualHash = computePerceptualHash(image)
         )
 
+    def processBatch(self, prepared: List[PreparedImage]) -> List[IndexedImage]:
+        """Captions and embeds prepared images; a captioner that also embeds shares one vision pass for both."""
+        if not prepared:
+            return []
+        model = self.model
+        embedder = self.modelFactory.getEmbeddingModel()
+        modelName = self.modelFactory.getEmbeddingModelName()
+        images = [p.image for p in prepared]
+        if embedder is model:
+            captions, embeddings = model.captionAndEncodeImages(images)
+        else:
+            captions = model.captionImages(images)
+            embeddings = embedder.encodeImages(images)
+        tagsList = self.extractTagsBatch(captions)
+        return [
+            IndexedImage(
+                path = p.path,
+                caption = caption,
+                tags = tags,
+                embedding = embedding,
+                fileState = p.fileState,
+                embeddingSpace = vectorSpaceName(modelName, len(embedding)),
+                perceptualHash = p.perceptualHash
+            )
+            for p, caption, tags, embedding in zip(prepared, captions, tagsList, embeddings)
+        ]
+
+    def persistBatch(self, records: List[IndexedImage]):
+        previousHashes = self.metadataDb.getContentHashes([record.path for record in records])
+        self.metadataDb.addImages(records)
+        self._discardStaleThumbnails(previousHashes.values())
+        bySpace = {}
+        for record in records:
+            bySpace.setdefault(record.embeddingSpace, []).append(record)
+        for space, spaceRecords in bySpace.items():
+            openVectorDb(space).addEmbeddings(
+                [str(record.path) for record in spaceRecords],
+                [record.embedding for record in spaceRecords]
+            )
+
+    def reuseIndexed(self, path: Path, fileState: Optional[FileState]) -> bool:
+        """
+        Indexes an image from an already indexed copy of the same bytes instead of running the model.
+        A copy whose file is gone was moved or renamed, so its row is relinked to the new path instead.
+        Returns False when there is nothing to reuse.
+        """
+        if fileState is None or not fileState.contentHash:
+            return False
+        copies = [copy for copy in self.metadataDb.getImagesByContentHash(fileState.contentHash) if copy.path != path]
+        for copy in copies:
+            # Another worker may have relinked the same row to its own copy first; then this path reuses it instead
+            if not copy.path.exists() and self.relinkImages({copy.path: (path, fileState)}):
+                return True
+        # The stored embedding is only reusable if it came from the active embedding model
+        modelName = self.modelFactory.getEmbeddingModelName()
+        for copy in copies:
+            if copy.embedding is not None and copy.embeddingSpace == vectorSpaceName(modelName, len(copy.embedding)):
+                self.persistBatch([IndexedImage(
+                    path = path,
+                    caption = copy.caption,
+                    tags = copy.tags,
+                    embedding = copy.embedding,
+                    fileState = fileState,
+                    embeddingSpace = copy.embeddingSpace,
+                    perceptualHash = copy.perceptualHash
+                )])
+                return True
+        return False
+
+    def relinkImages(self, moves: Dict[Path, Tuple[Path, FileState]]) -> int:
+        """
+        Moves indexed images to their new paths ({oldPath: (newPath, fileState)}) without re-indexing them.
+        Returns how many were moved.
+        """
+        previousHashes = self.metadataDb.getContentHashes([new for new, _ in moves.values()])
+        moved = self.metadataDb.relinkImages(moves)
+        if not moved:
+            return 0
+        self._discardStaleThumbnails(previousHashes.values())
+        renames = {str(old): str(new) for old, (new, _) in moves.items()}
+        for space in listVectorSpaces():
+            openVectorDb(space).renameIds(renames)
+        return moved
+
+    def missingFromActiveSpace(self, paths: List[Path]) -> List[Path]:
+        """Paths that have no vector yet for the active embedding model, e.g. after switching models."""
+        if not paths:
+            return []
+        ids = [str(path) for path in paths]
+        missing = set(ids)
+        for space in listModelSpaces(self.modelFactory.getEmbeddingModelName()):
+            missing &= openVectorDb(space).missingIds(ids)
+        return [path for path in paths if str(path) in missing]
+
+    def indexImage(self, path: Path, fileState: Optional[FileState] = None):
+        self.indexBatch([path], [fileState])
+
+    def indexBatch(
+        self,
+        paths: List[Path],
+        fileStates: Optional[List[Optional[FileState]]] = None
+    ):
+        """Indexes several images synchronously; large jobs should go through IndexingPipeline instead."""
+        if not paths:
+            return
+        if fileStates is None:
+            fileStates = [None] * len(paths)
+        items = [
+            (path, state if state and state.contentHash else getFileState(path))
+            for path, state in zip(paths, fileStates)
+        ]
+        items = [(path, state) for path, state in items if not self.reuseIndexed(path, state)]
+        if not items:
+            return
+        model = self.model
+        prepared = [self.prepareImage(path, state, model) for path, state in items]
+        self.persistBatch(self.processBatch(prepared))
+
     def removeImage(self, path: Path):
-        self.metadataDb.removeImage(path)
-        self.vectorDb.removeEmbedding(str(path))
\ No newline at end of file
+        self.removeImages([path])
+
+    def removeImages(self, paths: List[Path]):
+        previousHashes = self.metadataDb.getContentHashes(paths)
+        self.metadataDb.removeImages(paths)
+        self._discardStaleThumbnails(previousHashes.values())
+        # An image may have been embedded by several models
+        ids = [str(path) for path in paths]
+        for space in listVectorSpaces():
+            openVectorDb(space).removeEmbeddings(ids)
+
+    def _discardStaleThumbnails(self, contentHashes):
+        # Content that changed or was removed leaves a thumbnail no other image may share
+        self.thumbnails.discard(self.metadataDb.unreferencedHashes(contentHashes))
@@ -1,7 +1,34 @@
 import asyncio
+import os
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Callable, Optional, Dict
+from typing import List, Callable, Optional, Dict, Iterator, Set, Tuple
+from backend.services.folder_watcher import FolderWatcher
 from backend.services.indexer import Indexer
+from backend.services.indexing_pipeline import IndexingPipeline
+from backend.services.settings_manager import SettingsManager
+from backend.utils.constants import IMAGE_EXTENSIONS
+from backend.utils.data_classes import FileState
+from backend.utils.file_utils import getFileState, computeContentHash, scanImages
+
+# Removals are committed in chunks so progress still moves on very large folders
+REMOVE_CHUNK_SIZE = 500
+# Unchanged files are checked against the active vector index this many at a time
+COVERAGE_CHUNK_SIZE = 1000
+# The scan reports its discovered count this often even when nothing needs indexing
+STATUS_EVERY = 500
+
+@dataclass
+class SyncCounts:
+    discovered: int = 0
+    queued: int = 0
+    indexed: int = 0
+    unchanged: int = 0
+    scanDone: bool = False
+    reused: int = 0
+    removed: int = 0
+    failed: int = 0
 
 class IndexingManager:
     _instance = None
@@ -13,8 +40,15 @@ class IndexingManager:
             cls._instance._progress = 0.0
             cls._instance._status = "Ready"
             cls._instance._currentFolder = None
+            cls._instance._lastError = None
+            cls._instance._lastSync = None
             cls._instance._subscribers = []
             cls._instance._indexer = Indexer()
+            cls._instance._settings = SettingsManager()
+            cls._instance._watcher = None
+            cls._instance._loop = None
+            cls._instance._pendingLock = threading.Lock()
+            cls._instance._pendingChanges = {}
         return cls._instance
 
     @property
@@ -33,6 +67,20 @@ class IndexingManager:
     def currentFolder(self) -> Optional[str]:
         return self._currentFolder
 
+    @property
+    def isWatching(self) -> bool:
+        return self._watcher is not None
+
+    @property
+    def lastError(self) -> Optional[str]:
+        """Error that ended the last sync or unindex, None if it succeeded."""
+        return self._lastError
+
+    @property
+    def lastSync(self) -> Optional[SyncCounts]:
+        """Counts of the last completed sync or unindex."""
+        return self._lastSync
+
     def subscribe(self, callback: Callable):
         if callback not in self._subscribers:
             self._subscribers.append(callback)
@@ -64,6 +112,8 @@ class IndexingManager:
         self._isIndexing = True
         self._status = f"Unindexing {folderPath}..."
         self._progress = 0.0
+        self._lastError = None
+        self._lastSync = None
         self.notifySubscribers()
         
         try:
@@ -71,18 +121,91 @@ class IndexingManager:
             total = len(imagesInDb)
             if total == 0:
                 self._status = "No images found in index for this folder"
+                self._lastSync = SyncCounts()
                 return
 
-            for i, img in enumerate(imagesInDb, start=1):
-                self._indexer.removeImage(img.path)
-                self._progress = i / total
+            paths = [img.path for img in imagesInDb]
+            for start in range(0, total, REMOVE_CHUNK_SIZE):
+                chunk = paths[start:start + REMOVE_CHUNK_SIZE]
+                await asyncio.to_thread(self._indexer.removeImages, chunk)
+                self._progress = (start + len(chunk)) / total
                 self.notifySubscribers()
             self._status = "Unindexing complete"
+            self._lastSync = SyncCounts(removed = total)
         except Exception as e:
             self._status = f"Error: {str(e)}"
+            self._lastError = str(e)
         finally:
+            self._forgetFolder(folderPath)
             self._isIndexing = False
             self.notifySubscribers()
+            self._scheduleWatchedChanges()
+
+    def _syncItems(
+        self,
+        folder: Path,
+        inDb: Dict[Path, Optional[FileState]],
+        counts: SyncCounts
+    ) -> Iterator[Tuple[Path, FileState]]:
+        """
+        Streams the folder scan into (path, fileState) items that need indexing, while the scan is still running.
+        Every path seen is popped from inDb, so what remains afterwards has disappeared from disk.
+        """
+        refreshed: Dict[Path, FileState] = {}
+        known: List[Tuple[Path, FileState]] = []
+
+        for path, stat in scanImages(folder, workers=self._settings.scanWorkers):
+            counts.discovered += 1
+            state = getFileState(path, stat, withHash=False)
+            if path not in inDb:
+                counts.queued += 1
+                yield path, state
+            else:
+                stored = inDb.pop(path)
+                if stored is not None and stored.sameStat(state):
+                    state.contentHash = stored.contentHash
+                else:
+                    # mtime/size moved (or the row predates change tracking): only a content change means re-indexing
+                    state.contentHash = computeContentHash(path)
+                    if stored is not None and state.contentHash != stored.contentHash:
+                        counts.queued += 1
+                        yield path, state
+                        continue
+                    refreshed[path] = state
+                known.append((path, state))
+                if len(known) >= COVERAGE_CHUNK_SIZE:
+                    yield from self._uncoveredItems(known, refreshed, counts)
+            if counts.discovered % STATUS_EVERY == 0:
+                self._reportSync(counts)
+
+        yield from self._uncoveredItems(known, refreshed, counts)
+        counts.scanDone = True
+        self._reportSync(counts)
+
+    def _uncoveredItems(
+        self,
+        known: List[Tuple[Path, FileState]],
+        refreshed: Dict[Path, FileState],
+        counts: SyncCounts
+    ) -> Iterator[Tuple[Path, FileState]]:
+        """Stores refreshed stats, then yields unchanged files the active model has no vector for yet (model switch)."""
+        self._indexer.metadataDb.updateFileStates(refreshed)
+        refreshed.clear()
+        missing = set(self._indexer.missingFromActiveSpace([path for path, _ in known]))
+        for path, state in known:
+            if path in missing:
+                counts.queued += 1
+                yield path, state
+            else:
+                counts.unchanged += 1
+        known.clear()
+
+    def _reportSync(self, counts: SyncCounts, lastPath: Optional[Path] = None):
+        found = f"{counts.discovered} images found" + ("" if counts.scanDone else ", scanning...")
+        current = f": {lastPath.name}" if lastPath else ""
+        self._status = f"Indexing {counts.indexed}/{counts.queued}{current} ({found})"
+        self._progress = counts.indexed / counts.queued if counts.queued else 0.0
+        self.notifySubscribers()
 
     async def startIndexing(self, folderPath: str):
         """Syncs the folder: adds new images, updates changed ones, removes missing ones."""
@@ -93,59 +216,174 @@ class IndexingManager:
         self._currentFolder = folderPath
         self._progress = 0.0
         self._status = "Scanning folder..."
+        self._lastError = None
+        self._lastSync = None
         self.notifySubscribers()
+        self._rememberFolder(folderPath)
 
         try:
-            folder = Path(folderPath)
-            from backend.utils.constants import IMAGE_EXTENSIONS
-            imageExts = set(IMAGE_EXTENSIONS)
-            
-            # 1. Scan disk
-            onDiskPaths = {p for p in folder.rglob("*") if p.suffix.lower() in imageExts}
-            
-            # 2. Query DB for existing images in this folder
-            inDbResults = self._indexer.metadataDb.getImagesInFolder(folderPath)
-            inDbPaths = {res.path for res in inDbResults}
-            
-            # 3. Determine work
-            toAdd = onDiskPaths - inDbPaths
-            toRemove = inDbPaths - onDiskPaths
-            
-            # We treat all "on disk" as things to process (to ensure 'update' works)
-            toProcess = list(onDiskPaths) 
-            totalWork = len(toProcess) + len(toRemove)
-            
-            if totalWork == 0:
-                self._status = "Folder already up to date"
-                self._isIndexing = False
-                self.notifySubscribers()
-                return
+            inDb = await asyncio.to_thread(self._indexer.metadataDb.getFileStatesInFolder, folderPath)
+            counts = SyncCounts()
 
-            processedCount = 0
+            # Scanning, change detection, decoding, inference and writes all overlap in the pipeline
+            def onProgress(done: int, lastPath: Path):
+                counts.indexed = done
+                self._reportSync(counts, lastPath)
 
-            # Step A: Remove missing images
-            for i, path in enumerate(toRemove, start=1):
-                self._status = f"Removing missing: {path.name}"
-                self.notifySubscribers()
-                await asyncio.to_thread(self._indexer.removeImage, path)
-                processedCount += 1
-                self._progress = processedCount / totalWork
-                self.notifySubscribers()
+            pipeline = IndexingPipeline(self._indexer)
+            stats = await asyncio.to_thread(pipeline.run, self._syncItems(Path(folderPath), inDb, counts), onProgress)
 
-            # Step B: Index/Re-index active images
-            for i, img in enumerate(toProcess, start=1):
-                self._status = f"Indexing {i}/{len(toProcess)}: {img.name}"
+            # Whatever the scan did not pop is gone from disk, unless the pipeline relinked it to a new path
+            toRemove = list(await asyncio.to_thread(self._indexer.metadataDb.getFileStates, inDb))
+            for start in range(0, len(toRemove), REMOVE_CHUNK_SIZE):
+                chunk = toRemove[start:start + REMOVE_CHUNK_SIZE]
+                self._status = f"Removing missing: {start + len(chunk)}/{len(toRemove)}"
+                self._progress = (start + len(chunk)) / len(toRemove)
                 self.notifySubscribers()
-                
-                await asyncio.to_thread(self._indexer.indexImage, img)
-                
-                processedCount += 1
-                self._progress = processedCount / totalWork
+                await asyncio.to_thread(self._indexer.removeImages, chunk)
+
+            counts.indexed, counts.reused, counts.failed = stats.indexed, stats.reused, stats.failed
+            counts.removed = len(toRemove)
+            if stats.done == 0 and not toRemove:
+                self._status = "Folder already up to date"
+            else:
+                self._status = (
+                    f"Sync complete! {counts.indexed} indexed, {counts.reused} reused, {counts.unchanged} unchanged, "
+                    f"{counts.removed} removed" + (f", {counts.failed} failed." if counts.failed else ".")
+                )
+            self._progress = 1.0
+            self._lastSync = counts
+        except Exception as e:
+            self._status = f"Error: {str(e)}"
+            self._lastError = str(e)
+        finally:
+            self._isIndexing = False
+            self.notifySubscribers()
+            self._scheduleWatchedChanges()
+
+    def _rememberFolder(self, folderPath: str):
+        folder = str(Path(folderPath))
+        folders = self._settings.managedFolders
+        if folder not in folders:
+            self._settings.managedFolders = folders + [folder]
+        if self._watcher:
+            self._watcher.watch(Path(folder))
+
+    def _forgetFolder(self, folderPath: str):
+        folder = str(Path(folderPath))
+        folders = self._settings.managedFolders
+        if folder in folders:
+            self._settings.managedFolders = [f for f in folders if f != folder]
+            if self._watcher:
+                self._watcher.unwatch(Path(folder))
+
+    def startWatching(self):
+        """Keeps every managed folder indexed from filesystem events; call from the UI's event loop."""
+        if self._watcher:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._watcher = FolderWatcher(
+            self._onFolderChanges,
+            debounceSeconds = self._settings.watchDebounceSeconds,
+            pollInterval = self._settings.watchPollSeconds
+        )
+        for folder in self._settings.managedFolders:
+            self._watcher.watch(Path(folder))
+        self._watcher.start()
+        self.notifySubscribers()
+
+    def stopWatching(self):
+        if not self._watcher:
+            return
+        watcher, self._watcher = self._watcher, None
+        watcher.stop()
+        self.notifySubscribers()
+
+    def _onFolderChanges(self, changed: Set[Path], deleted: Set[Path]):
+        # Runs on the watcher thread; the work itself is queued onto the event loop
+        with self._pendingLock:
+            for path in deleted:
+                self._pendingChanges[path] = False
+            for path in changed:
+                self._pendingChanges[path] = True
+        self._loop.call_soon_threadsafe(self._scheduleWatchedChanges)
+
+    def _scheduleWatchedChanges(self):
+        if self._watcher and self._pendingChanges and not self._isIndexing:
+            asyncio.ensure_future(self.applyWatchedChanges(), loop=self._loop)
+
+    def _resolveWatchedChanges(
+        self,
+        changes: Dict[Path, bool]
+    ) -> Tuple[List[Path], List[Tuple[Path, FileState]]]:
+        """Turns raw watcher paths into (paths to remove, (path, fileState) items to index)."""
+        imageExts = set(IMAGE_EXTENSIONS)
+        toRemove: Set[Path] = set()
+        candidates: Dict[Path, os.stat_result] = {}
+        for path, exists in changes.items():
+            if exists and path.is_dir():
+                candidates.update(scanImages(path, workers=self._settings.scanWorkers))
+            elif exists and path.suffix.lower() in imageExts:
+                try:
+                    candidates[path] = os.stat(path)
+                except OSError:
+                    toRemove.add(path)
+            elif not path.exists():
+                if path.suffix.lower() in imageExts:
+                    toRemove.add(path)
+                else:
+                    # A removed directory takes all of its indexed images with it
+                    toRemove.update(r.path for r in self._indexer.metadataDb.getImagesInFolder(str(path)))
+
+        stored = self._indexer.metadataDb.getFileStates(candidates)
+        toIndex, refreshed = [], {}
+        for path, stat in candidates.items():
+            state = getFileState(path, stat, withHash=False)
+            previous = stored.get(path)
+            if previous is not None and previous.sameStat(state):
+                continue
+            state.contentHash = computeContentHash(path)
+            if previous is not None and previous.contentHash == state.contentHash:
+                refreshed[path] = state
+            else:
+                toIndex.append((path, state))
+        self._indexer.metadataDb.updateFileStates(refreshed)
+        return sorted(toRemove), toIndex
+
+    async def applyWatchedChanges(self):
+        """Incrementally indexes whatever the watcher reported since the last run."""
+        if self._isIndexing:
+            return
+        with self._pendingLock:
+            changes, self._pendingChanges = self._pendingChanges, {}
+        if not changes:
+            return
+
+        self._isIndexing = True
+        self._currentFolder = None
+        self._progress = 0.0
+        self._status = f"Checking {len(changes)} changed paths..."
+        self.notifySubscribers()
+        try:
+            toRemove, toIndex = await asyncio.to_thread(self._resolveWatchedChanges, changes)
+
+            def onProgress(done: int, lastPath: Path):
+                self._status = f"Indexing changes {done}/{len(toIndex)}: {lastPath.name}"
+                self._progress = done / len(toIndex)
                 self.notifySubscribers()
 
-            self._status = f"Sync complete! {len(toProcess)} active, {len(toRemove)} removed."
+            # Indexing goes first so a moved file is relinked before its old path would be removed
+            stats = await asyncio.to_thread(IndexingPipeline(self._indexer).run, toIndex, onProgress)
+            toRemove = list(await asyncio.to_thread(self._indexer.metadataDb.getFileStates, toRemove))
+            for start in range(0, len(toRemove), REMOVE_CHUNK_SIZE):
+                await asyncio.to_thread(self._indexer.removeImages, toRemove[start:start + REMOVE_CHUNK_SIZE])
+            self._status = (
+                f"Watching folders. Last update: {stats.indexed} indexed, {stats.reused} reused, {len(toRemove)} removed."
+            )
+            self._progress = 1.0
         except Exception as e:
             self._status = f"Error: {str(e)}"
         finally:
             self._isIndexing = False
             self.notifySubscribers()
+            self._scheduleWatchedChanges()
@@ -0,0 +1,210 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from backend.services.indexer import Indexer
+from backend.services.settings_manager import SettingsManager
+from backend.utils.data_classes import FileState, PreparedImage, IndexedImage
+from backend.utils.file_utils import getFileState, computeContentHash
+
+_END = object()
+# Decode-stage outcomes for items that never reach the model
+_REUSED = object()
+_DEFERRED = object()
+
+@dataclass
+class PipelineStats:
+    indexed: int = 0
+    # Duplicates and moved files that took an existing image's results instead of going through the model
+    reused: int = 0
+    failed: int = 0
+
+    @property
+    def done(self) -> int:
+        return self.indexed + self.reused + self.failed
+
+class IndexingPipeline:
+    """
+    Three-stage indexing pipeline:
+    decode workers -> (bounded queue) -> model batches -> (bounded queue) -> bulk writer.
+    Decoding and writing overlap with inference so the model never waits on disk or PIL.
+    """
+
+    def __init__(
+        self,
+        indexer: Indexer,
+        batchSize: Optional[int] = None,
+        decodeWorkers: Optional[int] = None,
+        decodeQueueSize: Optional[int] = None,
+        writeQueueSize: Optional[int] = None
+    ):
+        settings = SettingsManager()
+        self.indexer = indexer
+        self.batchSize = batchSize or settings.indexBatchSize
+        self.decodeWorkers = decodeWorkers or settings.decodeWorkers
+        self.decodeQueueSize = decodeQueueSize or settings.decodeQueueSize
+        self.writeQueueSize = writeQueueSize or settings.writeQueueSize
+
+    def run(
+        self,
+        items: Iterable[Tuple[Path, Optional[FileState]]],
+        onProgress: Optional[Callable[[int, Path], None]] = None
+    ) -> PipelineStats:
+        """Indexes (path, fileState) items, calling onProgress(doneCount, lastPath) after each write."""
+        stats = PipelineStats()
+        # Copies of content first seen in this run wait for a later pass, by which time they can reuse it
+        while items:
+            items = self._runPass(items, onProgress, stats)
+        return stats
+
+    def _prepare(
+        self,
+        path: Path,
+        state: Optional[FileState],
+        model,
+        claim: Callable[[str], bool]
+    ):
+        """Decode stage: hashes the file, then reuses an indexed copy of it or prepares it for the model."""
+        if state is None:
+            state = getFileState(path)
+        elif state.contentHash is None:
+            state.contentHash = computeContentHash(path)
+        try:
+            if self.indexer.reuseIndexed(path, state):
+                return _REUSED
+        except Exception as e:
+            print(f"Error reusing indexed copy for {path}: {e}")
+        # Only one copy of each content goes through the model per pass
+        if not claim(state.contentHash):
+            return _DEFERRED
+        return self.indexer.prepareImage(path, state, model)
+
+    def _runPass(
+        self,
+        items: Iterable[Tuple[Path, Optional[FileState]]],
+        onProgress: Optional[Callable[[int, Path], None]],
+        stats: PipelineStats
+    ) -> List[Tuple[Path, Optional[FileState]]]:
+        """One pass over the items; returns the ones deferred because the same content was already in flight."""
+        deferred: List[Tuple[Path, Optional[FileState]]] = []
+        decodeQueue: "queue.Queue" = queue.Queue(maxsize=self.decodeQueueSize)
+        writeQueue: "queue.Queue" = queue.Queue(maxsize=self.writeQueueSize)
+        errors: List[BaseException] = []
+        stopEvent = threading.Event()
+        inFlight: Set[str] = set()
+        inFlightLock = threading.Lock()
+
+        def claim(contentHash: str) -> bool:
+            with inFlightLock:
+                if contentHash in inFlight:
+                    return False
+                inFlight.add(contentHash)
+                return True
+
+        def feed(executor: ThreadPoolExecutor):
+            # Futures are queued in submission order; the bounded queue caps how far decoding runs ahead
+            try:
+                model = None
+                for path, state in items:
+                    if stopEvent.is_set():
+                        break
+                    # Loaded on the first item, so a sync with nothing to index never loads the model
+                    if model is None:
+                        model = self.indexer.model
+                    decodeQueue.put((path, state, executor.submit(self._prepare, path, state, model, claim)))
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                decodeQueue.put(_END)
+
+        def write():
+            while True:
+                records = writeQueue.get()
+                if records is _END:
+                    return
+                if errors:
+                    # Keep draining after a failure so the model stage never blocks on a full queue
+                    continue
+                # Coalesce whatever else is already waiting into one bulk write
+                finished = False
+                while not finished:
+                    try:
+                        more = writeQueue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is _END:
+                        finished = True
+                    else:
+                        records.extend(more)
+                try:
+                    self.indexer.persistBatch(records)
+                    stats.indexed += len(records)
+                    if onProgress:
+                        onProgress(stats.done, records[-1].path)
+                except BaseException as e:
+                    errors.append(e)
+                    stopEvent.set()
+                if finished:
+                    return
+
+        writer = threading.Thread(target=write, name="IndexingPipelineWriter", daemon=True)
+        writer.start()
+
+        with ThreadPoolExecutor(max_workers=self.decodeWorkers, thread_name_prefix="IndexingDecode") as executor:
+            feeder = threading.Thread(target=feed, args=(executor,), name="IndexingPipelineFeeder", daemon=True)
+            feeder.start()
+            try:
+                batch: List[PreparedImage] = []
+                while True:
+                    entry = decodeQueue.get()
+                    if entry is not _END:
+                        path, state, future = entry
+                        prepared = self._resolve(path, future)
+                        if prepared is None:
+                            stats.failed += 1
+                        elif prepared is _REUSED:
+                            stats.reused += 1
+                            if onProgress:
+                                onProgress(stats.done, path)
+                        elif prepared is _DEFERRED:
+                            deferred.append((path, state))
+                        else:
+                            batch.append(prepared)
+                    if batch and (len(batch) >= self.batchSize or entry is _END):
+                        self._runModel(batch, writeQueue, stats)
+                        batch = []
+                    if entry is _END or stopEvent.is_set():
+                        break
+            finally:
+                stopEvent.set()
+                # Unblock the feeder if it is waiting on a full queue
+                while feeder.is_alive():
+                    try:
+                        decodeQueue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                writeQueue.put(_END)
+                writer.join()
+
+        if errors:
+            raise errors[0]
+        return deferred
+
+    def _resolve(self, path: Path, future: Future):
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            return None
+
+    def _runModel(self, batch: List[PreparedImage], writeQueue: "queue.Queue", stats: PipelineStats):
+        try:
+            records: List[IndexedImage] = self.indexer.processBatch(batch)
+        except Exception as e:
+            print(f"Error indexing batch starting at {batch[0].path}: {e}")
+            stats.failed += len(batch)
+            return
+        writeQueue.put(records)
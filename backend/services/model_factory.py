@@ -1,8 +1,18 @@
-import torch
 import gc
+import sys
+import threading
 from backend.services.settings_manager import SettingsManager
-from backend.models.qwen_captioner import QwenCaptioner
-from backend.models.florence_captioner import FlorenceCaptioner
+
+# "Captioner" embeds with the active vision model itself; the others are dedicated embedding models
+CAPTIONER_EMBEDDINGS = "Captioner"
+# Same as ClipEmbedder.modelName, spelled out so naming models doesn't import torch
+CLIP_EMBEDDINGS = "CLIP-ViT-B-32"
+EMBEDDING_MODELS = [CAPTIONER_EMBEDDINGS, CLIP_EMBEDDINGS]
+# Model modules pull in torch/transformers, so they are only imported when a model is first needed
+CAPTIONER_CLASSES = (
+    ("backend.models.qwen_captioner", "QwenCaptioner"),
+    ("backend.models.florence_captioner", "FlorenceCaptioner"),
+)
 
 class ModelFactory:
     _instance = None
@@ -13,40 +23,74 @@ class ModelFactory:
         if cls._instance is None:
             cls._instance = super(ModelFactory, cls).__new__(cls)
             cls._instance.settings = SettingsManager()
+            # Searches and indexing can ask for a model at the same time; it must only be loaded once
+            cls._instance._lock = threading.RLock()
         return cls._instance
 
     def getActiveModel(self):
-        currentSetting = self.settings.activeModel
-        
-        # If we already have the right model loaded, return it
-        if self._loadedModelName == currentSetting and self._activeModelInstance is not None:
+        with self._lock:
+            currentSetting = self.settings.activeModel
+
+            # If we already have the right model loaded, return it
+            if self._loadedModelName == currentSetting and self._activeModelInstance is not None:
+                return self._activeModelInstance
+
+            # Otherwise, unload previous if exists
+            self.unloadModels()
+
+            # Load new
+            if currentSetting == "Florence-2-Base":
+                from backend.models.florence_captioner import FlorenceCaptioner
+                self._activeModelInstance = FlorenceCaptioner()
+            else:
+                from backend.models.qwen_captioner import QwenCaptioner
+                self._activeModelInstance = QwenCaptioner()
+
+            self._loadedModelName = currentSetting
             return self._activeModelInstance
-            
-        # Otherwise, unload previous if exists
-        self.unloadModels()
-        
-        # Load new
-        if currentSetting == "Florence-2-Base":
-            self._activeModelInstance = FlorenceCaptioner()
-        else:
-            self._activeModelInstance = QwenCaptioner()
-            
-        self._loadedModelName = currentSetting
-        return self._activeModelInstance
+
+    def isEmbeddingModelLoaded(self) -> bool:
+        """Whether getEmbeddingModel() returns without loading weights first."""
+        if self.usesCaptionerEmbeddings():
+            return self._loadedModelName == self.settings.activeModel and self._activeModelInstance is not None
+        clipModule = sys.modules.get("backend.models.clip_embedder")
+        return clipModule is not None and clipModule.ClipEmbedder._model is not None
 
     def unloadModels(self):
-        # This is a bit tricky with singletons, but we can try to clear class-level references
-        QwenCaptioner._model = None
-        QwenCaptioner._processor = None
-        FlorenceCaptioner._model = None
-        FlorenceCaptioner._processor = None
-        
-        self._activeModelInstance = None
-        self._loadedModelName = None
-        
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-        gc.collect()
+        with self._lock:
+            # This is a bit tricky with singletons, but we can try to clear class-level references.
+            # A captioner module that was never imported has nothing loaded.
+            for moduleName, className in CAPTIONER_CLASSES:
+                module = sys.modules.get(moduleName)
+                if module is not None:
+                    captioner = getattr(module, className)
+                    captioner._model = None
+                    captioner._processor = None
+
+            self._activeModelInstance = None
+            self._loadedModelName = None
+
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            gc.collect()
             
     def getModelName(self):
         return self.settings.activeModel
+
+    def usesCaptionerEmbeddings(self) -> bool:
+        return self.settings.embeddingModel != CLIP_EMBEDDINGS
+
+    def getEmbeddingModel(self):
+        """The model that embeds images and queries for semantic search."""
+        if self.usesCaptionerEmbeddings():
+            return self.getActiveModel()
+        from backend.models.clip_embedder import ClipEmbedder
+        with self._lock:
+            return ClipEmbedder()
+
+    def getEmbeddingModelName(self):
+        # Names the embedding space, so each embedder keeps its own vector index
+        if self.usesCaptionerEmbeddings():
+            return self.getModelName()
+        return CLIP_EMBEDDINGS
@@ -0,0 +1,73 @@
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# Most queries one forward pass encodes together
+DEFAULT_MAX_BATCH_SIZE = 32
+# How long the first query of a batch waits for company; small next to a text forward pass
+DEFAULT_MAX_DELAY = 0.005
+
+class QueryBatcher:
+    """
+    Micro-batches concurrent query encodings: callers await encode(text), and a single worker task hands
+    everything queued to encodeBatch(texts) in one call on a worker thread. Queries arriving while the model
+    is busy form the next batch, so under load batches grow by themselves and the model never runs twice at once.
+    """
+
+    def __init__(
+        self,
+        encodeBatch: Callable[[List[str]], List[np.ndarray]],
+        maxBatchSize: int = DEFAULT_MAX_BATCH_SIZE,
+        maxDelay: float = DEFAULT_MAX_DELAY
+    ):
+        self.encodeBatch = encodeBatch
+        self.maxBatchSize = maxBatchSize
+        self.maxDelay = maxDelay
+        self.queries = 0
+        self.batches = 0
+        self._queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def encode(self, text: str) -> np.ndarray:
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            if self.maxDelay > 0 and self._queue.qsize() < self.maxBatchSize - 1:
+                await asyncio.sleep(self.maxDelay)
+            while len(batch) < self.maxBatchSize and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # Callers that gave up (e.g. a dropped connection) don't need encoding
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                encoded = dict(zip(texts, await asyncio.to_thread(self.encodeBatch, texts)))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.queries += len(batch)
+            self.batches += 1
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(encoded[text])
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
@@ -0,0 +1,134 @@
+import atexit
+import json
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Changes are written this long after the first unsaved one, off the search path
+SAVE_DELAY = 5.0
+
+class QueryEmbeddingCache:
+    """
+    LRU cache of text query embeddings keyed by (model name, normalized query).
+    With a persistPath the entries survive restarts in a single .npz file, saved in the background
+    SAVE_DELAY seconds after a change and on flush()/close() or interpreter exit.
+    """
+
+    def __init__(
+        self,
+        maxSize: int = 256,
+        persistPath: Optional[Path] = None,
+        saveDelay: float = SAVE_DELAY
+    ):
+        self.maxSize = maxSize
+        self.persistPath = Path(persistPath) if persistPath else None
+        self.saveDelay = saveDelay
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes file writes, so a timer save and a flush() never interleave
+        self._saveLock = threading.Lock()
+        self._dirty = False
+        self._saveTimer: Optional[threading.Timer] = None
+        self._load()
+        if self.persistPath is not None:
+            atexit.register(self.flush)
+
+    @staticmethod
+    def normalizeQuery(query: str) -> str:
+        return " ".join(query.casefold().split())
+
+    def get(self, modelName: str, query: str) -> Optional[np.ndarray]:
+        key = (modelName, self.normalizeQuery(query))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, modelName: str, query: str, embedding) -> np.ndarray:
+        # Cached arrays are shared between callers, so they are stored read-only
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        key = (modelName, self.normalizeQuery(query))
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+            self._markDirty()
+        return embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._markDirty()
+
+    def flush(self):
+        """Writes pending changes now."""
+        self._save()
+
+    def close(self):
+        with self._lock:
+            if self._saveTimer is not None:
+                self._saveTimer.cancel()
+                self._saveTimer = None
+        self._save()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        if self.persistPath is None or not self.persistPath.exists():
+            return
+        try:
+            with np.load(self.persistPath, allow_pickle=False) as data:
+                # Keys are stored oldest first, so only the most recent maxSize are kept
+                keys = json.loads(str(data["keys"]))
+                for i in range(max(0, len(keys) - self.maxSize), len(keys)):
+                    embedding = data[f"e{i}"]
+                    embedding.flags.writeable = False
+                    self._entries[tuple(keys[i])] = embedding
+        except Exception as e:
+            print(f"Error loading query cache: {e}")
+
+    def _markDirty(self):
+        # Called with _lock held; one timer covers every change until it fires
+        if self.persistPath is None:
+            return
+        self._dirty = True
+        if self._saveTimer is None:
+            self._saveTimer = threading.Timer(self.saveDelay, self._save)
+            self._saveTimer.daemon = True
+            self._saveTimer.start()
+
+    def _save(self):
+        if self.persistPath is None:
+            return
+        with self._saveLock:
+            with self._lock:
+                self._saveTimer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                keys = list(self._entries)
+                arrays = {f"e{i}": embedding for i, embedding in enumerate(self._entries.values())}
+            try:
+                # Written beside the target and swapped in, so a crash never leaves a torn file
+                tmpPath = self.persistPath.with_name(self.persistPath.stem + ".tmp.npz")
+                np.savez(tmpPath, keys=np.array(json.dumps(keys)), **arrays)
+                os.replace(tmpPath, self.persistPath)
+            except Exception as e:
+                print(f"Error saving query cache: {e}")
@@ -1,54 +1,310 @@
-from typing import List, Dict
+import asyncio
+import threading
+import numpy as np
+from collections import OrderedDict
+from dataclasses import replace
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from pathlib import Path
 
 from backend.db.metadata_db import MetadataDB
-from backend.db.vector_db import VectorDB
+from backend.db.vector_db import openVectorDb, vectorSpaceName, listModelSpaces
 from backend.services.model_factory import ModelFactory
-from backend.utils.data_classes import SearchResult
+from backend.services.query_cache import QueryEmbeddingCache
+from backend.services.settings_manager import SettingsManager
+from backend.services.thumbnail_store import ThumbnailStore
+from backend.utils.constants import QUERY_CACHE_PATH
+from backend.utils.data_classes import SearchResult, SearchPage
 
+# Standard RRF damping constant; keeps a single list's top hit from dominating the fused order
+RRF_K = 60
+# Each ranking contributes this many candidates per requested result before fusion
+CANDIDATE_FACTOR = 3
+MIN_CANDIDATES = 30
+# Results per page, and how deep ranked (semantic / hybrid) searches can be paged
+PAGE_SIZE = 60
+MAX_RANKED_RESULTS = 1000
+# Ranked searches being paged through keep their full ranking so later pages stay consistent
+RANKING_CACHE_SIZE = 8
+SEARCH_MODES = ("hybrid", "semantic", "keyword", "tag")
 
 class SearchEngine:
-    def __init__(self):
+    def __init__(self, loadModelInBackground: bool = False):
+        """
+        With loadModelInBackground, a hybrid search made before the embedding model is loaded returns tag and
+        keyword results straight away and starts loading the model on a background thread, so an interactive
+        app never waits for the model at startup. Semantic searches always wait for it.
+        """
         self.metadataDb = MetadataDB()
-        self.vectorDb = VectorDB()
         self.modelFactory = ModelFactory()
+        self.thumbnails = ThumbnailStore()
+        settings = SettingsManager()
+        self.queryCache = QueryEmbeddingCache(
+            maxSize = settings.queryCacheSize,
+            persistPath = QUERY_CACHE_PATH if settings.persistQueryCache else None
+        )
+        self._rankingsLock = threading.Lock()
+        self._rankings: "OrderedDict[tuple, Tuple[List[Tuple[Path, float]], Dict[Path, SearchResult]]]" = OrderedDict()
+        self.loadModelInBackground = loadModelInBackground
+        self._modelLoaderLock = threading.Lock()
+        self._modelLoader: Optional[threading.Thread] = None
     
     @property
     def model(self):
         return self.modelFactory.getActiveModel()
+
+    @property
+    def embedder(self):
+        return self.modelFactory.getEmbeddingModel()
+
+    @property
+    def isModelReady(self) -> bool:
+        return self.modelFactory.isEmbeddingModelLoaded()
+
+    def startLoadingModel(self):
+        """Loads the embedding model on a background thread unless it is loaded or already loading."""
+        with self._modelLoaderLock:
+            if self.isModelReady or (self._modelLoader is not None and self._modelLoader.is_alive()):
+                return
+            self._modelLoader = threading.Thread(target = self._loadModel, daemon = True)
+            self._modelLoader.start()
+
+    def _loadModel(self):
+        try:
+            self.modelFactory.getEmbeddingModel()
+        except Exception as e:
+            print(f"Error loading embedding model: {e}")
     
-    def searchByTag(self, query: str) -> List[SearchResult]:
-        return self.metadataDb.searchByTag(query)
+    def searchByTag(self, query: str, matchAll: bool = False, prefix: bool = False) -> List[SearchResult]:
+        return self.metadataDb.searchByTag(query, matchAll = matchAll, prefix = prefix)
+
+    def listTags(self, prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        return self.metadataDb.getTagCounts(prefix, limit)
+
+    def searchKeyword(self, query: str, topK: int = 10) -> List[SearchResult]:
+        """BM25 keyword search over stored captions and tags; no model is needed at query time."""
+        return self.metadataDb.searchText(query, limit = topK)
     
+    def encodeQuery(self, query: str):
+        """Text embedding for a query, served from the LRU cache when the same model has seen it before."""
+        return self.encodeQueries([query])[0]
+
+    def encodeQueries(self, queries: List[str]) -> List[np.ndarray]:
+        """Embeddings for several queries; the cache misses are encoded together in one forward pass."""
+        modelName = self.modelFactory.getEmbeddingModelName()
+        embeddings = [self.queryCache.get(modelName, query) for query in queries]
+        missing = list(dict.fromkeys(q for q, e in zip(queries, embeddings) if e is None))
+        if missing:
+            encoded = dict(zip(missing, self.embedder.encodeTexts(missing)))
+            for query in missing:
+                encoded[query] = self.queryCache.put(modelName, query, encoded[query])
+            embeddings = [e if e is not None else encoded[q] for q, e in zip(queries, embeddings)]
+        return embeddings
+
+    def _semanticRanking(
+        self,
+        query: str,
+        topK: int,
+        queryEmbedding: Optional[np.ndarray] = None
+    ) -> List[Tuple[Path, float]]:
+        if queryEmbedding is None:
+            queryEmbedding = self.encodeQuery(query)
+        # Only vectors from the active embedding model's space are comparable with its query embedding
+        space = vectorSpaceName(self.modelFactory.getEmbeddingModelName(), len(queryEmbedding))
+        return [(Path(imagePath), score) for imagePath, score in openVectorDb(space).search(queryEmbedding, topK = topK)]
+
+    def _hydrate(
+        self,
+        ranking: List[Tuple[Path, float]],
+        known: Optional[Dict[Path, SearchResult]] = None
+    ) -> List[SearchResult]:
+        """Builds results for (path, score) pairs, loading metadata for the unknown paths in one lookup."""
+        known = dict(known or {})
+        known.update(self.metadataDb.getImagesByPaths([p for p, _ in ranking if p not in known]))
+        results = []
+        for path, score in ranking:
+            # The vector index can briefly hold paths the metadata no longer has; they still get a bare result
+            base = known.get(path) or SearchResult(path = path, tags = [], indexedDate = "")
+            results.append(replace(base, score = score))
+        return results
+
     def searchSemantic(
         self,
         query: str,
         topK: int = 10
     ) -> List[SearchResult]:
-        queryEmbedding = self.model.encodeText(query)
-        results = self.vectorDb.search(queryEmbedding, topK = topK)
-        
-        sanitized = []
-        if results and "ids" in results and results["ids"]:
-            ids = results["ids"][0]
-            for imagePath in ids:
-                sanitized.append(SearchResult(
-                    path=Path(imagePath),
-                    tags=[],
-                    indexedDate=""
-                ))
-        return sanitized
-    
+        return self._hydrate(self._semanticRanking(query, topK))
+
+    def searchSimilar(
+        self,
+        path: Path,
+        topK: int = 10,
+        ensureThumbnails: bool = False
+    ) -> List[SearchResult]:
+        """
+        Images nearest to an indexed image's own embedding (More Like This), leaving out the image itself.
+        ensureThumbnails creates missing thumbnails, as for searchPage.
+        """
+        for space in listModelSpaces(self.modelFactory.getEmbeddingModelName()):
+            embedding = self.metadataDb.getEmbedding(path, space)
+            if embedding is None:
+                continue
+            ranking = [
+                (Path(imagePath), score) for imagePath, score in openVectorDb(space).search(embedding, topK = topK + 1)
+                if Path(imagePath) != path
+            ]
+            results = self._hydrate(ranking[:topK])
+            if ensureThumbnails:
+                self._ensureThumbnails(results)
+            return results
+        return []
+
+    @staticmethod
+    def fuseRankings(rankings: List[List[Path]], topK: int) -> List[Tuple[Path, float]]:
+        """Reciprocal rank fusion: each list adds 1 / (RRF_K + rank) to the paths it contains."""
+        scores: Dict[Path, float] = {}
+        for ranking in rankings:
+            for rank, path in enumerate(ranking, start = 1):
+                scores[path] = scores.get(path, 0.0) + 1.0 / (RRF_K + rank)
+        return sorted(scores.items(), key = lambda item: item[1], reverse = True)[:topK]
+
+    def _hybridRanking(
+        self,
+        query: str,
+        tagFilter: Optional[str],
+        topK: int,
+        matchAllTags: bool = False,
+        tagPrefix: bool = False,
+        queryEmbedding: Optional[np.ndarray] = None
+    ) -> Tuple[List[Tuple[Path, float]], Dict[Path, SearchResult]]:
+        candidates = max(topK * CANDIDATE_FACTOR, MIN_CANDIDATES)
+        tagResults = self.metadataDb.searchByTag(
+            tagFilter if tagFilter is not None else query,
+            limit = candidates,
+            matchAll = matchAllTags,
+            prefix = tagPrefix
+        )
+        keywordResults = self.metadataDb.searchText(query, limit = candidates)
+        if queryEmbedding is None and self.loadModelInBackground and not self.isModelReady:
+            # Semantic candidates join the fusion on the first search after the model has loaded
+            self.startLoadingModel()
+            semanticRanking = []
+        else:
+            semanticRanking = self._semanticRanking(query, candidates, queryEmbedding)
+
+        fused = self.fuseRankings([
+            [r.path for r in tagResults],
+            [r.path for r in keywordResults],
+            [p for p, _ in semanticRanking],
+        ], topK)
+        return fused, {r.path: r for r in tagResults + keywordResults}
+
     def searchHybrid(
         self,
         query: str,
-        tagFilter: str,
+        tagFilter: Optional[str] = None,
         topK: int = 10
-    ) -> Dict[str, List[SearchResult]]:
-        tagResults = self.metadataDb.searchByTag(tagFilter)
-        semanticResults = self.searchSemantic(query, topK=topK)
-        
-        return {
-            "tagResults": tagResults,
-            "semanticResults": semanticResults
-        }
\ No newline at end of file
+    ) -> List[SearchResult]:
+        """
+        One ranked list from tag, keyword and semantic search fused with RRF, capped at topK.
+        tagFilter defaults to the query itself.
+        """
+        fused, known = self._hybridRanking(query, tagFilter, topK)
+        return self._hydrate(fused, known)
+
+    def _cachedRanking(
+        self,
+        mode: str,
+        query: str,
+        tagFilter: Optional[str],
+        refresh: bool,
+        matchAllTags: bool = False,
+        tagPrefix: bool = False,
+        queryEmbedding: Optional[np.ndarray] = None
+    ):
+        key = (mode, query, tagFilter, matchAllTags, tagPrefix, self.modelFactory.getEmbeddingModelName())
+        with self._rankingsLock:
+            if key in self._rankings and not refresh:
+                self._rankings.move_to_end(key)
+                return self._rankings[key]
+        if mode == "semantic":
+            ranking = (self._semanticRanking(query, MAX_RANKED_RESULTS, queryEmbedding), {})
+        else:
+            ranking = self._hybridRanking(
+                query, tagFilter, MAX_RANKED_RESULTS, matchAllTags, tagPrefix, queryEmbedding
+            )
+        with self._rankingsLock:
+            self._rankings[key] = ranking
+            while len(self._rankings) > RANKING_CACHE_SIZE:
+                self._rankings.popitem(last = False)
+        return ranking
+
+    def searchPage(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        offset: int = 0,
+        limit: int = PAGE_SIZE,
+        tagFilter: Optional[str] = None,
+        matchAllTags: bool = False,
+        tagPrefix: bool = False,
+        queryEmbedding: Optional[np.ndarray] = None,
+        ensureThumbnails: bool = False
+    ) -> SearchPage:
+        """
+        One page of results. Tag and keyword pages are read straight from SQLite with OFFSET/LIMIT;
+        semantic and hybrid rankings are computed once per query (up to MAX_RANKED_RESULTS) and sliced.
+        matchAllTags and tagPrefix shape the tag lookup of tag and hybrid searches (see MetadataDB.searchByTags).
+        queryEmbedding skips encoding the query when the caller already has it (e.g. from a batched encode).
+        ensureThumbnails creates missing thumbnails by decoding the originals, which only a UI about to show
+        the page wants; headless callers leave it off so a query never waits on image decodes.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+        if mode == "tag":
+            # One extra row tells whether another page exists
+            results = self.metadataDb.searchByTag(
+                query, limit = limit + 1, offset = offset, matchAll = matchAllTags, prefix = tagPrefix
+            )
+        elif mode == "keyword":
+            results = self.metadataDb.searchText(query, limit = limit + 1, offset = offset)
+        else:
+            # A first page always ranks afresh, so a repeated search sees newly indexed images
+            ranking, known = self._cachedRanking(
+                mode, query, tagFilter, offset == 0, matchAllTags, tagPrefix, queryEmbedding
+            )
+            results = self._hydrate(ranking[offset:offset + limit + 1], known)
+
+        hasMore = len(results) > limit
+        results = results[:limit]
+        if ensureThumbnails:
+            self._ensureThumbnails(results)
+        return SearchPage(
+            results = results,
+            offset = offset,
+            nextOffset = offset + limit if hasMore else None
+        )
+
+    def _ensureThumbnails(self, results: List[SearchResult]):
+        # Images indexed before thumbnails existed get theirs on first display, off the UI thread
+        for r in results:
+            self.thumbnails.getOrCreate(r.path, r.contentHash)
+
+    async def streamSearch(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        pageSize: int = PAGE_SIZE,
+        tagFilter: Optional[str] = None,
+        matchAllTags: bool = False,
+        tagPrefix: bool = False,
+        ensureThumbnails: bool = False
+    ) -> AsyncIterator[SearchPage]:
+        """Yields pages lazily, each fetched off the event loop; stop iterating to stop loading."""
+        offset = 0
+        while offset is not None:
+            page = await asyncio.to_thread(
+                self.searchPage, query, mode, offset, pageSize, tagFilter, matchAllTags, tagPrefix,
+                ensureThumbnails = ensureThumbnails
+            )
+            yield page
+            offset = page.nextOffset
@@ -0,0 +1,124 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from backend.utils.data_classes import SearchPage, SearchResult
+
+# Same page size as SearchEngine; not imported from there so a client never loads the model stack
+PAGE_SIZE = 60
+DEFAULT_TIMEOUT = 30.0
+
+class SearchClient:
+    """
+    Talks to a SearchServer, mirroring the SearchEngine methods the UI uses, so a process can search without
+    loading a model of its own. Server-side errors are raised as RuntimeError with the server's message.
+    """
+
+    def __init__(self, baseUrl: str, timeout: float = DEFAULT_TIMEOUT):
+        self.baseUrl = baseUrl.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, params: Optional[Dict[str, Any]] = None, body: Any = None) -> Any:
+        query = {k: v for k, v in (params or {}).items() if v is not None}
+        url = f"{self.baseUrl}{path}" + (f"?{urlencode(query)}" if query else "")
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = Request(url, data = data, method = method, headers = {"Content-Type": "application/json"})
+        try:
+            with urlopen(request, timeout = self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except Exception:
+                message = e.reason
+            raise RuntimeError(f"Search server returned {e.code}: {message}") from e
+        except URLError as e:
+            raise RuntimeError(f"Search server unreachable at {self.baseUrl}: {e.reason}") from e
+
+    @property
+    def isModelReady(self) -> bool:
+        # The server loads and keeps its own model
+        return True
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def searchPage(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        offset: int = 0,
+        limit: int = PAGE_SIZE,
+        tagFilter: Optional[str] = None,
+        matchAllTags: bool = False,
+        tagPrefix: bool = False,
+        ensureThumbnails: bool = False
+    ) -> SearchPage:
+        # ensureThumbnails is accepted for SearchEngine compatibility; thumbnails live with the server's index
+        if not query.strip():
+            return SearchPage([], offset)
+        data = self._request("GET", "/search", {
+            "q": query,
+            "mode": mode,
+            "offset": offset,
+            "limit": limit,
+            "tags": tagFilter,
+            "matchAll": 1 if matchAllTags else None,
+            "prefix": 1 if tagPrefix else None,
+        })
+        return SearchPage(
+            [SearchResult.fromDict(r) for r in data["results"]], data["offset"], data.get("nextOffset")
+        )
+
+    async def streamSearch(
+        self,
+        query: str,
+        mode: str = "hybrid",
+        pageSize: int = PAGE_SIZE,
+        tagFilter: Optional[str] = None,
+        matchAllTags: bool = False,
+        tagPrefix: bool = False,
+        ensureThumbnails: bool = False
+    ) -> AsyncIterator[SearchPage]:
+        offset = 0
+        while offset is not None:
+            page = await asyncio.to_thread(
+                self.searchPage, query, mode, offset, pageSize, tagFilter, matchAllTags, tagPrefix
+            )
+            yield page
+            offset = page.nextOffset
+
+    def searchSimilar(self, path: Path, topK: int = PAGE_SIZE, ensureThumbnails: bool = False) -> List[SearchResult]:
+        data = self._request("GET", "/similar", {"path": str(path), "limit": topK})
+        return [SearchResult.fromDict(r) for r in data["results"]]
+
+    def listTags(self, prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        data = self._request("GET", "/tags", {"prefix": prefix, "limit": limit})
+        return [(t["tag"], t["count"]) for t in data["tags"]]
+
+    def findDuplicates(
+        self,
+        similarity: Optional[float] = None,
+        maxHashDistance: Optional[int] = None,
+        useHash: bool = True,
+        space: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[List[Path]]:
+        data = self._request("GET", "/duplicates", {
+            "similarity": similarity,
+            "maxHashDistance": maxHashDistance,
+            "noHash": None if useHash else 1,
+            "space": space,
+            "limit": limit,
+        })
+        return [[Path(p) for p in group] for group in data["groups"]]
+
+    def status(self) -> Dict[str, Any]:
+        return self._request("GET", "/status")
+
+    def startIndexing(self, folder: str) -> Dict[str, Any]:
+        return self._request("POST", "/index", body = {"folder": folder})
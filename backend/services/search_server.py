@@ -0,0 +1,309 @@
+import asyncio
+import json
+import time
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from backend.services.query_batcher import QueryBatcher, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_DELAY
+from backend.services.search import PAGE_SIZE, SEARCH_MODES
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Upper bound for ?limit=, so one request can't hydrate the whole library
+MAX_LIMIT = 500
+# The API only takes small JSON bodies
+MAX_BODY_BYTES = 1024 * 1024
+# Idle keep-alive connections are closed after this long
+KEEP_ALIVE_TIMEOUT = 15.0
+# Searches that need a query embedding; the others never touch the model
+EMBEDDING_MODES = ("semantic", "hybrid")
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+class SearchServer:
+    """
+    Local HTTP/JSON API that keeps one SearchEngine (and its model) warm for every client process.
+    Concurrent query embeddings are micro-batched into single forward passes by a QueryBatcher.
+
+        GET  /health                                 liveness and batching counters
+        GET  /search?q=&mode=&offset=&limit=&tags=&matchAll=&prefix=
+                                                     one page of results (same modes as SearchEngine.searchPage)
+        GET  /similar?path=&limit=                   "more like this" for an indexed image
+        GET  /tags?prefix=&limit=                    tags with their image counts, most used first
+        GET  /duplicates?similarity=&maxHashDistance=&noHash=&space=&limit=
+                                                     near-duplicate groups, largest first
+        GET  /status                                 indexing status
+        POST /index {"folder": "..."}                starts syncing a folder in the background
+
+    engine, indexingManager and duplicateFinder can be injected (e.g. stubs without a model); by default they are
+    created on first use.
+    """
+
+    def __init__(
+        self,
+        engine = None,
+        indexingManager = None,
+        duplicateFinder = None,
+        maxBatchSize: int = DEFAULT_MAX_BATCH_SIZE,
+        maxDelay: float = DEFAULT_MAX_DELAY
+    ):
+        if engine is None:
+            from backend.services.search import SearchEngine
+            engine = SearchEngine()
+        self.engine = engine
+        self._indexingManager = indexingManager
+        self._duplicateFinder = duplicateFinder
+        # An all-pairs pass can take minutes on a large library, so concurrent requests wait for one another
+        self._duplicatesLock = asyncio.Lock()
+        self.batcher = QueryBatcher(engine.encodeQueries, maxBatchSize, maxDelay)
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._tasks = set()
+        self._routes = {
+            ("GET", "/health"): self.handleHealth,
+            ("GET", "/search"): self.handleSearch,
+            ("GET", "/similar"): self.handleSimilar,
+            ("GET", "/tags"): self.handleTags,
+            ("GET", "/duplicates"): self.handleDuplicates,
+            ("GET", "/status"): self.handleStatus,
+            ("POST", "/index"): self.handleIndex,
+        }
+
+    @property
+    def indexingManager(self):
+        # Indexing pulls in the captioning pipeline, so a search-only server never builds it
+        if self._indexingManager is None:
+            from backend.services.indexing_manager import IndexingManager
+            self._indexingManager = IndexingManager()
+        return self._indexingManager
+
+    @property
+    def duplicateFinder(self):
+        if self._duplicateFinder is None:
+            from backend.services.duplicate_finder import DuplicateFinder
+            self._duplicateFinder = DuplicateFinder(self.engine.metadataDb)
+        return self._duplicateFinder
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, warmUp: bool = True) -> int:
+        """Starts listening and returns the bound port (pass port=0 for any free one)."""
+        if warmUp:
+            # Loads the embedding model now rather than on the first client's request
+            await asyncio.to_thread(self.engine.encodeQueries, ["warm up"])
+        self._server = await asyncio.start_server(self._handleConnection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serveForever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.close()
+
+    async def _handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._readRequest(reader), KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except (HttpError, ValueError, asyncio.LimitOverrunError) as e:
+                    status = e.status if isinstance(e, HttpError) else HTTPStatus.BAD_REQUEST
+                    self._writeResponse(writer, status, {"error": str(e)}, keepAlive = False)
+                    await writer.drain()
+                    break
+                method, target, keepAlive, body = request
+                status, payload = await self._dispatch(method, target, body)
+                self._writeResponse(writer, status, payload, keepAlive)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except Exception as e:
+            print(f"Error handling connection: {e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    @staticmethod
+    async def _readRequest(reader: asyncio.StreamReader) -> Tuple[str, str, bool, bytes]:
+        head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        requestLine, *headerLines = head.rstrip("\r\n").split("\r\n")
+        parts = requestLine.split(" ")
+        if len(parts) != 3:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Malformed request line: {requestLine[:100]!r}")
+        method, target, version = parts
+        headers = {}
+        for line in headerLines:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        # HTTP/1.1 connections stay open unless asked otherwise; HTTP/1.0 ones only when asked
+        keepAlive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method.upper(), target, keepAlive, body
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Any]:
+        url = urlsplit(target)
+        handler = self._routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self._routes):
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} not allowed on {url.path}"}
+            return HTTPStatus.NOT_FOUND, {"error": f"No route for {url.path}"}
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            data = json.loads(body) if body else {}
+            return await handler(params, data)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        except Exception as e:
+            print(f"Error handling {method} {url.path}: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+    @staticmethod
+    def _writeResponse(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any, keepAlive: bool):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+
+    @staticmethod
+    def _required(params: Dict[str, str], name: str) -> str:
+        value = params.get(name, "").strip()
+        if not value:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Missing query parameter: {name}")
+        return value
+
+    @staticmethod
+    def _flagParam(params: Dict[str, str], name: str) -> bool:
+        return params.get(name, "").lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def _intParam(params: Dict[str, str], name: str, default: int, maximum: Optional[int] = None) -> int:
+        try:
+            value = int(params.get(name, default))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer")
+        if value < 0:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must not be negative")
+        return min(value, maximum) if maximum is not None else value
+
+    @staticmethod
+    def _floatParam(params: Dict[str, str], name: str, default: float) -> float:
+        try:
+            return float(params.get(name, default))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"{name} must be a number")
+
+    async def handleHealth(self, params: Dict[str, str], data: Any):
+        return HTTPStatus.OK, {"ok": True, "queriesEncoded": self.batcher.queries, "batches": self.batcher.batches}
+
+    async def handleSearch(self, params: Dict[str, str], data: Any):
+        query = self._required(params, "q")
+        mode = params.get("mode", "hybrid")
+        if mode not in SEARCH_MODES:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+        offset = self._intParam(params, "offset", 0)
+        limit = self._intParam(params, "limit", PAGE_SIZE, MAX_LIMIT)
+
+        start = time.perf_counter()
+        queryEmbedding = None
+        if mode in EMBEDDING_MODES:
+            # Encoded together with whatever other queries are in flight, then handed to the engine as is
+            queryEmbedding = await self.batcher.encode(query)
+        page = await asyncio.to_thread(
+            self.engine.searchPage,
+            query,
+            mode,
+            offset,
+            limit,
+            params.get("tags"),
+            self._flagParam(params, "matchAll"),
+            self._flagParam(params, "prefix"),
+            queryEmbedding
+        )
+        return HTTPStatus.OK, {
+            "results": [r.toDict() for r in page.results],
+            "offset": page.offset,
+            "nextOffset": page.nextOffset,
+            "tookMs": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    async def handleSimilar(self, params: Dict[str, str], data: Any):
+        path = Path(self._required(params, "path"))
+        limit = self._intParam(params, "limit", PAGE_SIZE, MAX_LIMIT)
+        results = await asyncio.to_thread(self.engine.searchSimilar, path, limit)
+        return HTTPStatus.OK, {"results": [r.toDict() for r in results]}
+
+    async def handleTags(self, params: Dict[str, str], data: Any):
+        limit = self._intParam(params, "limit", MAX_LIMIT, MAX_LIMIT)
+        tags = await asyncio.to_thread(self.engine.listTags, params.get("prefix"), limit)
+        return HTTPStatus.OK, {"tags": [{"tag": tag, "count": count} for tag, count in tags]}
+
+    async def handleDuplicates(self, params: Dict[str, str], data: Any):
+        from backend.services.duplicate_finder import DUPLICATE_SIMILARITY, MAX_HASH_DISTANCE
+        from backend.utils.image_hash import HASH_BITS
+        similarity = self._floatParam(params, "similarity", DUPLICATE_SIMILARITY)
+        if not 0 < similarity <= 1:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "similarity must be in (0, 1]")
+        maxHashDistance = self._intParam(params, "maxHashDistance", MAX_HASH_DISTANCE)
+        if maxHashDistance > HASH_BITS:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"maxHashDistance must be at most {HASH_BITS}")
+        limit = self._intParam(params, "limit", MAX_LIMIT, MAX_LIMIT)
+
+        start = time.perf_counter()
+        async with self._duplicatesLock:
+            groups = await asyncio.to_thread(
+                self.duplicateFinder.findGroups,
+                similarity,
+                None if self._flagParam(params, "noHash") else maxHashDistance,
+                params.get("space")
+            )
+        return HTTPStatus.OK, {
+            "groups": [[str(p) for p in group] for group in groups[:limit]],
+            "groupCount": len(groups),
+            "tookMs": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    async def handleStatus(self, params: Dict[str, str], data: Any):
+        manager = self.indexingManager
+        return HTTPStatus.OK, {
+            "isIndexing": manager.isIndexing,
+            "progress": manager.progress,
+            "status": manager.status,
+            "currentFolder": manager.currentFolder,
+            "isWatching": manager.isWatching,
+            "lastError": manager.lastError,
+        }
+
+    async def handleIndex(self, params: Dict[str, str], data: Any):
+        folder = data.get("folder") if isinstance(data, dict) else None
+        if not folder or not Path(folder).is_dir():
+            raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be {\"folder\": <existing folder>}")
+        manager = self.indexingManager
+        if manager.isIndexing:
+            raise HttpError(HTTPStatus.CONFLICT, "Indexing is already running")
+        folder = str(Path(folder).resolve())
+        # Keep a reference so the task isn't garbage collected mid-sync
+        task = asyncio.create_task(manager.startIndexing(folder))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return HTTPStatus.ACCEPTED, {"started": folder}
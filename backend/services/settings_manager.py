@@ -1,6 +1,7 @@
 import json
 import os
 from pathlib import Path
+from typing import List
 from backend.utils.constants import DATA_DIR
 
 class SettingsManager:
@@ -9,13 +10,32 @@ class SettingsManager:
     
     DEFAULT_SETTINGS = {
         "activeModel": "Qwen3-VL-2B",
-        "themeMode": "system"
+        "embeddingModel": "Captioner",
+        "themeMode": "system",
+        "indexBatchSize": 4,
+        "decodeWorkers": 4,
+        "scanWorkers": 8,
+        "decodeQueueSize": 16,
+        "writeQueueSize": 4,
+        "vectorBackend": "chroma",
+        "ivfLists": 1024,
+        "ivfProbes": 16,
+        "queryCacheSize": 256,
+        "persistQueryCache": False,
+        "thumbnailSize": 320,
+        "thumbnailCacheMB": 512,
+        "managedFolders": [],
+        "watchFolders": False,
+        "watchDebounceSeconds": 2.0,
+        "watchPollSeconds": 30.0,
+        "searchServerUrl": ""
     }
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SettingsManager, cls).__new__(cls)
             cls._instance._settings = cls.DEFAULT_SETTINGS.copy()
+            cls._instance._overrides = {}
             cls._instance._load()
         return cls._instance
 
@@ -36,11 +56,18 @@ class SettingsManager:
             print(f"Error saving settings: {e}")
 
     def get(self, key, default=None):
+        if key in self._overrides:
+            return self._overrides[key]
         return self._settings.get(key, default)
 
     def set(self, key, value):
+        self._overrides.pop(key, None)
         self._settings[key] = value
         self.save()
+
+    def override(self, key, value):
+        """Changes a setting for this process only; overrides are never written to settings.json (e.g. CLI flags)."""
+        self._overrides[key] = value
         
     @property
     def activeModel(self):
@@ -49,3 +76,87 @@ class SettingsManager:
     @activeModel.setter
     def activeModel(self, value):
         self.set("activeModel", value)
+
+    @property
+    def embeddingModel(self):
+        return self.get("embeddingModel", "Captioner")
+
+    @embeddingModel.setter
+    def embeddingModel(self, value):
+        self.set("embeddingModel", value)
+
+    @property
+    def indexBatchSize(self) -> int:
+        return max(1, int(self.get("indexBatchSize", 1)))
+
+    @property
+    def decodeWorkers(self) -> int:
+        return max(1, int(self.get("decodeWorkers", 1)))
+
+    @property
+    def scanWorkers(self) -> int:
+        return max(1, int(self.get("scanWorkers", 8)))
+
+    @property
+    def decodeQueueSize(self) -> int:
+        return max(1, int(self.get("decodeQueueSize", 1)))
+
+    @property
+    def writeQueueSize(self) -> int:
+        return max(1, int(self.get("writeQueueSize", 1)))
+
+    @property
+    def vectorBackend(self) -> str:
+        return self.get("vectorBackend", "chroma")
+
+    @property
+    def ivfLists(self) -> int:
+        return max(1, int(self.get("ivfLists", 1024)))
+
+    @property
+    def ivfProbes(self) -> int:
+        return max(1, int(self.get("ivfProbes", 16)))
+
+    @property
+    def queryCacheSize(self) -> int:
+        return max(0, int(self.get("queryCacheSize", 256)))
+
+    @property
+    def persistQueryCache(self) -> bool:
+        return bool(self.get("persistQueryCache", False))
+
+    @property
+    def thumbnailSize(self) -> int:
+        return max(32, int(self.get("thumbnailSize", 320)))
+
+    @property
+    def thumbnailCacheMB(self) -> int:
+        return max(1, int(self.get("thumbnailCacheMB", 512)))
+
+    @property
+    def managedFolders(self) -> List[str]:
+        return list(self.get("managedFolders", []))
+
+    @managedFolders.setter
+    def managedFolders(self, value: List[str]):
+        self.set("managedFolders", list(value))
+
+    @property
+    def watchFolders(self) -> bool:
+        return bool(self.get("watchFolders", False))
+
+    @watchFolders.setter
+    def watchFolders(self, value: bool):
+        self.set("watchFolders", bool(value))
+
+    @property
+    def watchDebounceSeconds(self) -> float:
+        return max(0.1, float(self.get("watchDebounceSeconds", 2.0)))
+
+    @property
+    def watchPollSeconds(self) -> float:
+        return max(1.0, float(self.get("watchPollSeconds", 30.0)))
+
+    @property
+    def searchServerUrl(self) -> str:
+        return str(self.get("searchServerUrl", "") or "").strip()
@@ -0,0 +1,122 @@
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+from PIL import Image, ImageOps
+
+from backend.services.settings_manager import SettingsManager
+from backend.utils.constants import THUMBNAIL_DIR
+
+THUMBNAIL_FORMAT = "WEBP"
+THUMBNAIL_QUALITY = 80
+# Eviction trims the store to this share of its limit, so it doesn't run again on the next write
+EVICT_TO_RATIO = 0.9
+
+class ThumbnailStore:
+    """
+    Content-addressed thumbnail cache: <THUMBNAIL_DIR>/<hash[:2]>/<hash>.webp.
+    A changed file has a new content hash, so a stale thumbnail is never served for it.
+    Reads refresh the file's mtime, and the least recently used files are evicted past the size limit.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ThumbnailStore, cls).__new__(cls)
+            settings = SettingsManager()
+            cls._instance.directory = Path(THUMBNAIL_DIR)
+            cls._instance.size = settings.thumbnailSize
+            cls._instance.maxBytes = settings.thumbnailCacheMB * 1024 * 1024
+            cls._instance._lock = threading.Lock()
+            cls._instance._totalBytes = None
+        return cls._instance
+
+    def pathFor(self, contentHash: str) -> Path:
+        return self.directory / contentHash[:2] / f"{contentHash}.webp"
+
+    def get(self, contentHash: Optional[str]) -> Optional[Path]:
+        if not contentHash:
+            return None
+        path = self.pathFor(contentHash)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def put(self, contentHash: str, image: Image.Image) -> Path:
+        """Stores a thumbnail made from an already decoded (ideally already downscaled) image."""
+        path = self.pathFor(contentHash)
+        if path.exists():
+            return path
+        # Honour camera orientation the way image viewers showing the original would
+        thumb = ImageOps.exif_transpose(image.convert("RGB"))
+        thumb.thumbnail((self.size, self.size), Image.Resampling.LANCZOS)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp name: decode workers may race on identical content
+        tmpPath = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+        thumb.save(tmpPath, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY)
+        written = tmpPath.stat().st_size
+        os.replace(tmpPath, path)
+        self._grow(written)
+        return path
+
+    def getOrCreate(self, imagePath: Path, contentHash: Optional[str]) -> Optional[Path]:
+        """Thumbnail for an image indexed before thumbnails existed, decoding the original once."""
+        cached = self.get(contentHash)
+        if cached or not contentHash:
+            return cached
+        try:
+            with Image.open(imagePath) as img:
+                # Lets the JPEG decoder scale down while decoding instead of materializing full resolution
+                img.draft("RGB", (self.size, self.size))
+                return self.put(contentHash, img)
+        except Exception as e:
+            print(f"Error creating thumbnail for {imagePath}: {e}")
+            return None
+
+    def discard(self, contentHashes: Iterable[str]):
+        """Drops thumbnails whose content no longer belongs to any indexed image."""
+        freed = 0
+        for contentHash in contentHashes:
+            path = self.pathFor(contentHash)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except OSError:
+                pass
+        self._grow(-freed)
+
+    def _files(self):
+        for entry in self.directory.glob("*/*.webp"):
+            try:
+                yield entry, entry.stat()
+            except OSError:
+                pass
+
+    def _grow(self, delta: int):
+        with self._lock:
+            if self._totalBytes is None:
+                self._totalBytes = sum(stat.st_size for _, stat in self._files())
+            else:
+                self._totalBytes += delta
+            overLimit = self._totalBytes > self.maxBytes
+        if overLimit:
+            self.evict()
+
+    def evict(self):
+        """Deletes least recently used thumbnails until the store is back under its limit."""
+        with self._lock:
+            files = sorted(self._files(), key=lambda item: item[1].st_mtime)
+            total = sum(stat.st_size for _, stat in files)
+            target = self.maxBytes * EVICT_TO_RATIO
+            for path, stat in files:
+                if total <= target:
+                    break
+                try:
+                    path.unlink()
+                    total -= stat.st_size
+                except OSError:
+                    pass
+            self._totalBytes = total
@@ -7,4 +7,8 @@ DATA_DIR.mkdir(exist_ok=True)
 IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tiff", ".webp"]
 
 DB_PATH = DATA_DIR / "metadata.db"
-VECTOR_DB_PATH = str(DATA_DIR / "vector_store")
\ No newline at end of file
+VECTOR_DB_PATH = str(DATA_DIR / "vector_store")
+NUMPY_VECTOR_DB_PATH = DATA_DIR / "vector_index"
+IVF_VECTOR_DB_PATH = DATA_DIR / "ivf_index"
+QUERY_CACHE_PATH = DATA_DIR / "query_cache.npz"
+THUMBNAIL_DIR = DATA_DIR / "thumbnails"
\ No newline at end of file
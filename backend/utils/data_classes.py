@@ -1,24 +1,68 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 @dataclass
 class SearchResult:
     path: Path
     tags: List[str]
     indexedDate: str
+    # Relevance from whichever search produced the result; higher is better
+    score: float = 0.0
+    contentHash: Optional[str] = None
     
     def toDict(self):
         return {
             "path": str(self.path),
             "tags": ",".join(self.tags),
-            "indexed_date": self.indexedDate
+            "indexed_date": self.indexedDate,
+            "score": self.score,
+            "content_hash": self.contentHash
         }
         
     @classmethod
     def fromDict(cls, res: Dict[str, str]) -> "SearchResult":
         return cls(
             path = Path(res["path"]),
-            tags = res["tags"].split(","),
-            indexedDate = res["indexed_date"]
-        )
\ No newline at end of file
+            tags = res["tags"].split(",") if res["tags"] else [],
+            indexedDate = res["indexed_date"],
+            score = float(res.get("score", 0.0)),
+            contentHash = res.get("content_hash")
+        )
+
+@dataclass
+class FileState:
+    mtimeNs: int
+    size: int
+    contentHash: Optional[str] = None
+
+    def sameStat(self, other: "FileState") -> bool:
+        return self.mtimeNs == other.mtimeNs and self.size == other.size
+
+@dataclass
+class PreparedImage:
+    path: Path
+    image: Any
+    fileState: FileState
+    perceptualHash: Optional[int] = None
+
+@dataclass
+class IndexedImage:
+    path: Path
+    caption: str
+    tags: List[str]
+    embedding: Any
+    fileState: Optional[FileState] = None
+    embeddingSpace: Optional[str] = None
+    perceptualHash: Optional[int] = None
+
+@dataclass
+class SearchPage:
+    results: List[SearchResult]
+    offset: int
+    # Offset of the following page, None once the results are exhausted
+    nextOffset: Optional[int] = None
+
+    @property
+    def hasMore(self) -> bool:
+        return self.nextOffset is not None
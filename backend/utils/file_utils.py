@@ -0,0 +1,71 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from backend.utils.constants import IMAGE_EXTENSIONS
+from backend.utils.data_classes import FileState
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def computeContentHash(path: Path) -> str:
+    # blake2b is considerably faster than sha256 in pure CPython and is plenty for change detection
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def getFileState(
+    path: Path,
+    stat: Optional[os.stat_result] = None,
+    withHash: bool = True
+) -> FileState:
+    if stat is None:
+        stat = os.stat(path)
+    return FileState(
+        mtimeNs = stat.st_mtime_ns,
+        size = stat.st_size,
+        contentHash = computeContentHash(path) if withHash else None
+    )
+
+def _scanDirectory(directory: str, extensions: FrozenSet[str]) -> Tuple[List[Tuple[Path, os.stat_result]], List[str]]:
+    files, subdirs = [], []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    # Symlinked directories are not followed, so link cycles can't trap the walk
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                        files.append((Path(entry.path), entry.stat()))
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"Skipping {directory}: {e}")
+    return files, subdirs
+
+def scanImages(
+    root: Path,
+    extensions: Iterable[str] = IMAGE_EXTENSIONS,
+    workers: int = 8
+) -> Iterator[Tuple[Path, os.stat_result]]:
+    """
+    Walks root with os.scandir, one directory per task across a thread pool, and yields (path, stat)
+    for image files as soon as their directory has been read. Non-images are dropped by name before any stat.
+    """
+    extensions = frozenset(e.lower() for e in extensions)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Scan")
+    try:
+        pending = {executor.submit(_scanDirectory, str(root), extensions)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                pending.update(executor.submit(_scanDirectory, d, extensions) for d in subdirs)
+                yield from files
+    finally:
+        # Also reached when the consumer stops early; queued directory reads are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
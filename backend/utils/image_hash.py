@@ -0,0 +1,22 @@
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+
+def computePerceptualHash(image: Image.Image) -> int:
+    """
+    64-bit difference hash (dHash): the signs of horizontal gradients on a 9x8 grayscale copy.
+    Resizing and recompression barely move it, so near-identical images land within a few bits.
+    Returned as a signed integer so it fits an SQLite INTEGER.
+    """
+    small = np.asarray(image.convert("L").resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = np.packbits(small[:, 1:] > small[:, :-1])
+    return int(bits.view(">i8")[0])
+
+def hashSignMatrix(hashes: np.ndarray) -> np.ndarray:
+    """
+    (n, 64) float32 matrix of +1/-1 per hash bit. For two rows a, b: a @ b = 64 - 2 * hamming,
+    so Hamming distances for many pairs come out of one matrix product.
+    """
+    bits = (hashes.astype(np.int64).view(np.uint64)[:, None] >> np.arange(HASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    return bits.astype(np.float32) * 2 - 1
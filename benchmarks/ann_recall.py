@@ -0,0 +1,72 @@
+"""
+Measures recall@k and query latency of the IVF backend against the exact NumPy backend.
+
+    python -m benchmarks.ann_recall --count 200000 --dim 768 --nlist 1024 --nprobe 4 8 16 32 64
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.db.ivf_vector_db import IvfVectorDB
+from backend.db.numpy_vector_db import NumpyVectorDB
+
+def clusteredVectors(rng: np.random.Generator, centers: np.ndarray, count: int) -> np.ndarray:
+    # Real embeddings are clumpy; uniform noise would make every ANN index look bad
+    labels = rng.integers(0, len(centers), count)
+    return centers[labels] + 0.5 * rng.standard_normal((count, centers.shape[1]), dtype=np.float32)
+
+def ingest(db, vectors: np.ndarray, batchSize: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batchSize):
+        db.addEmbeddings([str(j) for j in range(i, min(i + batchSize, len(vectors)))], vectors[i:i + batchSize])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=512)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    vectors = clusteredVectors(rng, centers, args.count)
+    queries = clusteredVectors(rng, centers, args.queries)
+
+    workDir = Path(tempfile.mkdtemp(prefix="bench_ann_"))
+    try:
+        exact = NumpyVectorDB(workDir / "exact")
+        ivf = IvfVectorDB(workDir / "ivf", nlist=args.nlist)
+        ingest(exact, vectors, args.batch_size)
+        ivfSeconds = ingest(ivf, vectors, args.batch_size)
+        print(f"{args.count} vectors x {args.dim} dims, nlist {args.nlist}, ingest+train {ivfSeconds:.1f}s")
+
+        start = time.perf_counter()
+        truth = [{id for id, _ in exact.search(q, args.top_k)} for q in queries]
+        exactMs = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"exact       | recall@{args.top_k} 1.000 | {exactMs:7.2f} ms/query")
+
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            hits = 0
+            start = time.perf_counter()
+            results = [ivf.search(q, args.top_k) for q in queries]
+            ivfMs = (time.perf_counter() - start) * 1000 / len(queries)
+            for expected, found in zip(truth, results):
+                hits += len(expected & {id for id, _ in found})
+            recall = hits / (len(queries) * args.top_k)
+            print(f"nprobe {nprobe:>4} | recall@{args.top_k} {recall:.3f} | {ivfMs:7.2f} ms/query")
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
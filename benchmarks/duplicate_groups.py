@@ -0,0 +1,49 @@
+"""
+Times the all-pairs near-duplicate pass of DuplicateFinder on synthetic embeddings with planted duplicates.
+
+    python -m benchmarks.duplicate_groups --count 100000 --dim 768 --duplicates 2000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.services.duplicate_finder import DuplicateFinder, BLOCK_SIZE
+from backend.utils.image_hash import hashSignMatrix
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--duplicates", type=int, default=2000)
+    parser.add_argument("--similarity", type=float, default=0.9)
+    parser.add_argument("--max-hash-distance", type=int, default=10)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--no-hash", action="store_true", help="Compare embeddings only, without the hash prefilter")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((args.count, args.dim), dtype=np.float32)
+    hashes = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, args.count, dtype=np.int64)
+    # Each planted duplicate is a slightly perturbed copy of an earlier image with a couple of hash bits flipped
+    sources = rng.choice(args.count // 2, args.duplicates, replace=False)
+    copies = args.count // 2 + sources
+    embeddings[copies] = embeddings[sources] + 0.1 * rng.standard_normal((args.duplicates, args.dim), dtype=np.float32)
+    hashes[copies] = hashes[sources] ^ (1 << rng.integers(0, 63, args.duplicates))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    hashSigns = None if args.no_hash else hashSignMatrix(hashes)
+    start = time.perf_counter()
+    pairs = DuplicateFinder.similarPairs(
+        embeddings, args.similarity, hashSigns, None if args.no_hash else args.max_hash_distance, args.block_size
+    )
+    seconds = time.perf_counter() - start
+
+    planted = {(int(s), int(c)) for s, c in zip(sources, copies)}
+    found = {(int(i), int(j)) for i, j in pairs}
+    mode = "embeddings only" if args.no_hash else f"hash <= {args.max_hash_distance} bits"
+    print(f"{args.count} x {args.dim} dims, {mode}, block {args.block_size}: {seconds:.1f}s")
+    print(f"pairs found {len(found)}, planted recovered {len(planted & found)}/{len(planted)}")
+
+if __name__ == "__main__":
+    main()
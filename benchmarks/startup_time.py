@@ -0,0 +1,75 @@
+"""
+Cold-start time of the backend the app builds at launch, measured in fresh interpreters.
+Also lists which heavy libraries got imported along the way; none should be before the first semantic search.
+
+    python -m benchmarks.startup_time --runs 5
+    python -m benchmarks.startup_time --semantic "dog on a beach"   # also time loading the model on first use
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Imports that cost seconds and should only happen once a model is actually needed
+HEAVY_MODULES = ("torch", "transformers", "open_clip", "chromadb", "spacy")
+
+def measureStartup(query: str, semantic: bool) -> dict:
+    """Runs in the child interpreter: the steps of opening the app, each timed in milliseconds."""
+    timings = {}
+    start = time.perf_counter()
+
+    def mark(step: str):
+        timings[step] = (time.perf_counter() - start) * 1000
+
+    from backend.services.search import SearchEngine
+    from backend.services.indexing_manager import IndexingManager
+    mark("imports")
+    engine = SearchEngine(loadModelInBackground = True)
+    IndexingManager()
+    mark("services ready")
+    engine.searchPage(query, mode = "tag")
+    mark("first tag search")
+    engine.searchPage(query, mode = "keyword")
+    mark("first keyword search")
+    engine.searchPage(query, mode = "hybrid")
+    mark("first hybrid search")
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+    if semantic:
+        engine.searchPage(query, mode = "semantic")
+        mark("first semantic search")
+    return {"timings": timings, "heavyModules": heavy}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query", default="dog")
+    parser.add_argument("--semantic", action="store_true", help="Also time the first semantic search (loads the model)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measureStartup(args.query, args.semantic)))
+        return
+
+    command = [sys.executable, "-m", "benchmarks.startup_time", "--child", "--query", args.query]
+    if args.semantic:
+        command.append("--semantic")
+    runs = []
+    for _ in range(args.runs):
+        wallStart = time.perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        # The hybrid search starts loading the model in the background, which may print its own lines
+        result = json.loads(next(line for line in reversed(output.splitlines()) if line.startswith("{")))
+        result["timings"]["process total"] = (time.perf_counter() - wallStart) * 1000
+        runs.append(result)
+
+    print(f"cold start over {args.runs} runs (median ms, cumulative from the first import):")
+    for step in runs[0]["timings"]:
+        print(f"  {step:<22} {statistics.median(r['timings'][step] for r in runs):8.0f}")
+    heavy = runs[0]["heavyModules"]
+    print(f"heavy modules before any semantic search: {', '.join(heavy) if heavy else 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compares the vector index backends on ingest time, cold start and query latency.
+
+    python -m benchmarks.vector_backends --count 100000 --dim 768
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+def buildBackend(name: str, directory: Path):
+    if name == "numpy":
+        from backend.db.numpy_vector_db import NumpyVectorDB
+        return NumpyVectorDB(directory)
+    from backend.db.chroma_vector_db import ChromaVectorDB
+    return ChromaVectorDB(str(directory))
+
+def percentile(samples, q: float) -> float:
+    return float(np.percentile(np.asarray(samples) * 1000, q))
+
+def benchmark(name: str, vectors: np.ndarray, queries: np.ndarray, topK: int, batchSize: int):
+    directory = Path(tempfile.mkdtemp(prefix=f"bench_{name}_"))
+    try:
+        ids = [f"/bench/{i}.jpg" for i in range(len(vectors))]
+
+        db = buildBackend(name, directory)
+        start = time.perf_counter()
+        for i in range(0, len(vectors), batchSize):
+            db.addEmbeddings(ids[i:i + batchSize], vectors[i:i + batchSize])
+        ingestSeconds = time.perf_counter() - start
+        del db
+
+        # Cold start: open the persisted index and answer the first query
+        start = time.perf_counter()
+        db = buildBackend(name, directory)
+        db.search(queries[0], topK)
+        coldStartMs = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            db.search(query, topK)
+            latencies.append(time.perf_counter() - start)
+
+        print(
+            f"{name:>6} | ingest {len(vectors) / ingestSeconds:10.0f} vec/s | cold start {coldStartMs:8.1f} ms | "
+            f"query p50 {percentile(latencies, 50):7.2f} ms  p95 {percentile(latencies, 95):7.2f} ms"
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "chroma"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.count, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    print(f"{args.count} vectors x {args.dim} dims, {args.queries} queries, top {args.top_k}")
+
+    for name in args.backends:
+        try:
+            benchmark(name, vectors, queries, args.top_k, args.batch_size)
+        except ImportError as e:
+            print(f"{name:>6} | skipped ({e})")
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,18 @@ import flet as ft
 from pathlib import Path
 from typing import Optional, List
 
+from backend.services.thumbnail_store import ThumbnailStore
+from backend.utils.data_classes import SearchResult
+
 class ResultCard(ft.Container):
     def __init__(
         self,
         path: Path,
         tags: Optional[List[str]] = None,
         indexedDate: Optional[str] = None,
-        onHover = None
+        onHover = None,
+        contentHash: Optional[str] = None,
+        onMoreLikeThis = None
     ):
         super().__init__(
             on_hover = onHover,
@@ -27,15 +32,18 @@ class ResultCard(ft.Container):
         self.path = path
         self.tags = tags or []
         self.indexedDate = indexedDate or ""
+        self.onMoreLikeThis = onMoreLikeThis
+        # Set when the card is recycled by a virtualized grid, so tag edits reach the shared result
+        self.result: Optional[SearchResult] = None
         
-        thumb = ft.Image(
-            src = str(path),
+        self.thumb = ft.Image(
+            src = self.imageSource(path, contentHash),
             width = 200,
             height = 160,
             fit = ft.BoxFit.COVER,
         )
         
-        pathLabel = ft.Text(
+        self.pathLabel = ft.Text(
             str(path.name),
             size = 14,
             selectable = True,
@@ -55,7 +63,7 @@ class ResultCard(ft.Container):
             color = ft.Colors.ON_SURFACE_VARIANT
         )
         
-        dateLabel = ft.Text(
+        self.dateLabel = ft.Text(
             value = f"Indexed: {self.indexedDate}",
             size = 11,
             weight = ft.FontWeight.W_500,
@@ -64,7 +72,7 @@ class ResultCard(ft.Container):
         
         metadataPanel = ft.Container(
             content = ft.Column(
-                controls = [pathLabel, self.tagsLabel, dateLabel],
+                controls = [self.pathLabel, self.tagsLabel, self.dateLabel],
                 spacing=1,
                 alignment=ft.MainAxisAlignment.START,
                 horizontal_alignment=ft.CrossAxisAlignment.START
@@ -74,7 +82,7 @@ class ResultCard(ft.Container):
  
         # Card layout: image on top, metadata below
         innerColumn = ft.Column(
-            controls=[thumb, metadataPanel],
+            controls=[self.thumb, metadataPanel],
             spacing=0,
             expand = True
         )
@@ -84,6 +92,22 @@ class ResultCard(ft.Container):
             on_secondary_tap_down=self.showContextMenu,
         )
 
+    @staticmethod
+    def imageSource(path: Path, contentHash: Optional[str]) -> str:
+        # The original is only a fallback for images indexed before thumbnails existed
+        return str(ThumbnailStore().get(contentHash) or path)
+
+    def bind(self, result: SearchResult):
+        """Points this card at another result without rebuilding its controls."""
+        self.result = result
+        self.path = result.path
+        self.tags = result.tags or []
+        self.indexedDate = result.indexedDate or ""
+        self.thumb.src = self.imageSource(result.path, result.contentHash)
+        self.pathLabel.value = str(result.path.name)
+        self.tagsLabel.value = ", ".join(self.tags) if self.tags else "No tags"
+        self.dateLabel.value = f"Indexed: {self.indexedDate}"
+
     def showContextMenu(self, e: ft.ControlEvent):
         import os
         import subprocess
@@ -126,7 +150,14 @@ class ResultCard(ft.Container):
         def editTags(ev):
             from frontend.src.screens.tags_screen import TagsScreen
             
+            # The card may be recycled for another result while the dialog is open
+            editedResult = self.result
+
             def onTagsSaved(newTags):
+                if editedResult is not None:
+                    editedResult.tags = newTags
+                    if self.result is not editedResult:
+                        return
                 self.tags = newTags
                 self.tagsLabel.value = ", ".join(newTags) if newTags else "No tags"
                 self.update()
@@ -137,6 +168,11 @@ class ResultCard(ft.Container):
             self.page.update()
             closeMenu(None)
 
+        async def moreLikeThis(ev):
+            path = self.path
+            closeMenu(None)
+            await self.onMoreLikeThis(path)
+
         menuItems = [
             ft.TextButton(
                 "Edit Tags", 
@@ -157,6 +193,13 @@ class ResultCard(ft.Container):
                 style=ft.ButtonStyle(padding=ft.padding.symmetric(horizontal=12, vertical=8))
             ),
         ]
+        if self.onMoreLikeThis:
+            menuItems.append(ft.TextButton(
+                "More Like This",
+                icon=ft.Icons.IMAGE_SEARCH_ROUNDED,
+                on_click=moreLikeThis,
+                style=ft.ButtonStyle(padding=ft.padding.symmetric(horizontal=12, vertical=8))
+            ))
 
         # Coordinate extraction with fallbacks for Flet v0.8.0 TapEvent
         try:
@@ -1,35 +1,136 @@
 import flet as ft
-from typing import List
+import math
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
 
 from backend.utils.data_classes import SearchResult
 from frontend.src.components.result_card import ResultCard
 
-class ResultsGrid(ft.GridView):
-    def __init__(self):
+# Ask for the next page once the user scrolls within this many pixels of the end
+LOAD_MORE_THRESHOLD = 600
+# Every cell has the same footprint, so scroll offsets map straight to rows
+CELL_WIDTH = 220
+ROW_HEIGHT = 316
+# Rows materialized above and below the viewport to hide rebinding while scrolling
+BUFFER_ROWS = 2
+# Used until the page reports its real size
+DEFAULT_VIEWPORT_WIDTH = 1200
+DEFAULT_VIEWPORT_HEIGHT = 900
+# Horizontal space taken by the surrounding containers and the grid padding
+HORIZONTAL_CHROME = 120
+
+class ResultsGrid(ft.ListView):
+    """
+    Windowed results grid. All results stay plain data; only the rows in view (plus a buffer)
+    exist as controls, and those rows are recycled by rebinding their cards as the user scrolls.
+    Spacers above and below stand in for the rows that are not materialized.
+    """
+
+    def __init__(
+        self,
+        onLoadMore: Optional[Callable[[], Awaitable[None]]] = None,
+        onMoreLikeThis: Optional[Callable[[Path], Awaitable[None]]] = None
+    ):
         super().__init__()
+        self.onLoadMore = onLoadMore
+        self.onMoreLikeThis = onMoreLikeThis
         self.expand = True
-        self.max_extent = 220
-        self.spacing = 16
-        self.run_spacing = 16
-        self.child_aspect_ratio = 0.7
-        self.scroll = ft.ScrollMode.AUTO
+        self.spacing = 0
         self.padding = 20
-        
-    def showResults(
-        self, 
+        self.on_scroll = self.handleScroll
+        self.on_scroll_interval = 50
+
+        self._results: List[SearchResult] = []
+        self._columns = 0
+        self._scrollOffset = 0.0
+        self._viewportHeight = DEFAULT_VIEWPORT_HEIGHT
+        self._window = (0, 0)
+        self._rowPool: List[ft.Row] = []
+        self._topSpacer = ft.Container(height=0)
+        self._bottomSpacer = ft.Container(height=0)
+        self.controls = [self._topSpacer, self._bottomSpacer]
+
+    async def showResults(
+        self,
         results: List[SearchResult]
     ):
-        self.controls.clear()
-        for r in results:
-            card = ResultCard(
-                path = r.path,
-                tags = r.tags,
-                indexedDate = r.indexedDate,
-                onHover = self.handleCardHover,
-            )
-            self.controls.append(card)
+        self._results = list(results)
+        self._scrollOffset = 0.0
+        self._render(force = True)
+        # The window was rendered for the top, so the list has to be there too
+        await self.scroll_to(offset=0, duration=0)
+
+    def appendResults(
+        self,
+        results: List[SearchResult]
+    ):
+        self._results.extend(results)
+        self._render(force = True)
+
+    def _columnCount(self) -> int:
+        width = self.page.width or DEFAULT_VIEWPORT_WIDTH
+        return max(1, int((width - HORIZONTAL_CHROME) // CELL_WIDTH))
+
+    def _newRow(self) -> ft.Row:
+        return ft.Row(controls=[], height=ROW_HEIGHT, spacing=16, vertical_alignment=ft.CrossAxisAlignment.START)
+
+    def _render(self, force: bool = False):
+        columns = self._columnCount()
+        if columns != self._columns:
+            # A new column count changes every row's contents; start from an empty pool
+            self._columns = columns
+            self._rowPool = []
+            force = True
+
+        rowCount = math.ceil(len(self._results) / columns)
+        visibleRows = math.ceil(self._viewportHeight / ROW_HEIGHT)
+        first = max(0, int(self._scrollOffset // ROW_HEIGHT) - BUFFER_ROWS)
+        last = min(rowCount, first + visibleRows + 2 * BUFFER_ROWS)
+        if (first, last) == self._window and not force:
+            return
+        self._window = (first, last)
+
+        while len(self._rowPool) < last - first:
+            self._rowPool.append(self._newRow())
+        for i, row in enumerate(self._rowPool):
+            rowIndex = first + i
+            row.visible = rowIndex < last
+            if row.visible:
+                self._bindRow(row, self._results[rowIndex * columns:(rowIndex + 1) * columns])
+
+        self._topSpacer.height = first * ROW_HEIGHT
+        self._bottomSpacer.height = (rowCount - last) * ROW_HEIGHT
+        self.controls = [self._topSpacer, *self._rowPool, self._bottomSpacer]
         self.update()
-        
+
+    def _bindRow(self, row: ft.Row, results: List[SearchResult]):
+        for i, result in enumerate(results):
+            if i < len(row.controls):
+                card = row.controls[i]
+                card.bind(result)
+                card.visible = True
+            else:
+                card = ResultCard(
+                    path = result.path,
+                    tags = result.tags,
+                    indexedDate = result.indexedDate,
+                    onHover = self.handleCardHover,
+                    contentHash = result.contentHash,
+                    onMoreLikeThis = self.onMoreLikeThis,
+                )
+                card.result = result
+                row.controls.append(card)
+        # A short last row hides its spare cards rather than dropping them
+        for card in row.controls[len(results):]:
+            card.visible = False
+
+    async def handleScroll(self, e: ft.OnScrollEvent):
+        self._scrollOffset = e.pixels
+        self._viewportHeight = getattr(e, "viewport_dimension", None) or self._viewportHeight
+        self._render()
+        if self.onLoadMore and e.max_scroll_extent - e.pixels < LOAD_MORE_THRESHOLD:
+            await self.onLoadMore()
+
     def handleCardHover(self, e: ft.ControlEvent):
         if e.data == "true":
             e.control.shadow = ft.BoxShadow(
@@ -42,4 +143,4 @@ class ResultsGrid(ft.GridView):
         else:
             e.control.shadow = None
             e.control.scale = 1.0
-        e.control.update()
\ No newline at end of file
+        e.control.update()
@@ -26,7 +26,7 @@ class SplashScreen(ft.Container):
         )
         
         self.status = ft.Text(
-            "Initializing neural engines...",
+            "Starting up...",
             size=14,
             color=ft.Colors.ON_SURFACE_VARIANT,
             italic=True,
@@ -63,7 +63,7 @@ class SplashScreen(ft.Container):
         await asyncio.sleep(0.5)
         self.status.opacity = 1
         self.progress.opacity = 1
-        self.status.value = "Loading AI Model..."
+        self.status.value = "Loading..."
         self.update()
 
     def setStatus(self, text: str):
@@ -7,6 +7,11 @@ os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 
 from frontend.src.components.splash_screen import SplashScreen
 
+def loadHomeScreen(page: ft.Page):
+    # Imported here to avoid blocking splash display
+    from frontend.src.screens.home_screen import HomeScreen
+    return HomeScreen(page)
+
 async def main(page: ft.Page):
     page.title = "AI Image Search"
     page.theme_mode = ft.ThemeMode.SYSTEM
@@ -17,25 +22,25 @@ async def main(page: ft.Page):
     # 1. Show Splash Screen
     splash = SplashScreen()
     page.add(splash)
-    await splash.animateIn()
     
-    # 2. Async Loading of heavy components
+    # 2. Async Loading of backend components, while the splash animates.
+    # No model is loaded here: the first semantic search or indexing job loads it,
+    # and tag and keyword search work as soon as the home screen is up.
+    homeTask = asyncio.create_task(asyncio.to_thread(loadHomeScreen, page))
+    await splash.animateIn()
     try:
-        # Move imports here to avoid blocking splash display
-        splash.setStatus("Loading Backend Services...")
-        from frontend.src.screens.home_screen import HomeScreen
-        
-        # Initialize HomeScreen (and Qwen model) in background
-        splash.setStatus("Warming up Model and Search Engines...")
-        home = await asyncio.to_thread(HomeScreen, page)
+        splash.setStatus("Opening Library...")
+        home = await homeTask
         
         # 3. Transition to Home Screen
-        splash.setStatus("Almost there...")
-        await asyncio.sleep(0.5)
-        
         page.clean()
         page.add(home)
         page.update()
+
+        from backend.services.indexing_manager import IndexingManager
+        from backend.services.settings_manager import SettingsManager
+        if SettingsManager().watchFolders:
+            IndexingManager().startWatching()
         
     except Exception as e:
         splash.setStatus(f"Error: {str(e)}")
@@ -1,8 +1,10 @@
-import flet as ft
 import asyncio
+import flet as ft
 from pathlib import Path
 
-from backend.services.search import SearchEngine
+from backend.services.search_client import SearchClient
+from backend.services.settings_manager import SettingsManager
+from backend.services.search import SearchEngine, PAGE_SIZE
 from frontend.src.components.results_grid import ResultsGrid
 from frontend.src.components.top_bar import TopBar
 
@@ -10,14 +12,19 @@ class HomeScreen(ft.Column):
     def __init__(self, page: ft.Page):
         super().__init__(expand=True)
         
-        self.searchEngine = SearchEngine()
+        # With a search server configured the UI is a thin client and never loads a model itself
+        serverUrl = SettingsManager().searchServerUrl
+        self.searchEngine = SearchClient(serverUrl) if serverUrl else SearchEngine(loadModelInBackground = True)
+        # Async generator of result pages for the current search; advanced as the grid scrolls
+        self._pages = None
+        self._loadingMore = False
         
         self.topBar = TopBar(
             self.runSearch, 
             self.changeTheme,
             page = page
         )
-        self.resultsGrid = ResultsGrid()
+        self.resultsGrid = ResultsGrid(onLoadMore = self.loadMore, onMoreLikeThis = self.showSimilar)
         self.resultsGrid.expand = True
         
         self.welcomeLabel = ft.Text(
@@ -28,6 +35,14 @@ class HomeScreen(ft.Column):
             color = ft.Colors.ON_SURFACE_VARIANT
         )
 
+        self.modelHint = ft.Text(
+            "Loading the search model; showing tag and keyword matches for now",
+            size = 12,
+            italic = True,
+            color = ft.Colors.ON_SURFACE_VARIANT,
+            visible = False
+        )
+
         self.searchSpinner = ft.ProgressRing(
             width=32,
             height=32,
@@ -41,6 +56,7 @@ class HomeScreen(ft.Column):
             ft.Container(
                 content=ft.Column([
                     self.welcomeLabel,
+                    self.modelHint,
                     self.searchSpinner,
                     ft.Container(
                         content=self.resultsGrid, 
@@ -67,27 +83,58 @@ class HomeScreen(ft.Column):
         self.update()
         
         try:
-            # Run model/search in background thread to keep UI alive
-            results = await asyncio.to_thread(self.searchEngine.searchHybrid, query, tagFilter=query)
-            
-            tagResults = results.get("tagResults", [])
-            semanticResults = results.get("semanticResults", [])
-            
-            # Combine unique results by path
-            seenPaths = set()
-            combined = []
-            for r in tagResults + semanticResults:
-                if r.path not in seenPaths:
-                    combined.append(r)
-                    seenPaths.add(r.path)
-            
-            self.resultsGrid.showResults(combined)
+            # Pages are fetched in a background thread by the generator to keep UI alive
+            self._pages = self.searchEngine.streamSearch(query, ensureThumbnails = True)
+            page = await self._pages.__anext__()
+            await self.resultsGrid.showResults(page.results)
+            if not page.hasMore:
+                self._pages = None
         except Exception as ex:
             print(f"Search Error: {ex}")
         finally:
+            # Hybrid searches skip semantic matches until the first search has loaded the model in the background
+            self.modelHint.visible = not self.searchEngine.isModelReady
             self.searchSpinner.visible = False
             self.resultsGrid.visible = True
             self.update()
         
+    async def showSimilar(self, path: Path):
+        self.welcomeLabel.visible = False
+        self.searchSpinner.visible = True
+        self.resultsGrid.visible = False
+        self.update()
+
+        try:
+            # A similarity search is a single ranked page; scrolling no longer loads the previous search
+            self._pages = None
+            results = await asyncio.to_thread(self.searchEngine.searchSimilar, path, PAGE_SIZE, True)
+            await self.resultsGrid.showResults(results)
+        except Exception as ex:
+            print(f"Search Error: {ex}")
+        finally:
+            self.searchSpinner.visible = False
+            self.resultsGrid.visible = True
+            self.update()
+
+    async def loadMore(self):
+        pages = self._pages
+        if pages is None or self._loadingMore:
+            return
+        self._loadingMore = True
+        try:
+            page = await pages.__anext__()
+            # A new search may have started while this page was loading
+            if pages is not self._pages:
+                return
+            self.resultsGrid.appendResults(page.results)
+            if not page.hasMore:
+                self._pages = None
+        except StopAsyncIteration:
+            self._pages = None
+        except Exception as ex:
+            print(f"Search Error: {ex}")
+        finally:
+            self._loadingMore = False
+
     def changeTheme(self, e):
         pass
\ No newline at end of file
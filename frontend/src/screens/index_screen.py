@@ -4,6 +4,7 @@ from tkinter import filedialog
 from pathlib import Path
 import asyncio
 from backend.services.indexing_manager import IndexingManager
+from backend.services.settings_manager import SettingsManager
 
 class IndexScreen(ft.AlertDialog):
     def __init__(self):
@@ -14,6 +15,7 @@ class IndexScreen(ft.AlertDialog):
         
         self.indexingManager = IndexingManager()
         self.indexingManager.subscribe(self.syncWithManager)
+        self.settings = SettingsManager()
         
         self.folderInput = ft.TextField(
             hint_text = "Select folder to index...",
@@ -46,6 +48,12 @@ class IndexScreen(ft.AlertDialog):
         self.progressBar = ft.ProgressBar(width = 500, value = 0, color=ft.Colors.PRIMARY, bgcolor=ft.Colors.SURFACE_CONTAINER)
         
         self.folderList = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO, height=200)
+
+        self.watchSwitch = ft.Switch(
+            label = "Watch managed folders for changes",
+            value = self.settings.watchFolders,
+            on_change = self.handleWatchChange
+        )
         
         self.content = ft.Column([
             ft.Text("Index New Folder", weight=ft.FontWeight.BOLD, size=16),
@@ -58,6 +66,7 @@ class IndexScreen(ft.AlertDialog):
             ], spacing=5, horizontal_alignment=ft.CrossAxisAlignment.STRETCH),
             ft.Divider(height=30),
             ft.Text("Managed Folders", weight=ft.FontWeight.BOLD, size=16),
+            self.watchSwitch,
             ft.Container(
                 content=self.folderList,
                 bgcolor=ft.Colors.SURFACE_CONTAINER_LOW,
@@ -160,6 +169,13 @@ class IndexScreen(ft.AlertDialog):
             return
         asyncio.create_task(self.indexingManager.startIndexing(folderPath))
         
+    async def handleWatchChange(self, e):
+        self.settings.watchFolders = self.watchSwitch.value
+        if self.watchSwitch.value:
+            self.indexingManager.startWatching()
+        else:
+            self.indexingManager.stopWatching()
+
     def closeDialog(self, e):
         self.open = False
         self.update()
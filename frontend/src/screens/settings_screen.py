@@ -1,5 +1,6 @@
 import flet as ft
 from backend.services.settings_manager import SettingsManager
+from backend.services.model_factory import EMBEDDING_MODELS
 
 class SettingsScreen(ft.AlertDialog):
     def __init__(self, page: ft.Page):
@@ -24,9 +25,20 @@ class SettingsScreen(ft.AlertDialog):
         # Set on_change explicitly to avoid constructor issues in older Flet versions
         self.modelDropdown.on_change = self.handleModelChange
         
+        self.embeddingDropdown = ft.Dropdown(
+            label="Search Embedding Model",
+            options=[ft.dropdown.Option(name) for name in EMBEDDING_MODELS],
+            value=self.settingsManager.embeddingModel,
+            width=400,
+            border_radius=12,
+        )
+        self.embeddingDropdown.on_change = self.handleEmbeddingChange
+
         self.modelInfo = ft.Text(
             "Qwen3-VL-2B: Detailed, high-quality captions and embeddings. (~4-6GB VRAM)\n"
-            "Florence-2-Base: Extremely fast, lightweight, good captions. (~1GB VRAM)",
+            "Florence-2-Base: Extremely fast, lightweight, good captions. (~1GB VRAM)\n"
+            "Search embeddings: 'Captioner' reuses the vision model; CLIP-ViT-B-32 is a small aligned "
+            "text/image model that answers queries in milliseconds, even on CPU.",
             size=12,
             color=ft.Colors.ON_SURFACE_VARIANT
         )
@@ -34,9 +46,10 @@ class SettingsScreen(ft.AlertDialog):
         self.content = ft.Column([
             ft.Text("Model Configuration", weight=ft.FontWeight.BOLD, size=16),
             self.modelDropdown,
+            self.embeddingDropdown,
             self.modelInfo,
             ft.Divider(height=20),
-            ft.Text("Important: Switching models will change how new images are indexed. Semantic search might not work correctly if different models are used for existing results and the current search.", 
+            ft.Text("Important: Each model keeps its own semantic search index. After switching models, sync your folders so the new model can index them; tag search keeps working meanwhile.", 
                     size=12, color=ft.Colors.ERROR, weight=ft.FontWeight.W_500),
             ft.Container(height=20),
         ], tight=True, spacing=15)
@@ -56,6 +69,16 @@ class SettingsScreen(ft.AlertDialog):
         self._page.snack_bar.open = True
         self._page.update()
 
+    def handleEmbeddingChange(self, e):
+        newModel = self.embeddingDropdown.value
+        self.settingsManager.embeddingModel = newModel
+        self._page.snack_bar = ft.SnackBar(
+            content=ft.Text(f"Search embeddings switched to {newModel}. Sync your folders to build its index."),
+            action="OK"
+        )
+        self._page.snack_bar.open = True
+        self._page.update()
+
     def closeDialog(self, e):
         self.open = False
         self.update()
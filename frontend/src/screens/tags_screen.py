@@ -2,6 +2,7 @@ import flet as ft
 from pathlib import Path
 from typing import List, Callable, Dict
 from backend.db.metadata_db import MetadataDB
+from backend.services.thumbnail_store import ThumbnailStore
 
 class TagsScreen(ft.AlertDialog):
     def __init__(self, imagePath: Path, currentTags: List[str], onSaved: Callable):
@@ -74,6 +75,7 @@ class GlobalTagsScreen(ft.AlertDialog):
         super().__init__()
         self.modal = True
         self.db = MetadataDB()
+        self.thumbnails = ThumbnailStore()
         self.title = ft.Text("Custom Tags Manager", weight=ft.FontWeight.W_700)
         self.shape = ft.RoundedRectangleBorder(radius=28)
         self.content_padding = 24
@@ -108,7 +110,7 @@ class GlobalTagsScreen(ft.AlertDialog):
                 self.imageList.controls.append(
                     ft.Container(
                         content=ft.Row([
-                            ft.Image(src=str(img.path), width=50, height=50, fit=ft.BoxFit.COVER, border_radius=8),
+                            ft.Image(src=str(self.thumbnails.get(img.contentHash) or img.path), width=50, height=50, fit=ft.BoxFit.COVER, border_radius=8),
                             ft.Column([
                                 ft.Text(img.path.name, size=13, weight=ft.FontWeight.BOLD, overflow=ft.TextOverflow.ELLIPSIS),
                                 ft.Text(", ".join(img.tags) if img.tags else "No tags", size=11, color=ft.Colors.ON_SURFACE_VARIANT, overflow=ft.TextOverflow.ELLIPSIS),
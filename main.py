@@ -0,0 +1,298 @@
+"""
+Headless command line interface: index and search without the desktop app, e.g. from cron on a server.
+
+    python main.py index /mnt/nas/photos --batch-size 8 --workers 8
+    python main.py sync                          # every managed folder
+    python main.py unindex /mnt/nas/photos/old
+    python main.py search "dog on a beach" --mode hybrid --limit 20
+    python main.py search "dog beach" --mode tag --all-tags   # images tagged with both
+    python main.py stats --json
+    python main.py duplicates --similarity 0.95   # near-duplicate groups from the stored embeddings
+    python main.py serve --port 8765             # keep the model warm for other processes (HTTP/JSON)
+
+Exit codes: 0 success, 1 error, 2 invalid usage, 3 finished but some images failed to index.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from pathlib import Path
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+# Progress lines are printed at most this often, so logs of long runs stay readable
+PROGRESS_INTERVAL = 5.0
+
+class ProgressPrinter:
+    """Manager subscriber printing the status as plain lines (no carriage returns, they garble cron mail)."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.lastPrinted = 0.0
+        self.lastStatus = None
+
+    def __call__(self):
+        now = time.monotonic()
+        status = self.manager.status
+        if status != self.lastStatus and now - self.lastPrinted >= PROGRESS_INTERVAL:
+            print(f"  {status}", flush=True)
+            self.lastPrinted = now
+            self.lastStatus = status
+
+def applyOverrides(args):
+    from backend.services.settings_manager import SettingsManager
+    settings = SettingsManager()
+    if getattr(args, "batch_size", None):
+        settings.override("indexBatchSize", args.batch_size)
+    if getattr(args, "workers", None):
+        settings.override("decodeWorkers", args.workers)
+
+async def runFolders(folders, unindex: bool = False) -> int:
+    from backend.services.indexing_manager import IndexingManager
+    manager = IndexingManager()
+    manager.subscribe(ProgressPrinter(manager))
+
+    exitCode = EXIT_OK
+    for folder in folders:
+        print(f"{'Unindexing' if unindex else 'Syncing'} {folder}", flush=True)
+        start = time.perf_counter()
+        if unindex:
+            await manager.unindexFolder(folder)
+        else:
+            await manager.startIndexing(folder)
+        seconds = max(time.perf_counter() - start, 1e-9)
+
+        if manager.lastError:
+            print(f"  Failed: {manager.lastError}", file=sys.stderr)
+            exitCode = EXIT_ERROR
+            continue
+        counts = manager.lastSync
+        if unindex:
+            print(f"  {counts.removed} removed in {seconds:.1f}s")
+            continue
+        print(f"  {manager.status}")
+        done = counts.indexed + counts.reused
+        print(
+            f"  {counts.discovered} files scanned, {done} indexed in {seconds:.1f}s "
+            f"({done / seconds:.2f} images/s, {counts.discovered / seconds:.0f} files/s scanned)"
+        )
+        if counts.failed and exitCode == EXIT_OK:
+            exitCode = EXIT_PARTIAL
+    return exitCode
+
+def indexCommand(args) -> int:
+    folders = [Path(f).expanduser().resolve() for f in args.folders]
+    missing = [str(f) for f in folders if not f.is_dir()]
+    if missing:
+        print(f"Not a folder: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_USAGE
+    applyOverrides(args)
+    return asyncio.run(runFolders([str(f) for f in folders]))
+
+def syncCommand(args) -> int:
+    if args.folders:
+        return indexCommand(args)
+    from backend.services.settings_manager import SettingsManager
+    folders = SettingsManager().managedFolders
+    if not folders:
+        print("No managed folders yet; add one with: python main.py index <folder>", file=sys.stderr)
+        return EXIT_USAGE
+    applyOverrides(args)
+    return asyncio.run(runFolders(folders))
+
+def unindexCommand(args) -> int:
+    return asyncio.run(runFolders([str(Path(f).expanduser().resolve()) for f in args.folders], unindex = True))
+
+def searchCommand(args) -> int:
+    from backend.services.search import SearchEngine, SEARCH_MODES
+    if args.mode not in SEARCH_MODES:
+        print(f"Unknown mode {args.mode!r}, expected one of: {', '.join(SEARCH_MODES)}", file=sys.stderr)
+        return EXIT_USAGE
+    engine = SearchEngine()
+    start = time.perf_counter()
+    page = engine.searchPage(
+        args.query,
+        mode = args.mode,
+        limit = args.limit,
+        tagFilter = args.tags,
+        matchAllTags = args.all_tags,
+        tagPrefix = args.tag_prefix
+    )
+    milliseconds = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps([r.toDict() for r in page.results], indent = 2))
+    else:
+        for r in page.results:
+            print(f"{r.score:9.4f}  {r.path}  [{', '.join(r.tags)}]")
+    print(f"{len(page.results)} results in {milliseconds:.0f} ms", file=sys.stderr)
+    return EXIT_OK
+
+def statsCommand(args) -> int:
+    from backend.db.metadata_db import MetadataDB
+    from backend.db.vector_db import listVectorSpaces, openVectorDb
+    from backend.services.settings_manager import SettingsManager
+    from backend.utils.constants import DB_PATH
+
+    settings = SettingsManager()
+    db = MetadataDB()
+    stats = {
+        "images": db.countImages(),
+        "tags": db.countTags(),
+        "database_mb": round(Path(DB_PATH).stat().st_size / 1024 / 1024, 1) if Path(DB_PATH).exists() else 0.0,
+        "active_model": settings.activeModel,
+        "embedding_model": settings.embeddingModel,
+        "vector_backend": settings.vectorBackend,
+        "vector_spaces": {space: openVectorDb(space).count() for space in listVectorSpaces()},
+        "managed_folders": {
+            folder: len(db.getFileStatesInFolder(folder)) for folder in settings.managedFolders
+        },
+    }
+    if args.json:
+        print(json.dumps(stats, indent = 2))
+        return EXIT_OK
+
+    print(f"Images:           {stats['images']}")
+    print(f"Distinct tags:    {stats['tags']}")
+    print(f"Metadata DB:      {stats['database_mb']} MB")
+    print(f"Captioning model: {stats['active_model']}")
+    print(f"Embedding model:  {stats['embedding_model']}")
+    print(f"Vector backend:   {stats['vector_backend']}")
+    for space, count in stats["vector_spaces"].items():
+        print(f"  {space}: {count} vectors")
+    print("Managed folders:" + ("" if stats["managed_folders"] else " none"))
+    for folder, count in stats["managed_folders"].items():
+        print(f"  {folder}: {count} images")
+    return EXIT_OK
+
+def duplicatesCommand(args) -> int:
+    from backend.services.duplicate_finder import DuplicateFinder
+    from backend.utils.image_hash import HASH_BITS
+    if not 0 < args.similarity <= 1:
+        print("--similarity must be in (0, 1]", file=sys.stderr)
+        return EXIT_USAGE
+    if not 0 <= args.max_hash_distance <= HASH_BITS:
+        print(f"--max-hash-distance must be between 0 and {HASH_BITS}", file=sys.stderr)
+        return EXIT_USAGE
+
+    lastPrinted = 0.0
+
+    def onProgress(done: int, total: int):
+        nonlocal lastPrinted
+        now = time.monotonic()
+        if done < total and now - lastPrinted >= PROGRESS_INTERVAL:
+            print(f"  Compared {done}/{total} blocks", file=sys.stderr, flush=True)
+            lastPrinted = now
+
+    start = time.perf_counter()
+    # Images that fail to hash are reported with print(); keep stdout for the groups
+    with contextlib.redirect_stdout(sys.stderr):
+        groups = DuplicateFinder().findGroups(
+            args.similarity,
+            None if args.no_hash else args.max_hash_distance,
+            args.space,
+            onProgress
+        )
+    seconds = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps([[str(p) for p in group] for group in groups], indent = 2))
+    else:
+        for i, group in enumerate(groups, start = 1):
+            print(f"Group {i} ({len(group)} images)")
+            for path in group:
+                print(f"  {path}")
+    images = sum(len(group) for group in groups)
+    print(f"{len(groups)} groups ({images} images) in {seconds:.1f}s", file=sys.stderr)
+    return EXIT_OK
+
+async def runServer(args) -> int:
+    from backend.services.query_batcher import DEFAULT_MAX_BATCH_SIZE
+    from backend.services.search_server import SearchServer, DEFAULT_HOST, DEFAULT_PORT
+    host = args.host or DEFAULT_HOST
+    server = SearchServer(maxBatchSize = args.max_batch or DEFAULT_MAX_BATCH_SIZE)
+    if not args.no_warmup:
+        print("Loading the embedding model...", flush=True)
+    port = await server.start(host, DEFAULT_PORT if args.port is None else args.port, warmUp = not args.no_warmup)
+    print(f"Serving search on http://{host}:{port}", flush=True)
+    try:
+        await server.serveForever()
+    finally:
+        await server.stop()
+    return EXIT_OK
+
+def serveCommand(args) -> int:
+    return asyncio.run(runServer(args))
+
+def buildParser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    def addIndexingOptions(command):
+        command.add_argument("--batch-size", type=int, help="Images per model batch (default: indexBatchSize setting)")
+        command.add_argument("--workers", type=int, help="Image decode threads (default: decodeWorkers setting)")
+
+    index = commands.add_parser("index", help="Index folders (new and changed images) and add them to the managed folders")
+    index.add_argument("folders", nargs="+")
+    addIndexingOptions(index)
+    index.set_defaults(handler=indexCommand)
+
+    sync = commands.add_parser("sync", help="Sync folders with the index; defaults to every managed folder")
+    sync.add_argument("folders", nargs="*")
+    addIndexingOptions(sync)
+    sync.set_defaults(handler=syncCommand)
+
+    unindex = commands.add_parser("unindex", help="Remove folders from the index")
+    unindex.add_argument("folders", nargs="+")
+    unindex.set_defaults(handler=unindexCommand)
+
+    search = commands.add_parser("search", help="Search the index")
+    search.add_argument("query")
+    search.add_argument("--mode", default="hybrid", help="hybrid (default), semantic, keyword or tag")
+    search.add_argument("--tags", help="Tag filter for hybrid search (defaults to the query)")
+    search.add_argument("--all-tags", action="store_true", help="Tag lookup requires every tag (AND) instead of any (OR)")
+    search.add_argument("--tag-prefix", action="store_true", help="Tags match by prefix (\"cat\" finds \"cats\")")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--json", action="store_true")
+    search.set_defaults(handler=searchCommand)
+
+    stats = commands.add_parser("stats", help="Show index statistics")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(handler=statsCommand)
+
+    duplicates = commands.add_parser("duplicates", help="Find groups of near-duplicate images")
+    duplicates.add_argument("--similarity", type=float, default=0.9, help="Minimum embedding cosine similarity (default: 0.9)")
+    duplicates.add_argument("--max-hash-distance", type=int, default=10, help="Most differing perceptual hash bits (default: 10)")
+    duplicates.add_argument("--no-hash", action="store_true", help="Group on embedding similarity alone, without the hash check")
+    duplicates.add_argument("--space", help="Embedding space to compare (default: that of the most recently indexed image)")
+    duplicates.add_argument("--json", action="store_true")
+    duplicates.set_defaults(handler=duplicatesCommand)
+
+    serve = commands.add_parser("serve", help="Run the local HTTP search server with the model kept loaded")
+    serve.add_argument("--host", help="Interface to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, help="Port to listen on (default: 8765)")
+    serve.add_argument("--max-batch", type=int, help="Most queries encoded in one forward pass (default: 32)")
+    serve.add_argument("--no-warmup", action="store_true", help="Load the model on the first query instead of at startup")
+    serve.set_defaults(handler=serveCommand)
+    return parser
+
+def main() -> int:
+    parser = buildParser()
+    args = parser.parse_args()
+    if not args.command:
+        parser.print_help()
+        return EXIT_USAGE
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+if __name__ == "__main__":
+    sys.exit(main())
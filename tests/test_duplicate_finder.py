@@ -0,0 +1,129 @@
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.db.metadata_db import MetadataDB
+from backend.services.duplicate_finder import DuplicateFinder
+from backend.utils.data_classes import IndexedImage
+from backend.utils.image_hash import HASH_BITS, hashSignMatrix
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & (2 ** HASH_BITS - 1)).count("1")
+
+def flipBits(value: int, bits) -> int:
+    # Flipping bit 63 of a signed int64 has to wrap around rather than overflow
+    return int(np.int64(value) ^ np.bitwise_or.reduce([np.int64(1) << np.int64(b) for b in bits]))
+
+def unitRows(rng, n: int, dim: int = 64) -> np.ndarray:
+    rows = rng.standard_normal((n, dim)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis = 1, keepdims = True)
+
+def pairSet(pairs: np.ndarray) -> set:
+    return {tuple(p) for p in pairs.tolist()}
+
+def test_hash_sign_products_are_hamming_distances():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, 40, dtype = np.int64)
+    hashes[:3] = [0, -1, np.iinfo(np.int64).min]
+    signs = hashSignMatrix(hashes)
+    assert signs.shape == (40, HASH_BITS)
+    assert set(np.unique(signs)) == {-1.0, 1.0}
+    products = signs @ signs.T
+    for i, j in combinations(range(len(hashes)), 2):
+        assert products[i, j] == HASH_BITS - 2 * hamming(int(hashes[i]), int(hashes[j]))
+
+@pytest.mark.parametrize("blockSize", [1, 7, 16, 1000])
+def test_similar_pairs_across_blocks(blockSize):
+    rng = np.random.default_rng(1)
+    embeddings = unitRows(rng, 50)
+    # Pairs inside the first tile, across tiles and at the very end
+    planted = [(0, 1), (2, 45), (15, 16), (48, 49)]
+    for i, j in planted:
+        embeddings[j] = embeddings[i] + 0.01 * rng.standard_normal(embeddings.shape[1]).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis = 1, keepdims = True)
+
+    pairs = DuplicateFinder.similarPairs(embeddings, 0.9, blockSize = blockSize)
+    scores = embeddings @ embeddings.T
+    expected = {(i, j) for i, j in combinations(range(len(embeddings)), 2) if scores[i, j] >= 0.9}
+    assert set(planted) <= expected
+    # Each pair exactly once, lower index first, never an image with itself
+    assert len(pairs) == len(expected)
+    assert pairSet(pairs) == expected
+
+def test_similar_pairs_with_hash_prefilter():
+    rng = np.random.default_rng(2)
+    embeddings = unitRows(rng, 20)
+    hashes = rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, 20, dtype = np.int64)
+    # Same picture with a couple of hash bits off, and one whose hash is too far away
+    embeddings[9] = embeddings[3]
+    hashes[9] = flipBits(hashes[3], [0, 63])
+    embeddings[17] = embeddings[5]
+    hashes[17] = flipBits(hashes[5], range(12))
+    signs = hashSignMatrix(hashes)
+
+    pairs = DuplicateFinder.similarPairs(embeddings, 0.9, signs, maxHashDistance = 10, blockSize = 8)
+    assert pairSet(pairs) == {(3, 9)}
+    pairs = DuplicateFinder.similarPairs(embeddings, 0.9, signs, maxHashDistance = 12, blockSize = 8)
+    assert pairSet(pairs) == {(3, 9), (5, 17)}
+
+def test_zeroed_hash_rows_never_match():
+    embeddings = np.tile(unitRows(np.random.default_rng(3), 1), (4, 1))
+    signs = hashSignMatrix(np.zeros(4, dtype = np.int64))
+    signs[2:] = 0
+    pairs = DuplicateFinder.similarPairs(embeddings, 0.9, signs, maxHashDistance = 10, blockSize = 3)
+    assert pairSet(pairs) == {(0, 1)}
+
+def test_similar_pairs_empty_and_single():
+    assert DuplicateFinder.similarPairs(np.empty((0, 4), np.float32), 0.9).shape == (0, 2)
+    assert DuplicateFinder.similarPairs(unitRows(np.random.default_rng(4), 1), 0.9).shape == (0, 2)
+
+def test_similar_pairs_reports_progress():
+    progress = []
+    DuplicateFinder.similarPairs(
+        unitRows(np.random.default_rng(5), 10), 0.9, blockSize = 4, onProgress = lambda *p: progress.append(p)
+    )
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+def test_components():
+    paths = [Path(f"{i}.jpg") for i in range(8)]
+    # 0-1-2 chain through 1, 6-4 given out of order, 3/5/7 unpaired
+    pairs = np.array([[1, 2], [0, 1], [4, 6]])
+    groups = DuplicateFinder._components(paths, pairs)
+    assert [sorted(p.name for p in g) for g in groups] == [["0.jpg", "1.jpg", "2.jpg"], ["4.jpg", "6.jpg"]]
+    assert DuplicateFinder._components(paths, np.empty((0, 2), dtype = np.int64)) == []
+
+def test_find_groups(tmp_path):
+    db = MetadataDB(tmp_path / "metadata.db")
+    rng = np.random.default_rng(6)
+    a, b, c = unitRows(rng, 3)
+    aHash, bHash = 0x1234, -0x5678
+    images = [
+        ("a.jpg", a, aHash, "space"),
+        ("a copy.jpg", a, flipBits(aHash, [1, 2]), "space"),
+        ("b.jpg", b, bHash, "space"),
+        ("b edited.jpg", b, flipBits(bHash, range(40)), "space"),
+        ("c.jpg", c, 7, "space"),
+        # Never hashed and not on disk, so it cannot be hashed now either
+        ("a missing.jpg", a, None, "space"),
+        ("a other space.jpg", a, aHash, "other"),
+    ]
+    db.addImages([
+        IndexedImage(tmp_path / name, "", [], embedding, embeddingSpace = space, perceptualHash = phash)
+        for name, embedding, phash, space in images
+    ])
+    finder = DuplicateFinder(db)
+
+    def names(groups):
+        return [sorted(p.name for p in g) for g in groups]
+
+    assert names(finder.findGroups(space = "space")) == [["a copy.jpg", "a.jpg"]]
+    # Past HASH_BITS / 2 every hashed pair is within range, yet the unhashed image still stays out
+    assert names(finder.findGroups(maxHashDistance = HASH_BITS, space = "space")) == [
+        ["a copy.jpg", "a.jpg"], ["b edited.jpg", "b.jpg"]
+    ]
+    assert names(finder.findGroups(maxHashDistance = None, space = "space")) == [
+        ["a copy.jpg", "a missing.jpg", "a.jpg"], ["b edited.jpg", "b.jpg"]
+    ]
+    assert finder.findGroups(space = "other") == []
@@ -0,0 +1,154 @@
+import asyncio
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import backend.services.indexer as indexerModule
+import backend.services.indexing_manager as indexingManagerModule
+from backend.db.metadata_db import MetadataDB
+from backend.db.numpy_vector_db import NumpyVectorDB
+from backend.db.vector_db import vectorSpaceName
+from backend.services.indexer import Indexer
+from backend.services.indexing_manager import IndexingManager
+from backend.utils.data_classes import IndexedImage
+from backend.utils.file_utils import getFileState
+
+MODEL = "Test-Embedder"
+SPACE = vectorSpaceName(MODEL, 4)
+OTHER_SPACE = vectorSpaceName("Other-Embedder", 4)
+
+class StubModelFactory:
+    def getActiveModel(self):
+        # Reused images never reach a model
+        return None
+
+    def getEmbeddingModelName(self):
+        return MODEL
+
+@pytest.fixture
+def indexer(tmp_path, monkeypatch):
+    # Default data/ paths (thumbnails, settings) resolve inside the temp folder
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    spaces = {}
+
+    def openVectorDb(space):
+        if space not in spaces:
+            spaces[space] = NumpyVectorDB(tmp_path / "vectors" / space)
+        return spaces[space]
+
+    monkeypatch.setattr(indexerModule, "openVectorDb", openVectorDb)
+    monkeypatch.setattr(indexerModule, "listVectorSpaces", lambda: sorted(spaces))
+    indexer = Indexer()
+    indexer.metadataDb = MetadataDB(tmp_path / "metadata.db")
+    indexer.modelFactory = StubModelFactory()
+    indexer.vectors = openVectorDb
+    return indexer
+
+def writeImage(path: Path, content: bytes = b"picture bytes") -> Path:
+    path.parent.mkdir(parents = True, exist_ok = True)
+    path.write_bytes(content)
+    return path
+
+def indexCopy(indexer: Indexer, path: Path, space: str = SPACE, tags = ("dog", "beach")) -> np.ndarray:
+    """Stores path as if the model had indexed it, and returns its embedding."""
+    embedding = np.arange(4, dtype = np.float32) + len(str(path))
+    indexer.persistBatch([IndexedImage(
+        path = path,
+        caption = "a dog on a beach",
+        tags = list(tags),
+        embedding = embedding,
+        fileState = getFileState(path),
+        embeddingSpace = space,
+        perceptualHash = 42
+    )])
+    return embedding
+
+def rowOf(indexer: Indexer, path: Path):
+    return indexer.metadataDb.getImagesByPaths([path]).get(path)
+
+def test_move_keeps_id_tags_and_vector(indexer, tmp_path):
+    old = writeImage(tmp_path / "photos" / "old.jpg")
+    embedding = indexCopy(indexer, old)
+    oldId = indexer.metadataDb._conn.execute("SELECT id FROM images WHERE path = ?", (str(old),)).fetchone()[0]
+    new = tmp_path / "photos" / "renamed.jpg"
+    old.rename(new)
+
+    assert indexer.reuseIndexed(new, getFileState(new))
+    assert rowOf(indexer, old) is None
+    assert sorted(rowOf(indexer, new).tags) == ["beach", "dog"]
+    assert indexer.metadataDb._conn.execute("SELECT id FROM images WHERE path = ?", (str(new),)).fetchone()[0] == oldId
+    vectors = indexer.vectors(SPACE)
+    assert vectors.missingIds([str(old), str(new)]) == {str(old)}
+    assert np.allclose(indexer.metadataDb.getEmbedding(new), embedding)
+
+def test_duplicate_reuses_caption_tags_and_embedding(indexer, tmp_path):
+    original = writeImage(tmp_path / "a.jpg")
+    embedding = indexCopy(indexer, original)
+    copy = writeImage(tmp_path / "copy of a.jpg")
+
+    assert indexer.reuseIndexed(copy, getFileState(copy))
+    # Both stay indexed, each with its own row and vector
+    assert sorted(rowOf(indexer, copy).tags) == ["beach", "dog"]
+    assert rowOf(indexer, original) is not None
+    assert indexer.metadataDb.getImagesByContentHash(getFileState(copy).contentHash)[0].caption == "a dog on a beach"
+    assert np.allclose(indexer.metadataDb.getEmbedding(copy), embedding)
+    assert indexer.vectors(SPACE).missingIds([str(original), str(copy)]) == set()
+
+def test_duplicate_from_another_embedding_model_is_not_reused(indexer, tmp_path):
+    indexCopy(indexer, writeImage(tmp_path / "a.jpg"), space = OTHER_SPACE)
+    copy = writeImage(tmp_path / "copy of a.jpg")
+
+    assert not indexer.reuseIndexed(copy, getFileState(copy))
+    assert rowOf(indexer, copy) is None
+
+def test_unrelated_content_is_not_reused(indexer, tmp_path):
+    indexCopy(indexer, writeImage(tmp_path / "a.jpg"))
+    other = writeImage(tmp_path / "b.jpg", b"other bytes")
+    assert not indexer.reuseIndexed(other, getFileState(other))
+
+def test_two_copies_racing_for_one_moved_row(indexer, tmp_path, monkeypatch):
+    moved = writeImage(tmp_path / "a.jpg")
+    embedding = indexCopy(indexer, moved)
+    first, second = writeImage(tmp_path / "b.jpg"), writeImage(tmp_path / "c.jpg")
+    moved.unlink()
+    contentHash = getFileState(first).contentHash
+    # Both workers looked the content up before either relinked it
+    stale = indexer.metadataDb.getImagesByContentHash(contentHash)
+    monkeypatch.setattr(indexer.metadataDb, "getImagesByContentHash", lambda h: list(stale))
+
+    assert indexer.reuseIndexed(first, getFileState(first))
+    assert indexer.reuseIndexed(second, getFileState(second))
+    for path in (first, second):
+        assert sorted(rowOf(indexer, path).tags) == ["beach", "dog"]
+        assert np.allclose(indexer.metadataDb.getEmbedding(path), embedding)
+    assert indexer.vectors(SPACE).missingIds([str(moved), str(first), str(second)]) == {str(moved)}
+
+def test_relink_of_a_missing_row_changes_nothing(indexer, tmp_path):
+    stale = writeImage(tmp_path / "b.jpg")
+    indexCopy(indexer, stale)
+    moves = {tmp_path / "gone.jpg": (stale, getFileState(stale))}
+    assert indexer.metadataDb.relinkImages(moves) == 0
+    # The row at the destination is only replaced when there is a row to move there
+    assert rowOf(indexer, stale) is not None
+
+def test_sync_keeps_relinked_path(indexer, tmp_path, monkeypatch):
+    folder = tmp_path / "photos"
+    old = writeImage(folder / "old.jpg")
+    indexCopy(indexer, old)
+    new = folder / "sub" / "new.jpg"
+    new.parent.mkdir()
+    old.rename(new)
+
+    monkeypatch.setattr(IndexingManager, "_instance", None)
+    monkeypatch.setattr(indexingManagerModule, "Indexer", lambda: indexer)
+    manager = IndexingManager()
+    monkeypatch.setattr(manager, "_rememberFolder", lambda folder: None)
+    asyncio.run(manager.startIndexing(str(folder)))
+
+    assert manager.lastError is None
+    assert manager.lastSync.reused == 1 and manager.lastSync.removed == 0
+    assert rowOf(indexer, old) is None
+    assert sorted(rowOf(indexer, new).tags) == ["beach", "dog"]
+    assert indexer.vectors(SPACE).missingIds([str(new)]) == set()
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.db.metadata_db import MetadataDB
+from backend.utils.data_classes import IndexedImage
+
+@pytest.fixture
+def db(tmp_path):
+    db = MetadataDB(tmp_path / "metadata.db")
+    images = {
+        "cat.jpg": ["cat", "sofa"],
+        "cats.jpg": ["cats", "garden"],
+        "cat_dog.jpg": ["cat", "dog"],
+        "dog.jpg": ["dog", "beach"],
+    }
+    db.addImages([
+        IndexedImage(path = Path(name), caption = " ".join(tags), tags = tags, embedding = np.zeros(4, np.float32))
+        for name, tags in images.items()
+    ])
+    return db
+
+def names(results):
+    return sorted(r.path.name for r in results)
+
+def test_single_exact_tag(db):
+    assert names(db.searchByTags(["cat"])) == ["cat.jpg", "cat_dog.jpg"]
+
+def test_single_tag_match_all(db):
+    # A single term needs no HAVING clause, so matchAll must not add a bind parameter
+    assert names(db.searchByTags(["cat"], matchAll = True)) == ["cat.jpg", "cat_dog.jpg"]
+
+def test_multiple_tags_match_any_ranks_by_matches(db):
+    results = db.searchByTags(["cat", "dog"])
+    assert names(results) == ["cat.jpg", "cat_dog.jpg", "dog.jpg"]
+    assert results[0].path.name == "cat_dog.jpg"
+
+def test_multiple_tags_match_all(db):
+    assert names(db.searchByTags(["cat", "dog"], matchAll = True)) == ["cat_dog.jpg"]
+
+def test_prefix(db):
+    assert names(db.searchByTags(["cat"], prefix = True)) == ["cat.jpg", "cat_dog.jpg", "cats.jpg"]
+
+def test_prefix_match_all(db):
+    assert names(db.searchByTags(["cat", "do"], matchAll = True, prefix = True)) == ["cat_dog.jpg"]
+
+def test_paging(db):
+    first = db.searchByTags(["cat", "dog"], limit = 2)
+    rest = db.searchByTags(["cat", "dog"], limit = 2, offset = 2)
+    assert len(first) == 2 and len(rest) == 1
+    assert not {r.path for r in first} & {r.path for r in rest}
+
+def test_search_by_tag_splits_query(db):
+    assert names(db.searchByTag("cat, dog", matchAll = True)) == ["cat_dog.jpg"]
@@ -0,0 +1,41 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.services.search import SearchEngine
+from backend.utils.data_classes import IndexedImage
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    # The engine opens its databases under data/, relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    engine = SearchEngine()
+    engine.metadataDb.addImages([
+        IndexedImage(path = tmp_path / f"dog{i}.jpg", caption = "a dog", tags = ["dog"], embedding = np.zeros(4, np.float32))
+        for i in range(3)
+    ])
+    engine.thumbnailed = []
+    monkeypatch.setattr(engine.thumbnails, "getOrCreate", lambda path, contentHash: engine.thumbnailed.append(path))
+    return engine
+
+@pytest.mark.parametrize("mode", ["tag", "keyword"])
+def test_search_page_leaves_thumbnails_alone_by_default(engine, mode):
+    page = engine.searchPage("dog", mode = mode)
+    assert len(page.results) == 3
+    assert engine.thumbnailed == []
+
+def test_search_page_creates_thumbnails_when_asked(engine):
+    page = engine.searchPage("dog", mode = "tag", limit = 2, ensureThumbnails = True)
+    assert engine.thumbnailed == [r.path for r in page.results]
+    assert len(engine.thumbnailed) == 2
+
+def test_stream_search_passes_ensure_thumbnails(engine):
+    async def pages(**kwargs):
+        return [page async for page in engine.streamSearch("dog", mode = "tag", pageSize = 2, **kwargs)]
+
+    assert sum(len(p.results) for p in asyncio.run(pages())) == 3
+    assert engine.thumbnailed == []
+    asyncio.run(pages(ensureThumbnails = True))
+    assert sorted(p.name for p in engine.thumbnailed) == ["dog0.jpg", "dog1.jpg", "dog2.jpg"]
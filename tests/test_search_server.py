@@ -0,0 +1,198 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from backend.services.query_batcher import QueryBatcher
+from backend.services.search_client import SearchClient
+from backend.services.search_server import SearchServer
+from backend.utils.data_classes import SearchPage, SearchResult
+
+RESULT_COUNT = 5
+
+def fakeEmbedding(text: str) -> np.ndarray:
+    return np.full(4, len(text), dtype = np.float32)
+
+class StubEngine:
+    """Stands in for SearchEngine: a "model" that only records what it was asked to encode."""
+
+    def __init__(self):
+        self.encodeCalls = []
+        self.searchCalls = []
+
+    def encodeQueries(self, queries):
+        self.encodeCalls.append(list(queries))
+        # Long enough for concurrent requests to queue up behind a running batch
+        time.sleep(0.05)
+        return [fakeEmbedding(q) for q in queries]
+
+    def searchPage(self, query, mode, offset, limit, tagFilter, matchAllTags, tagPrefix, queryEmbedding):
+        self.searchCalls.append({"query": query, "mode": mode, "matchAllTags": matchAllTags, "embedding": queryEmbedding})
+        results = [
+            SearchResult(path = Path(f"/{query}/{i}.jpg"), tags = ["tag"], indexedDate = "today", score = 1.0 / (i + 1))
+            for i in range(offset, min(offset + limit, RESULT_COUNT))
+        ]
+        return SearchPage(results, offset, offset + limit if offset + limit < RESULT_COUNT else None)
+
+    def searchSimilar(self, path, topK):
+        return [SearchResult(path = Path("/similar.jpg"), tags = [], indexedDate = "today", score = 0.5)]
+
+    def listTags(self, prefix, limit):
+        return [("dog", 3), ("door", 1)]
+
+class StubIndexingManager:
+    isIndexing = False
+    progress = 0.0
+    status = "Idle"
+    currentFolder = None
+    isWatching = False
+    lastError = None
+
+    def __init__(self):
+        self.started = []
+
+    async def startIndexing(self, folder):
+        self.started.append(folder)
+
+class StubDuplicateFinder:
+    def __init__(self):
+        self.calls = []
+
+    def findGroups(self, similarity, maxHashDistance, space):
+        self.calls.append((similarity, maxHashDistance, space))
+        return [[Path("/a.jpg"), Path("/a copy.jpg"), Path("/a small.jpg")], [Path("/b.jpg"), Path("/b copy.jpg")]]
+
+def runWithServer(test):
+    """Runs test(server, client, call) against a server on a free localhost port; call() runs client methods off the loop."""
+    async def main():
+        server = SearchServer(StubEngine(), StubIndexingManager(), StubDuplicateFinder())
+        port = await server.start("127.0.0.1", 0, warmUp = False)
+        client = SearchClient(f"http://127.0.0.1:{port}", timeout = 10)
+        # The blocking client gets its own threads, so it never starves the server's to_thread calls
+        pool = ThreadPoolExecutor(max_workers = 16)
+        loop = asyncio.get_running_loop()
+        try:
+            await test(server, client, lambda fn, *args: loop.run_in_executor(pool, fn, *args))
+        finally:
+            await server.stop()
+            pool.shutdown()
+    asyncio.run(main())
+
+def test_batcher_coalesces_concurrent_queries():
+    calls = []
+
+    def encodeBatch(texts):
+        calls.append(list(texts))
+        time.sleep(0.01)
+        return [fakeEmbedding(t) for t in texts]
+
+    async def main():
+        batcher = QueryBatcher(encodeBatch, maxBatchSize = 8, maxDelay = 0.01)
+        try:
+            texts = [f"query {i % 5}" for i in range(20)]
+            embeddings = await asyncio.gather(*[batcher.encode(t) for t in texts])
+            return texts, embeddings, batcher
+        finally:
+            await batcher.close()
+
+    texts, embeddings, batcher = asyncio.run(main())
+    for text, embedding in zip(texts, embeddings):
+        assert np.array_equal(embedding, fakeEmbedding(text))
+    # 20 queued queries in batches of at most 8, each batch encoding its distinct texts once
+    assert len(calls) == 3
+    assert all(len(batch) == len(set(batch)) <= 5 for batch in calls)
+    assert batcher.queries == 20 and batcher.batches == 3
+
+def test_batcher_propagates_errors():
+    def encodeBatch(texts):
+        raise RuntimeError("model failed")
+
+    async def main():
+        batcher = QueryBatcher(encodeBatch)
+        try:
+            return await asyncio.gather(batcher.encode("a"), batcher.encode("b"), return_exceptions = True)
+        finally:
+            await batcher.close()
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+
+def test_concurrent_searches_share_batches_and_pass_embeddings():
+    async def test(server, client, call):
+        queries = [f"q{i % 4}" for i in range(16)]
+        pages = await asyncio.gather(*[call(client.searchPage, q, "semantic", 0, 2) for q in queries])
+
+        engine = server.engine
+        assert [r.path for r in pages[0].results] == [Path("/q0/0.jpg"), Path("/q0/1.jpg")]
+        assert pages[0].nextOffset == 2
+        # Every query was encoded by the batcher, in fewer passes than requests
+        assert server.batcher.queries == 16
+        assert len(engine.encodeCalls) < 16
+        # ...and the engine received those embeddings rather than encoding again
+        assert len(engine.searchCalls) == 16
+        for searched in engine.searchCalls:
+            assert np.array_equal(searched["embedding"], fakeEmbedding(searched["query"]))
+    runWithServer(test)
+
+def test_keyword_and_tag_searches_skip_the_model():
+    async def test(server, client, call):
+        await call(client.searchPage, "dog", "keyword")
+        await call(client.searchPage, "dog beach", "tag", 0, 60, None, True)
+        assert server.engine.encodeCalls == []
+        assert [s["embedding"] for s in server.engine.searchCalls] == [None, None]
+        assert server.engine.searchCalls[1]["matchAllTags"] is True
+    runWithServer(test)
+
+def test_paging_to_the_end():
+    async def test(server, client, call):
+        first = await call(client.searchPage, "dog", "keyword", 0, 3)
+        last = await call(client.searchPage, "dog", "keyword", first.nextOffset, 3)
+        assert len(first.results) == 3 and len(last.results) == 2
+        assert last.nextOffset is None
+    runWithServer(test)
+
+def test_tags_similar_status_and_index(tmp_path):
+    async def test(server, client, call):
+        assert await call(client.listTags, "do") == [("dog", 3), ("door", 1)]
+        similar = await call(client.searchSimilar, Path("/a.jpg"), 3)
+        assert [r.path for r in similar] == [Path("/similar.jpg")]
+        status = await call(client.status)
+        assert status["status"] == "Idle" and status["isIndexing"] is False
+        assert await call(client.startIndexing, str(tmp_path)) == {"started": str(tmp_path.resolve())}
+        await asyncio.sleep(0)
+        assert server.indexingManager.started == [str(tmp_path.resolve())]
+    runWithServer(test)
+
+def test_duplicates():
+    async def test(server, client, call):
+        groups = await call(client.findDuplicates)
+        assert groups == [[Path("/a.jpg"), Path("/a copy.jpg"), Path("/a small.jpg")], [Path("/b.jpg"), Path("/b copy.jpg")]]
+        assert await call(client.findDuplicates, 0.95, None, False, "clip", 1) == groups[:1]
+        assert server.duplicateFinder.calls == [(0.9, 10, None), (0.95, None, "clip")]
+    runWithServer(test)
+
+@pytest.mark.parametrize("method, path, params, body, status", [
+    ("GET", "/search", {"q": "x", "mode": "bogus"}, None, 400),
+    ("GET", "/search", {"q": "x", "limit": -1}, None, 400),
+    ("GET", "/search", {}, None, 400),
+    ("POST", "/index", None, {"folder": "/does/not/exist"}, 400),
+    ("GET", "/duplicates", {"similarity": "high"}, None, 400),
+    ("GET", "/duplicates", {"similarity": 1.5}, None, 400),
+    ("GET", "/duplicates", {"maxHashDistance": 65}, None, 400),
+    ("GET", "/nowhere", None, None, 404),
+    ("POST", "/search", None, {}, 405),
+])
+def test_errors(method, path, params, body, status):
+    async def test(server, client, call):
+        with pytest.raises(RuntimeError, match = f"returned {status}"):
+            await call(client._request, method, path, params, body)
+    runWithServer(test)
+
+def test_index_conflict_while_indexing(tmp_path):
+    async def test(server, client, call):
+        server.indexingManager.isIndexing = True
+        with pytest.raises(RuntimeError, match = "returned 409"):
+            await call(client.startIndexing, str(tmp_path))
+    runWithServer(test)